@@ -0,0 +1,193 @@
+"""
+FinOS Analogs — past windows of any stored symbol shaped like a symbol's last N bars
+
+The query is the last N daily log closes of a symbol, z-normalized. Every
+stored symbol's history is one long series (log closes, demeaned per symbol,
+symbols back to back), and the z-normalized Euclidean distance to every
+N-bar window of it comes from MASS: sliding dot products by FFT convolution,
+window means and deviations from prefix sums.
+
+The corpus is cut into ANALOG_FFT-point blocks overlapping by ANALOG_MAX_BARS,
+and each block's spectrum is computed once when the corpus is built. A search
+is then one FFT of the query and an inverse FFT per block. Matches are the
+nearest windows that don't overlap each other and still have
+max(ANALOG_HORIZONS) sessions after them; each comes with the returns that
+followed it.
+"""
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+import scanner
+
+ANALOG_BARS = 30          # default query length (sessions)
+ANALOG_MIN_BARS = 10
+ANALOG_MAX_BARS = 250
+ANALOG_TOP = 20           # default number of matches
+ANALOG_HORIZONS = (5, 10, 20)   # forward returns reported (sessions after the match)
+ANALOG_FFT = 1 << 18      # block length of the corpus spectra
+CORPUS_TTL = 3600         # s before the corpus is rebuilt from the store
+FLAT = 1e-12              # window variance (log price²) below which a window is flat
+
+
+class AnalogError(ValueError):
+    """Unknown symbol or unusable query."""
+
+
+class Corpus:
+    """Log closes of `symbols` back to back (symbol k spans offsets[k]:offsets[k+1])
+    with the block spectra searches reuse."""
+
+    def __init__(self, symbols: List[str], series: List[np.ndarray], dates: List[np.ndarray]):
+        self.symbols = symbols
+        self.offsets = np.cumsum([0] + [len(s) for s in series]).astype(np.int64)
+        self.T = np.concatenate(series) if series else np.empty(0)
+        self.dates = np.concatenate(dates) if dates else np.empty(0, dtype="datetime64[ns]")
+        self.cs = np.concatenate([[0.0], np.cumsum(self.T)])        # prefix sums for window means
+        self.cs2 = np.concatenate([[0.0], np.cumsum(self.T * self.T)])
+        step = ANALOG_FFT - ANALOG_MAX_BARS + 1
+        self.spectra = [np.fft.rfft(self.T[s:s + ANALOG_FFT], ANALOG_FFT) for s in range(0, len(self.T), step)]
+
+    def distances(self, q: np.ndarray) -> np.ndarray:
+        """z-normalized Euclidean distance from `q` (already z-normalized) to the
+        window starting at every corpus position; inf where a window is flat."""
+        m, L = len(q), len(self.T)
+        if L < m:
+            return np.empty(0)
+        step = ANALOG_FFT - ANALOG_MAX_BARS + 1
+        qf = np.fft.rfft(q[::-1], ANALOG_FFT)
+        qt = np.empty(L - m + 1)
+        for s, spec in zip(range(0, L - m + 1, step), self.spectra):
+            hi = min(s + step, L - m + 1)
+            qt[s:hi] = np.fft.irfft(spec * qf, ANALOG_FFT)[m - 1:m - 1 + hi - s]
+        mu = (self.cs[m:] - self.cs[:-m]) / m
+        var = (self.cs2[m:] - self.cs2[:-m]) / m - mu * mu
+        with np.errstate(all="ignore"):
+            # Σ q̂·(T - μ) = Σ q̂·T since Σ q̂ = 0, so ρ = QT / (m σ)
+            rho = np.clip(qt / (m * np.sqrt(var)), -1.0, 1.0)
+        return np.where(var > FLAT, np.sqrt(2 * m * (1 - rho)), np.inf)
+
+
+class _Cache:
+    """The corpus over every stored symbol; rebuilt in the background once
+    CORPUS_TTL old, like the screener's panel."""
+
+    def __init__(self):
+        self.corpus: Optional[Corpus] = None
+        self.t = 0.0
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.worker: Optional[threading.Thread] = None
+
+    def _build(self):
+        with self.build_lock:
+            if self.corpus is not None and time.time() - self.t < CORPUS_TTL:
+                return
+            syms, series, dates = [], [], []
+            for sym in scanner._store.symbols():
+                df = scanner._store.read(sym)
+                if df is None:
+                    continue
+                c = df["Close"].to_numpy(dtype=np.float64)
+                ok = np.isfinite(c) & (c > 0)
+                if ok.sum() < ANALOG_MIN_BARS + max(ANALOG_HORIZONS):
+                    continue
+                lc = np.log(c[ok])
+                syms.append(sym)
+                series.append(lc - lc.mean())     # keeps prefix sums small; z-normalizing ignores it
+                dates.append(df.index.values[ok])
+            corpus = Corpus(syms, series, dates)
+            with self.lock:
+                self.corpus, self.t = corpus, time.time()
+
+    def get(self) -> Corpus:
+        with self.lock:
+            expired = self.corpus is not None and time.time() - self.t >= CORPUS_TTL
+            if expired and not (self.worker and self.worker.is_alive()):
+                self.worker = threading.Thread(target=self._build, name="analog-corpus", daemon=True)
+                self.worker.start()
+        if self.corpus is None:
+            self._build()
+        with self.lock:
+            return self.corpus
+
+_cache = _Cache()
+
+
+def _query(sym: str, bars: int) -> Tuple[np.ndarray, pd.Timestamp]:
+    """The symbol's last `bars` log closes and the date of the latest."""
+    df = scanner._store.read(sym)
+    c = df["Close"].to_numpy(dtype=np.float64) if df is not None else np.empty(0)
+    c = c[np.isfinite(c) & (c > 0)]
+    if len(c) < bars:
+        raise AnalogError(f"{scanner._clean(sym)}: {len(c)} stored daily bars, need {bars}")
+    q = np.log(c[-bars:])
+    if q.var() <= FLAT:
+        raise AnalogError(f"{scanner._clean(sym)}: last {bars} closes are flat")
+    return q, df.index[-1]
+
+
+def _summary(rets: List[float]) -> Dict:
+    r = np.array(rets)
+    if not len(r):
+        return {"mean": None, "median": None, "positive": None}
+    return {"mean": round(float(r.mean()), 4), "median": round(float(np.median(r)), 4),
+            "positive": round(float((r > 0).mean()), 3)}
+
+
+def search(symbol: str, bars: int = ANALOG_BARS, k: int = ANALOG_TOP) -> Dict:
+    """The k windows across all stored history closest in shape to `symbol`'s
+    last `bars` daily closes, with the returns over the ANALOG_HORIZONS
+    sessions after each, and their mean/median/share positive."""
+    t0 = time.perf_counter()
+    if not ANALOG_MIN_BARS <= bars <= ANALOG_MAX_BARS:
+        raise AnalogError(f"bars must be between {ANALOG_MIN_BARS} and {ANALOG_MAX_BARS}")
+    sym = symbol.strip().upper()
+    sym = sym if "." in sym or sym.startswith("^") else f"{sym}.NS"
+    q, as_of = _query(sym, bars)
+    k = max(1, k)
+    q = (q - q.mean()) / q.std()
+    corpus = _cache.get()
+    d = corpus.distances(q)
+    # windows that fit inside one symbol with max(ANALOG_HORIZONS) sessions after them
+    H = max(ANALOG_HORIZONS)
+    valid = np.zeros(len(d), dtype=bool)
+    for a, b in zip(corpus.offsets[:-1], corpus.offsets[1:]):
+        valid[a:max(a, b - bars - H + 1)] = True
+    d = np.where(valid, d, np.inf)
+    picked: List[int] = []
+    pool = min(len(d), k * (2 * bars + 1))
+    while pool:
+        near = np.argpartition(d, pool - 1)[:pool] if pool < len(d) else np.arange(len(d))
+        near = near[np.isfinite(d[near])]
+        picked = []
+        for i in near[np.argsort(d[near], kind="stable")]:
+            if all(abs(i - j) >= bars for j in picked):
+                picked.append(int(i))
+                if len(picked) == k:
+                    break
+        if len(picked) == k or pool >= len(d):
+            break
+        pool = min(len(d), pool * 4)
+    owner = np.searchsorted(corpus.offsets, picked, side="right") - 1
+    matches = []
+    for i, o in zip(picked, owner):
+        e = i + bars - 1
+        fwd = {f"{h}d": round(float(np.expm1(corpus.T[e + h] - corpus.T[e])), 4) for h in ANALOG_HORIZONS}
+        matches.append({"symbol": scanner._clean(corpus.symbols[o]),
+                        "start": str(np.datetime_as_string(corpus.dates[i], unit="D")),
+                        "end": str(np.datetime_as_string(corpus.dates[e], unit="D")),
+                        "distance": round(float(d[i]), 3),
+                        "correlation": round(float(1 - d[i] ** 2 / (2 * bars)), 3),
+                        "forward": fwd})
+    return {
+        "symbol": scanner._clean(sym),
+        "bars": bars,
+        "as_of": as_of.date().isoformat(),
+        "matches": matches,
+        "forward": {f"{h}d": _summary([m["forward"][f"{h}d"] for m in matches]) for h in ANALOG_HORIZONS},
+        "corpus": {"symbols": len(corpus.symbols), "bars": int(len(corpus.T))},
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
@@ -1,5 +1,5 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import os
@@ -11,8 +11,9 @@ import pytz
 import pandas as pd
 import io
 import difflib
+import threading
 import time
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple
 
 # ── App ───────────────────────────────────────────────────────────────────────
 app = FastAPI(docs_url="/api/py/docs", openapi_url="/api/py/openapi.json")
@@ -29,12 +30,48 @@ app.add_middleware(
 # scanner.py lives at finos-app/scanner.py (root level) so Vercel only sees
 # api/index.py as the single serverless function.
 try:
-    from scanner import run_scan as _run_scan          # Vercel + local (cwd=finos-app)
+    from scanner import (run_scan as _run_scan, latest_scan as _latest_scan,          # Vercel + local (cwd=finos-app)
+                         scan_events as _scan_events, snapshot_events as _snapshot_events,
+                         SCAN_MAX_STALE)
 except ImportError:
     try:
-        from api.scanner import run_scan as _run_scan  # Legacy fallback
+        from api.scanner import (run_scan as _run_scan, latest_scan as _latest_scan,  # Legacy fallback
+                                 scan_events as _scan_events, snapshot_events as _snapshot_events,
+                                 SCAN_MAX_STALE)
     except ImportError:
-        _run_scan = None
+        _run_scan = _latest_scan = _scan_events = _snapshot_events = None
+        SCAN_MAX_STALE = 3600
+
+try:
+    from scanner import symbol_health as _symbol_health, pair_scan as _pair_scan
+except ImportError:
+    _symbol_health = _pair_scan = None
+
+try:
+    from universe import nse_equities as _nse_equities
+except ImportError:
+    _nse_equities = None
+
+try:
+    from screener import screen as _screen, ScreenError
+except ImportError:
+    _screen, ScreenError = None, ValueError
+
+try:
+    from analogs import search as _analog_search, AnalogError
+except ImportError:
+    _analog_search, AnalogError = None, ValueError
+
+try:
+    from breadth import Breadth as _Breadth, describe as _describe_breadth
+    _breadth = _Breadth()
+except ImportError:
+    _breadth = _describe_breadth = None
+
+try:
+    from timings import export as _export_metrics
+except ImportError:
+    _export_metrics = None
 
 
 # ── API Keys ─────────────────────────────────────────────────────────────────
@@ -109,14 +146,122 @@ def get_market_status(symbol: str) -> str:
     us_close = us.replace(hour=16, minute=0,  second=0, microsecond=0)
     return "Open" if us_open <= us <= us_close else "Closed"
 
-# ── Market Context (for chat prompt) ─────────────────────────────────────────
-market_cache = {"data": "", "timestamp": 0}
+# ── Scan Scheduler ────────────────────────────────────────────────────────────
+# Precomputes scans in a background thread on the NSE calendar: intraday/swing
+# every few minutes while the market is Open, everything once after the close,
+# nothing on weekends or holidays. The scanner endpoint then serves the latest
+# snapshot instantly. Off on Vercel (no background work between requests) or
+# with FINOS_SCHEDULER=0. Each due scan carries a max age: a result another
+# worker finished within it (shared scan cache) is reused, not recomputed.
+SCAN_CADENCE_OPEN = {"intraday": 300, "swing": 900, "longterm": 86400}
+SCAN_POLL = 30   # s between calendar checks
+
+class ScanScheduler:
+    def __init__(self):
+        self.last_run: Dict[str, float] = {}
+        self.close_run: Optional[date] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def due(self, now_ist: datetime) -> Dict[str, float]:
+        """scan_type → max age (s) of a cached result that still counts as fresh."""
+        status = is_nse_open(now_ist)
+        if status == "Open":
+            t = time.time()
+            return {s: every - SCAN_POLL for s, every in SCAN_CADENCE_OPEN.items()
+                    if t - self.last_run.get(s, 0) >= every}
+        after_close = now_ist.replace(hour=15, minute=30, second=0, microsecond=0)
+        if (status == "Closed" and now_ist.weekday() < 5 and now_ist > after_close
+                and self.close_run != now_ist.date()):
+            self.close_run = now_ist.date()
+            since_close = (now_ist - after_close).total_seconds()
+            return {s: since_close for s in SCAN_CADENCE_OPEN}
+        return {}
+
+    def tick(self):
+        for scan_type, max_age in self.due(datetime.now(pytz.timezone("Asia/Kolkata"))).items():
+            try:
+                _run_scan(scan_type, max_age=max_age)
+                self.last_run[scan_type] = time.time()
+            except Exception as e:
+                print(f"Scheduled {scan_type} scan failed: {e}")
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(SCAN_POLL)
+
+    def start(self):
+        if _run_scan is None or self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="scan-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+_scheduler = ScanScheduler()
+
+@app.on_event("startup")
+def _start_scheduler():
+    if os.environ.get("FINOS_SCHEDULER", "0" if os.environ.get("VERCEL") else "1") == "1":
+        _scheduler.start()
+
+@app.on_event("shutdown")
+def _stop_scheduler():
+    _scheduler.stop()
+
+# ── Stale-while-revalidate ───────────────────────────────────────────────────
+class SWRCache:
+    """One cached value: fresh for `ttl` s, then served stale for up to
+    `max_stale` s while a single background thread recomputes it. Only an empty
+    or too-stale cache makes the caller wait. A failed refresh keeps the old value."""
+
+    def __init__(self, fn, ttl: float, max_stale: float):
+        self.fn, self.ttl, self.max_stale = fn, ttl, max_stale
+        self.data, self.timestamp = None, 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            data = self.fn()
+            if data:
+                self.data, self.timestamp = data, time.time()
+        finally:
+            self._refreshing = False
+
+    def _refresh_async(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, daemon=True).start()
+
+    def get(self) -> Tuple[Any, float, bool]:
+        """(value, age in s, stale)."""
+        age = time.time() - self.timestamp
+        if self.data and age < self.ttl:
+            return self.data, age, False
+        if self.data and age < self.max_stale:
+            self._refresh_async()
+            return self.data, age, True
+        try:
+            data = self.fn()
+            if data:
+                self.data, self.timestamp = data, time.time()
+        except Exception:
+            pass
+        age = time.time() - self.timestamp
+        return self.data, age, age >= self.ttl
 
-def get_market_context():
-    global market_cache
-    current_time = time.time()
-    if current_time - market_cache["timestamp"] < 300 and market_cache["data"]:
-        return market_cache["data"]
+# ── Market Context (for chat prompt) ─────────────────────────────────────────
+def _fetch_market_context() -> str:
     try:
         tickers = {"^NSEI": "Nifty 50", "^NSEBANK": "Bank Nifty", "INR=X": "USD/INR"}
         data_text = [f"Date: {datetime.now(pytz.timezone('Asia/Kolkata')).strftime('%d-%b %H:%M IST')}"]
@@ -132,12 +277,18 @@ def get_market_context():
                         data_text.append(f"{name}: {current:,.0f}")
             except:
                 continue
-        result = " | ".join(data_text)
-        market_cache["data"] = result
-        market_cache["timestamp"] = current_time
-        return result
+        return " | ".join(data_text)
     except:
-        return market_cache["data"]
+        return ""
+
+market_cache = SWRCache(_fetch_market_context, ttl=300, max_stale=1800)
+
+def get_market_context():
+    # The "Date:" line carries the fetch time, so a stale context says how old it is.
+    # Breadth comes from the scanner's last daily scan (a cached file read, no fetch).
+    ctx = market_cache.get()[0] or ""
+    line = _describe_breadth(_breadth.snapshot()) if _breadth is not None else ""
+    return " | ".join(s for s in (ctx, line) if s)
 
 # ── Static Ticker Map ─────────────────────────────────────────────────────────
 STATIC_TICKER_MAP = {
@@ -246,11 +397,14 @@ def load_ticker_map():
     if _nse_loaded:
         return
     try:
-        url     = "https://nsearchives.nseindia.com/content/equities/EQUITY_L.csv"
-        headers = {"User-Agent": "Mozilla/5.0"}
-        resp    = requests.get(url, headers=headers, timeout=5)
-        if resp.status_code == 200:
-            df = pd.read_csv(io.StringIO(resp.text))
+        if _nse_equities is not None:
+            df = _nse_equities()   # shared with the scanner universe, cached on disk for a day
+        else:
+            url     = "https://nsearchives.nseindia.com/content/equities/EQUITY_L.csv"
+            headers = {"User-Agent": "Mozilla/5.0"}
+            resp    = requests.get(url, headers=headers, timeout=5)
+            df      = pd.read_csv(io.StringIO(resp.text)) if resp.status_code == 200 else None
+        if df is not None:
             for _, row in df.iterrows():
                 symbol     = f"{row['SYMBOL']}.NS"
                 name       = row["NAME OF COMPANY"].upper()
@@ -432,15 +586,16 @@ class JournalAnalysisRequest(BaseModel):
 
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
-@app.get("/api/py/market")
-async def get_market_data():
-    """Fetch global market indices, crypto, and forex with Gemini fallback."""
-    tickers = {
+MARKET_TICKERS = {
         "^NSEI": "Nifty 50", "^BSESN": "Sensex", "^NSEBANK": "Bank Nifty",
         "^GSPC": "S&P 500", "^DJI": "Dow Jones", "^IXIC": "Nasdaq",
         "BTC-USD": "Bitcoin", "ETH-USD": "Ethereum", "SOL-USD": "Solana",
         "INR=X": "USD/INR", "EURINR=X": "EUR/INR",
-    }
+}
+
+def _fetch_market_data() -> List[Dict]:
+    """Global market indices, crypto, and forex with Gemini fallback."""
+    tickers = MARKET_TICKERS
     data: List[Dict] = []
     failed: List[str] = []
 
@@ -479,8 +634,17 @@ async def get_market_data():
                 "is_mock": not bool(item),
                 "source": "AI_ESTIMATE" if item else "UNAVAILABLE",
             })
+    return data
 
-    return {"items": data, "status": "ok"}
+market_data_cache = SWRCache(_fetch_market_data, ttl=60, max_stale=900)
+
+@app.get("/api/py/market")
+async def get_market_data():
+    """Fetch global market indices, crypto, and forex with Gemini fallback, plus
+    NSE breadth from the scanner's last daily scan."""
+    data, age, stale = market_data_cache.get()
+    return {"items": data or [], "status": "ok", "stale": stale, "age_seconds": round(age, 1),
+            "breadth": _breadth.snapshot() if _breadth is not None else None}
 
 
 @app.get("/api/py/news")
@@ -774,15 +938,115 @@ async def health():
 
 
 # ── Trade Scanner ─────────────────────────────────────────────────────────────
+SCAN_SORT = ("confidence", "rs_rating", "rs_sector_rating")
+
+def _scan_view(data: Dict, debug: Optional[str], collapse: bool = False,
+               sort: Optional[str] = None) -> Dict:
+    """Scans always record their per-stage timings; only ?debug=timings returns
+    them. ?collapse=true drops signals annotated as following a correlated leader.
+    ?sort=rs_rating (or another SCAN_SORT field) orders signals by it, highest first."""
+    if debug != "timings" and "timings" in data:
+        data = {k: v for k, v in data.items() if k != "timings"}
+    if collapse and "signals" in data:
+        kept = [s for s in data["signals"] if "correlated_with" not in s]
+        data = {**data, "signals": kept, **({"count": len(kept)} if "count" in data else {})}
+    if sort and "signals" in data:
+        data = {**data, "signals": sorted(data["signals"], key=lambda s: (s.get(sort) is None, -(s.get(sort) or 0)))}
+    return data
+
 @app.get("/api/py/scanner")
-async def scanner(type: str = "swing"):
-    """Run trade scanner for a given type: intraday | swing | longterm"""
+def scanner(type: str = "swing", debug: Optional[str] = None, collapse: bool = False,
+                  sort: Optional[str] = None):
+    """Run trade scanner for a given type: intraday | swing | longterm.
+    ?debug=timings adds the scan's per-stage timing breakdown; ?collapse=true
+    keeps one signal per group of correlated names; ?sort=rs_rating ranks
+    signals by relative strength instead of confidence.
+    A plain def (run in the threadpool): a cold scan can wait up to SCAN_LEASE
+    on another worker's lease, which must not block the event loop."""
     if type not in ("intraday", "swing", "longterm"):
         raise HTTPException(status_code=400, detail="type must be intraday, swing, or longterm")
+    if sort is not None and sort not in SCAN_SORT:
+        raise HTTPException(status_code=400, detail=f"sort must be one of {', '.join(SCAN_SORT)}")
     if _run_scan is None:
         raise HTTPException(status_code=503, detail="Scanner module not available")
     try:
-        result = _run_scan(type)
-        return result
+        # With the scheduler running, serve its newest snapshot without recomputing;
+        # otherwise a stale scan is served while one worker refreshes it
+        snap = _scheduled_scan(type)
+        return _scan_view(snap or _run_scan(type, stale_ok=True), debug, collapse, sort)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+def _scheduled_scan(type: str) -> Optional[Dict]:
+    """The scheduler's newest snapshot, if it is running and that snapshot is at
+    most SCAN_MAX_STALE old; a stalled or failing scheduler falls through to
+    the refreshing scan path instead of serving days-old signals."""
+    return _latest_scan(type, max_age=SCAN_MAX_STALE) if _scheduler.running else None
+
+@app.get("/api/py/scanner/stream")
+def scanner_stream(type: str = "swing", debug: Optional[str] = None):
+    """Server-sent events: a `signals` event per algorithm as each price chunk
+    lands, then a `summary` event (the /api/py/scanner payload minus signals).
+    Correlated groups are only known at the end: see the summary's correlated_groups."""
+    if type not in ("intraday", "swing", "longterm"):
+        raise HTTPException(status_code=400, detail="type must be intraday, swing, or longterm")
+    if _scan_events is None:
+        raise HTTPException(status_code=503, detail="Scanner module not available")
+    snap = _scheduled_scan(type)
+    events = _snapshot_events(snap) if snap else _scan_events(type, stale_ok=True)
+
+    def sse():
+        try:
+            for ev in events:
+                data = _scan_view(ev["data"], debug) if ev["event"] == "summary" else ev["data"]
+                yield f"event: {ev['event']}\ndata: {json.dumps(data, default=str)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(sse(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/api/py/scanner/health")
+def scanner_health():
+    """Symbols whose fetches keep failing or coming back empty, and which are
+    quarantined (not fetched or scanned) until their next re-check."""
+    if _symbol_health is None:
+        raise HTTPException(status_code=503, detail="Scanner module not available")
+    return _symbol_health()
+
+@app.get("/api/py/scanner/pairs")
+def scanner_pairs(force: bool = False):
+    """Cointegrated pairs within each industry, spreads stretched past 2σ first.
+    Recomputed once per completed daily session."""
+    if _pair_scan is None:
+        raise HTTPException(status_code=503, detail="Scanner module not available")
+    return _pair_scan(force)
+
+@app.get("/api/py/screen")
+def screen(q: str, sort: Optional[str] = None, order: str = "desc", limit: int = 50):
+    """Custom screen over the daily store, e.g.
+    q=rsi14 < 30 and close > sma200 and vol / vol_sma20 > 1.5, sort=vol / vol_sma20"""
+    if _screen is None:
+        raise HTTPException(status_code=503, detail="Screener module not available")
+    try:
+        return _screen(q, sort=sort, order=order, limit=max(1, min(limit, 500)))
+    except ScreenError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/py/analogs/{symbol}")
+def analogs(symbol: str, bars: int = 30, k: int = 20):
+    """Past windows across all stored daily history shaped most like the
+    symbol's last `bars` closes, with the 5/10/20-session returns after each."""
+    if _analog_search is None:
+        raise HTTPException(status_code=503, detail="Analogs module not available")
+    try:
+        return _analog_search(symbol, bars=bars, k=max(1, min(k, 100)))
+    except AnalogError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/py/metrics")
+def metrics():
+    """Process-wide scan counters (stage, fetch, algorithm timings) in Prometheus text format."""
+    if _export_metrics is None:
+        raise HTTPException(status_code=503, detail="Metrics module not available")
+    return PlainTextResponse(_export_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,128 @@
+"""
+FinOS Backtest — walk-forward replay of scanner algorithms over stored daily bars
+
+Every registered algorithm with a `setups` rule is evaluated at every date of
+the stored history in one pass (the rules only look backwards, so a setup on
+day t uses nothing after t). Each setup enters at that day's close and is then
+followed for up to the algorithm's `hold` bars: it exits at T2, at the stop,
+or at the close of the last bar. Targets and stop hit on the same bar count as
+the stop. Setups too close to the end of the data to resolve are left out.
+
+    python backtest.py --period 10y --algos rsi,ema --since 2020-01-01
+"""
+import argparse
+import json
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+import scanner
+from ohlcv_panel import Panel
+
+BLOCK = 50_000   # setups evaluated per block (bounds the setups × hold windows)
+
+
+def _first(mask: np.ndarray) -> np.ndarray:
+    """Index of the first True per row; the row length when there is none."""
+    return np.where(mask.any(axis=1), mask.argmax(axis=1), mask.shape[1])
+
+
+def _trades(p: Panel, setups: Dict, hold: int, since: Optional[pd.Timestamp] = None) -> Dict[str, np.ndarray]:
+    """One row per resolved setup: outcome flags, bars held and return."""
+    hit = setups["hit"]
+    if since is not None:
+        hit = hit & (np.arange(len(p.dates)) >= p.dates.searchsorted(since))
+    ii, tt = np.nonzero(hit)
+    if not len(ii):
+        return {}
+    pick = lambda k: np.broadcast_to(setups[k], hit.shape)[ii, tt].astype(np.float64)
+    side, entry, sl, t1, t2 = (pick(k) for k in ("side", "entry", "sl", "t1", "t2"))
+
+    cols = {k: [] for k in ("t1", "t2", "sl", "bars", "ret", "r")}
+    steps = np.arange(1, hold + 1)
+    for b in range(0, len(ii), BLOCK):
+        blk = slice(b, b + BLOCK)
+        i, t, sd = ii[blk], tt[blk], side[blk]
+        idx = t[:, None] + steps
+        inside = idx <= p.end[i][:, None]
+        idx = np.minimum(idx, len(p.dates) - 1)
+        long = (sd > 0)[:, None]
+        # Flip shorts so every level is "favourable above / adverse below"
+        fav = np.where(long, p.high[i[:, None], idx], -p.low[i[:, None], idx])
+        adv = np.where(long, p.low[i[:, None], idx], -p.high[i[:, None], idx])
+        with np.errstate(invalid="ignore"):
+            f_sl = _first(inside & (adv <= (sd * sl[blk])[:, None]))
+            f_t1 = _first(inside & (fav >= (sd * t1[blk])[:, None]))
+            f_t2 = _first(inside & (fav >= (sd * t2[blk])[:, None]))
+        n_fwd = inside.sum(axis=1)
+        won, stopped = f_t2 < f_sl, (f_sl <= f_t2) & (f_sl < hold)
+        done = won | stopped | (n_fwd >= hold)
+        last = np.maximum(n_fwd - 1, 0)
+        exit_px = np.where(won, t2[blk], np.where(stopped, sl[blk], p.close[i, idx[np.arange(len(i)), last]]))
+        bars = np.where(won, f_t2, np.where(stopped, f_sl, last)) + 1
+        move = sd * (exit_px - entry[blk])
+        with np.errstate(all="ignore"):
+            ret, r = move / entry[blk], move / np.abs(entry[blk] - sl[blk])
+        done &= np.isfinite(ret)
+        for k, x in (("t1", f_t1 < f_sl), ("t2", won), ("sl", stopped), ("bars", bars), ("ret", ret), ("r", r)):
+            cols[k].append(x[done])
+    return {k: np.concatenate(v) for k, v in cols.items()}
+
+
+def _report(tr: Dict[str, np.ndarray]) -> Dict:
+    n = len(tr.get("ret", ()))
+    if not n:
+        return {"trades": 0}
+    r = tr["r"][np.isfinite(tr["r"])]
+    return {
+        "trades": n,
+        "t1_hit_rate": round(float(tr["t1"].mean()), 4),
+        "t2_hit_rate": round(float(tr["t2"].mean()), 4),
+        "stop_rate": round(float(tr["sl"].mean()), 4),
+        "win_rate": round(float((tr["ret"] > 0).mean()), 4),
+        "avg_hold_bars": round(float(tr["bars"].mean()), 2),
+        "expectancy_pct": round(float(tr["ret"].mean() * 100), 3),
+        "expectancy_r": round(float(r.mean()), 3) if len(r) else None,
+    }
+
+
+def run(symbols: Optional[List[str]] = None, period: Optional[str] = None,
+        algos: Optional[List[str]] = None, since: Optional[str] = None) -> Dict:
+    """Backtest `algos` (default: every algorithm on daily or daily-derived bars
+    with a setups rule) over the stored history of `symbols` (default: the whole
+    NSE universe). With `period` the store is first topped up to cover it, e.g. "10y"."""
+    t0 = time.perf_counter()
+    symbols = symbols or scanner._universe.members()
+    failed: List[str] = []
+    if period:
+        scanner._batch(symbols, period, failed=failed)
+    p = Panel.from_frames(scanner._store.read_many(symbols, min_bars=1))
+    start = pd.Timestamp(since) if since else None
+    out: Dict[str, Dict] = {}
+    for a in scanner.ALGORITHMS.values():
+        if a.setups is None or a.base != "1d" or (algos and a.name not in algos):
+            continue
+        t = time.perf_counter()
+        view = p if a.interval == a.base else p.resample(a.interval)
+        out[a.name] = {**_report(_trades(view, a.setups(view), a.hold, start)),
+                       "hold": a.hold, "seconds": round(time.perf_counter() - t, 3)}
+    return {
+        "symbols": len(p),
+        "bars": len(p.dates),
+        "from": p.dates[0].date().isoformat() if len(p.dates) else None,
+        "to": p.dates[-1].date().isoformat() if len(p.dates) else None,
+        "algorithms": out,
+        "failed_symbols": sorted(set(failed)),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Backtest scanner algorithms over stored daily bars")
+    ap.add_argument("--period", help='top up the store to cover this yfinance period first, e.g. "10y"')
+    ap.add_argument("--algos", help="comma-separated algorithm names (default: all)")
+    ap.add_argument("--since", help="only count setups on or after this date")
+    args = ap.parse_args()
+    print(json.dumps(run(period=args.period, since=args.since,
+                         algos=args.algos.split(",") if args.algos else None), indent=2))
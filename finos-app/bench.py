@@ -0,0 +1,319 @@
+"""
+FinOS Scanner Benchmark — offline, repeatable timings on synthetic OHLCV
+
+Each universe size runs in its own process with an empty data directory, so the
+store, caches and peak RSS start from zero. Inside it the scanner's price fetch
+(`scanner._history`) and fundamentals fetch (`fundamentals._fetch_info`) are
+replaced by a deterministic synthetic source, so no request leaves the machine.
+
+Reported per size: wall and CPU time and peak traced memory (above what was
+already allocated) for a cold scan (empty store), a warm scan (store fresh,
+nothing fetched) and each registered algorithm run alone on a fresh panel;
+plus the synthetic source's own time (summed over fetch threads), which cold
+scans include.
+
+    python bench.py --sizes 200,2000,10000 --bars 504 --out bench.json
+
+`--parity` instead checks the panel's indicator kernels against the same
+indicators computed per symbol with pandas, on synthetic bars where some
+symbols skip sessions and one has a stray weekend bar; it exits 1 on any
+mismatch.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource               # Unix only; peak RSS is reported as "n/a" without it
+except ImportError:
+    resource = None
+
+SESSION_BARS = 75         # 5-minute bars in an NSE session (09:15–15:30 IST)
+INTRADAY_DAYS = 22        # sessions of 5-minute history served (yfinance "1mo")
+
+
+class SyntheticSource:
+    """Deterministic OHLCV for `n` symbols: one market factor every symbol loads
+    on (beta), per-symbol volatility, drift, price level and traded value spread
+    over several orders of magnitude (so liquidity tiers differ), occasional
+    gaps, volume spikes on big moves, and some recent listings with short
+    histories. The same (seed, symbol) always gives the same bars."""
+
+    def __init__(self, n: int, bars: int = 504, seed: int = 7, end: Optional[pd.Timestamp] = None):
+        self.symbols = [f"SYN{i:05d}.NS" for i in range(n)]
+        self.bars, self.seed = bars, seed
+        self.dates = pd.bdate_range(end=(end or pd.Timestamp.now()).normalize(), periods=bars)
+        rng = np.random.default_rng(seed)
+        self.market = rng.normal(0.0004, 0.011, bars)
+        self.seconds = 0.0            # time spent generating, summed over threads
+        self._lock = threading.Lock()
+
+    def _rng(self, sym: str, salt: int = 0) -> np.random.Generator:
+        return np.random.default_rng([self.seed, zlib.crc32(sym.encode()), salt])
+
+    def daily(self, sym: str) -> pd.DataFrame:
+        rng = self._rng(sym)
+        T = self.bars
+        beta, vol = rng.uniform(0.5, 1.5), rng.uniform(0.010, 0.030)
+        r = beta * self.market + rng.normal(0.0002, vol, T)
+        r += np.where(rng.random(T) < 0.01, rng.normal(0, 4 * vol, T), 0.0)
+        close = np.exp(rng.normal(5.0, 1.2)) * np.exp(np.cumsum(r))
+        gap = rng.normal(0, vol / 3, T)
+        open_ = np.r_[close[0], close[:-1]] * np.exp(gap)
+        wick = np.abs(rng.normal(0, vol / 2, (2, T)))
+        high = np.maximum(open_, close) * (1 + wick[0])
+        low = np.minimum(open_, close) * (1 - wick[1])
+        volume = np.exp(rng.normal(rng.uniform(8, 15), 0.4, T)) * (1 + 20 * np.abs(r))
+        df = pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close,
+                           "Volume": np.round(volume)}, index=self.dates)
+        if rng.random() < 0.05:
+            df = df.iloc[rng.integers(T // 10, T - 30):]
+        return df
+
+    def intraday(self, sym: str) -> pd.DataFrame:
+        """5-minute bars for the last INTRADAY_DAYS sessions, the daily moves split
+        into SESSION_BARS steps with a U-shaped volume profile (IST, tz-aware)."""
+        d = self.daily(sym).iloc[-INTRADAY_DAYS:]
+        rng = self._rng(sym, 1)
+        n = len(d)
+        steps = rng.normal(0, 1, (n, SESSION_BARS))
+        steps -= steps.mean(axis=1, keepdims=True)
+        move = np.log(d["Close"].to_numpy() / d["Open"].to_numpy())
+        path = d["Open"].to_numpy()[:, None] * np.exp(
+            np.cumsum(steps * 0.001, axis=1) + np.linspace(0, 1, SESSION_BARS) * move[:, None])
+        prev = np.c_[d["Open"].to_numpy(), path[:, :-1]]
+        wick = np.abs(rng.normal(0, 0.0008, (2, n, SESSION_BARS)))
+        u = 1 + 2 * (np.linspace(-1, 1, SESSION_BARS) ** 2)
+        vol = d["Volume"].to_numpy()[:, None] * u / u.sum() * rng.lognormal(0, 0.3, (n, SESSION_BARS))
+        idx = (pd.DatetimeIndex(np.repeat(d.index.values, SESSION_BARS))
+               + pd.to_timedelta(np.tile(9 * 60 + 15 + 5 * np.arange(SESSION_BARS), n), unit="min"))
+        return pd.DataFrame({"Open": prev.ravel(), "High": (np.maximum(prev, path) * (1 + wick[0])).ravel(),
+                             "Low": (np.minimum(prev, path) * (1 - wick[1])).ravel(), "Close": path.ravel(),
+                             "Volume": np.round(vol).ravel()}, index=idx.tz_localize("Asia/Kolkata"))
+
+    def history(self, sym: str, min_bars: int, interval: str = "1d", period: Optional[str] = None,
+                start: Optional[str] = None, **kw) -> Optional[pd.DataFrame]:
+        """Drop-in for scanner._history."""
+        from ohlcv_store import period_start
+        t = time.perf_counter()
+        df = self.intraday(sym) if interval == "5m" else self.daily(sym)
+        since = pd.Timestamp(start) if start else period_start(period or "1y")
+        df = df[df.index.tz_localize(None) >= since] if df.index.tz is not None else df[df.index >= since]
+        with self._lock:
+            self.seconds += time.perf_counter() - t
+        return df if len(df) >= min_bars else None
+
+    def info(self, sym: str) -> Dict:
+        """Drop-in for fundamentals._fetch_info."""
+        rng = self._rng(sym, 2)
+        pe = float(rng.uniform(5, 80))
+        return {"returnOnEquity": float(rng.uniform(-0.1, 0.4)), "debtToEquity": float(rng.uniform(0, 200)),
+                "trailingPE": pe, "forwardPE": pe * float(rng.uniform(0.7, 1.2)),
+                "earningsGrowth": float(rng.normal(0.1, 0.2)), "revenueGrowth": float(rng.normal(0.1, 0.15)),
+                "dividendYield": float(rng.uniform(0, 0.04)),
+                "currentPrice": float(self.daily(sym)["Close"].iloc[-1]), "regularMarketPrice": None,
+                "sector": None, "industry": None}
+
+
+def _measure(fn: Callable, trace: bool) -> Dict:
+    if trace:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    t, cpu = time.perf_counter(), time.process_time()
+    value = fn()
+    out = {"seconds": round(time.perf_counter() - t, 3), "cpu_seconds": round(time.process_time() - cpu, 3)}
+    if trace:
+        out["peak_mb"] = round((tracemalloc.get_traced_memory()[1] - base) / 2 ** 20, 1)
+    out["_value"] = value
+    return out
+
+
+def _max_rss_mb():
+    """Peak RSS of this process in MB (Linux reports KB), "n/a" without `resource`."""
+    if resource is None:
+        return "n/a"
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_one(n: int, bars: int = 504, seed: int = 7, scans: List[str] = ("swing", "intraday", "longterm"),
+            trace: bool = True) -> Dict:
+    """Benchmark one universe size in this process. FINOS_DATA_DIR must point at
+    an empty directory before the scanner is first imported (see main)."""
+    import fundamentals
+    import scanner
+    from ohlcv_panel import Panel
+    from ohlcv_store import period_start
+    from strength import RelativeStrength
+
+    src = SyntheticSource(n, bars, seed)
+    scanner._history = src.history
+    fundamentals._fetch_info = src.info
+    scanner.universe.nse_equities = lambda *a, **k: None
+    scanner._universe.seed = src.symbols
+    scanner._universe.refresh(force=True)
+    scanner.FETCH_BUDGET = 3600       # measure the work, not Vercel's deadline
+    if trace:
+        tracemalloc.start()
+
+    stages: Dict[str, Dict] = {}
+
+    def scan(name: str, scan_type: str):
+        m = _measure(lambda: scanner.run_scan(scan_type, force=True), trace)
+        r = m.pop("_value")
+        stages[name] = {**m, "signals": r["count"], "universe": r["universe"],
+                        "failed": len(r["failed_symbols"]), "breakdown": r["timings"]["stages"]}
+
+    for scan_type in scans:
+        before = src.seconds
+        scan(f"{scan_type}_cold", scan_type)
+        stages[f"{scan_type}_cold"]["source_seconds"] = round(src.seconds - before, 3)
+        if scan_type == "swing":
+            # tiers are ranked by traded value once the daily store has bars
+            scanner._universe.refresh(force=True)
+        scan(f"{scan_type}_warm", scan_type)
+
+    algorithms: Dict[str, Dict] = {}
+    for a in scanner.ALGORITHMS.values():
+        if a.source == "fundamentals":
+            snap = scanner._fundamentals.snapshot()
+            m = _measure(lambda: a.fn({s: snap[s] for s in a.symbols() if s in snap}), trace)
+            m["symbols"] = len(snap)
+        else:
+            since = period_start(scanner._period_for(a.base, a.base_bars))
+            p = Panel.from_frames(scanner._store_for(a.base).read_many(a.symbols(), since))
+            if a.interval != a.base:
+                p = p.resample(a.interval)
+            if a.source == "ranks":
+                rs = RelativeStrength()
+                m = _measure(lambda: (rs.add(p), rs.rank(), a.fn(rs))[-1], trace)
+            else:
+                m = _measure(lambda: a.fn(p), trace)
+            m["symbols"], m["bars"] = len(p), len(p.dates)
+        m["signals"] = len(m.pop("_value"))
+        algorithms[a.name] = m
+
+    if trace:
+        tracemalloc.stop()
+    return {
+        "symbols": n,
+        "bars": bars,
+        "tiers": scanner._universe.stats(),
+        "stages": stages,
+        "algorithms": algorithms,
+        "max_rss_mb": _max_rss_mb(),
+    }
+
+
+# (name, panel indicator, the same computed from one symbol's DataFrame)
+_PARITY = (
+    ("sma20_volume", lambda p: p.ind.sma(20, "Volume"), lambda df: df["Volume"].rolling(20).mean()),
+    ("sma200", lambda p: p.ind.sma(200), lambda df: df["Close"].rolling(200).mean()),
+    ("std20", lambda p: p.ind.std(20), lambda df: df["Close"].rolling(20).std()),
+    ("ema9", lambda p: p.ind.ema(9), lambda df: df["Close"].ewm(span=9, adjust=False).mean()),
+    ("rsi14", lambda p: p.ind.rsi(14), lambda df: _pd_rsi(df["Close"], 14)),
+    ("atr14", lambda p: p.ind.atr(14), lambda df: _pd_tr(df).rolling(14).mean()),
+    ("highest252", lambda p: p.ind.highest(252), lambda df: df["Close"].rolling(252, min_periods=1).max()),
+    ("prev_close", lambda p: p.shift(p.close, 1), lambda df: df["Close"].shift(1)),
+)
+
+
+def _pd_rsi(c: pd.Series, n: int) -> pd.Series:
+    d = c.diff()
+    g, l = d.clip(lower=0).rolling(n).mean(), (-d).clip(lower=0).rolling(n).mean()
+    return 100 - (100 / (1 + g / (l + 1e-10)))
+
+
+def _pd_tr(df: pd.DataFrame) -> pd.Series:
+    pc = df["Close"].shift(1)
+    return pd.concat([df["High"] - df["Low"], (df["High"] - pc).abs(), (df["Low"] - pc).abs()], axis=1).max(axis=1)
+
+
+def parity(n: int = 200, bars: int = 504, seed: int = 7) -> Dict:
+    """Panel indicators vs per-DataFrame pandas at every real bar. Every tenth
+    symbol skips three sessions and the first symbol gets an extra Saturday bar,
+    so the panel's date axis is a union with holes in every row."""
+    from ohlcv_panel import Panel
+
+    src = SyntheticSource(n, bars, seed)
+    dfs = {s: src.daily(s) for s in src.symbols}
+    for k, s in enumerate(src.symbols):
+        df = dfs[s]
+        if k % 10 == 3 and len(df) > 70:
+            at = len(df) - 10 - k % 50
+            dfs[s] = df.drop(df.index[at:at + 3])
+    first = src.symbols[0]
+    fri = dfs[first].index[dfs[first].index.weekday == 4][-1]
+    dfs[first] = pd.concat([dfs[first], dfs[first].loc[[fri]].set_axis([fri + pd.Timedelta(days=1)])]).sort_index()
+    p = Panel.from_frames(dfs)
+    out = {}
+    for name, panel_fn, frame_fn in _PARITY:
+        x = panel_fn(p)
+        worst, bad = 0.0, []
+        for i, s in enumerate(p.symbols):
+            got, want = x[i, p.valid[i]], frame_fn(dfs[s]).to_numpy(dtype=np.float64)
+            same = np.isnan(got) == np.isnan(want)
+            with np.errstate(invalid="ignore"):
+                diff = np.abs(got - want) / np.maximum(np.abs(want), 1.0)
+            diff = np.where(np.isnan(want), 0.0, diff)
+            worst = max(worst, float(diff.max(initial=0.0)))
+            if not same.all() or (diff > 1e-9).any():
+                bad.append(s)
+        out[name] = {"max_rel_diff": worst, "mismatched": bad[:10], "n_mismatched": len(bad)}
+    return {"symbols": len(p), "dates": len(p.dates), "ok": not any(v["n_mismatched"] for v in out.values()),
+            "indicators": out}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the scanner on synthetic OHLCV (no network)")
+    ap.add_argument("--sizes", default="200,2000,10000", help="comma-separated universe sizes")
+    ap.add_argument("--bars", type=int, default=504, help="daily bars of synthetic history per symbol")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--scans", default="swing,intraday,longterm")
+    ap.add_argument("--no-trace", action="store_true", help="skip tracemalloc (faster, no peak_mb)")
+    ap.add_argument("--out", help="also write the JSON report here")
+    ap.add_argument("--parity", action="store_true",
+                    help="check panel indicators against per-symbol pandas on gapped bars (first size)")
+    ap.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    scans = [s for s in args.scans.split(",") if s]
+
+    if args.parity:
+        report = parity(int(args.sizes.split(",")[0]), args.bars, args.seed)
+        print(json.dumps(report, indent=2))
+        sys.exit(0 if report["ok"] else 1)
+    if args.one:
+        print(json.dumps(run_one(args.one, args.bars, args.seed, scans, not args.no_trace)))
+        return
+
+    report = {"bars": args.bars, "seed": args.seed, "python": sys.version.split()[0],
+              "numpy": np.__version__, "pandas": pd.__version__, "runs": []}
+    for n in (int(s) for s in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory(prefix="finos-bench-") as tmp:
+            env = {**os.environ, "FINOS_DATA_DIR": tmp, "FINOS_SCAN_CACHE": "memory"}
+            cmd = [sys.executable, os.path.abspath(__file__), "--one", str(n), "--bars", str(args.bars),
+                   "--seed", str(args.seed), "--scans", ",".join(scans)] + (["--no-trace"] if args.no_trace else [])
+            proc = subprocess.run(cmd, env=env, capture_output=True, text=True,
+                                  cwd=os.path.dirname(os.path.abspath(__file__)))
+            if proc.returncode:
+                report["runs"].append({"symbols": n, "error": proc.stderr.strip().splitlines()[-1:]})
+                continue
+            report["runs"].append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
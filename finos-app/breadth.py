@@ -0,0 +1,167 @@
+"""
+FinOS Market Breadth — advance/decline, DMA participation, 52-week highs/lows
+and the McClellan oscillator over the scanner universe
+
+Counted from the daily panels a scan already builds (no downloads of its own),
+reusing their cached 50/200-day SMAs and 252-day highs/lows. Each scan counts
+only the sessions from the last stored one on and merges them into a short
+per-session history in DATA_DIR/breadth.json; the snapshot served to chat and
+the market endpoint is derived from that file and cached until it changes.
+"""
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+from ohlcv_panel import Panel, calc_ema
+from ohlcv_store import DATA_DIR
+
+BREADTH_HISTORY = 300     # sessions kept (the McClellan EMAs need ~100 to settle)
+HL_WINDOW = 252           # 52 weeks of sessions
+HL_MIN_BARS = 200         # bars a symbol needs before its highs/lows count
+MCCLELLAN = (19, 39)      # EMA spans over ratio-adjusted net advances
+COUNTS = ("advances", "declines", "unchanged", "above_50", "n_50", "above_200", "n_200",
+          "new_highs", "new_lows", "n_hl")
+
+
+class BreadthCounts:
+    """Per-session breadth counts summed over one scan's daily panels, for the
+    sessions on or after `since` (all of them when None)."""
+
+    def __init__(self, since: Optional[pd.Timestamp] = None):
+        self.since = since
+        self.rows: Dict[pd.Timestamp, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, p: Panel):
+        T = len(p.dates)
+        if not len(p) or not T:
+            return
+        j = 0 if self.since is None else int(p.dates.searchsorted(self.since))
+        if j >= T:
+            return
+        tail = slice(j, None)
+        c, ok = p.close[:, tail], p.valid[:, tail]
+        prev = p.shift(p.close, 1)[:, tail]
+        s50, s200 = p.ind.sma(50)[:, tail], p.ind.sma(200)[:, tail]
+        hi, lo = p.ind.highest(HL_WINDOW)[:, tail], p.ind.lowest(HL_WINDOW)[:, tail]
+        hl = ok & (p.ind.count()[:, tail] >= HL_MIN_BARS)
+        with np.errstate(invalid="ignore"):
+            moved = ok & np.isfinite(prev)
+            n50, n200 = ok & np.isfinite(s50), ok & np.isfinite(s200)
+            counts = np.stack([moved & (c > prev), moved & (c < prev), moved & (c == prev),
+                               n50 & (c > s50), n50, n200 & (c > s200), n200,
+                               hl & (c >= hi), hl & (c <= lo), hl]).sum(axis=1)
+        for d, col in zip(p.dates[tail], counts.T):
+            self.rows[d] = self.rows[d] + col if d in self.rows else col
+
+
+class Breadth:
+    """The per-session history ({date, *COUNTS}, oldest first) in one JSON file.
+
+    `counts()` starts a scan's accumulator from the last stored session (that
+    row may still be forming), `commit` merges it back, and `snapshot` is the
+    latest session plus the McClellan oscillator, rebuilt only when the file
+    changes.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(DATA_DIR, "breadth.json")
+        self._history: List[Dict] = []
+        self._mtime = None
+        self._snap: Optional[Dict] = None
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                self._history = json.load(fh)
+            self._mtime, self._snap = mtime, None
+        except Exception:
+            pass
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(self._history, fh)
+        os.replace(tmp, self.path)
+        self._mtime, self._snap = os.path.getmtime(self.path), None
+
+    def counts(self) -> BreadthCounts:
+        with self._lock:
+            self._reload()
+            last = self._history[-1]["date"] if self._history else None
+        return BreadthCounts(pd.Timestamp(last) if last else None)
+
+    def commit(self, counts: BreadthCounts):
+        if not len(counts):
+            return
+        with self._lock:
+            self._reload()
+            rows = {r["date"]: r for r in self._history}
+            for d, col in counts.rows.items():
+                day = d.date().isoformat()
+                rows[day] = {"date": day, **{k: int(v) for k, v in zip(COUNTS, col)}}
+            self._history = [rows[d] for d in sorted(rows)][-BREADTH_HISTORY:]
+            self._save()
+
+    def history(self) -> List[Dict]:
+        with self._lock:
+            self._reload()
+            return list(self._history)
+
+    def snapshot(self) -> Optional[Dict]:
+        """The latest session's breadth, or None before the first daily scan."""
+        with self._lock:
+            self._reload()
+            if self._snap is None and self._history:
+                self._snap = _summarize(self._history)
+            return self._snap
+
+
+def _summarize(history: List[Dict]) -> Dict:
+    last = history[-1]
+    adv = np.array([r["advances"] for r in history], dtype=np.float64)
+    dec = np.array([r["declines"] for r in history], dtype=np.float64)
+    with np.errstate(all="ignore"):
+        # ratio-adjusted, so the oscillator doesn't drift as the universe grows
+        rana = np.where(adv + dec > 0, (adv - dec) / (adv + dec) * 1000, np.nan)
+    fast, slow = (calc_ema(rana, span)[-1] for span in MCCLELLAN)
+    pct = lambda a, n: round(100.0 * last[a] / last[n], 1) if last[n] else None
+    return {
+        "as_of": last["date"],
+        "advances": last["advances"], "declines": last["declines"], "unchanged": last["unchanged"],
+        "ad_ratio": round(last["advances"] / last["declines"], 2) if last["declines"] else None,
+        "pct_above_50dma": pct("above_50", "n_50"),
+        "pct_above_200dma": pct("above_200", "n_200"),
+        "new_highs": last["new_highs"], "new_lows": last["new_lows"],
+        "mcclellan": round(float(fast - slow), 1) if np.isfinite(fast - slow) else None,
+        "sessions": len(history),
+    }
+
+
+def describe(snap: Optional[Dict]) -> str:
+    """One line for the chat prompt."""
+    if not snap:
+        return ""
+    parts = [f"NSE breadth ({snap['as_of']}): {snap['advances']:,} adv / {snap['declines']:,} dec"]
+    if snap["pct_above_50dma"] is not None:
+        parts.append(f"{snap['pct_above_50dma']:.0f}% above 50-DMA")
+    if snap["pct_above_200dma"] is not None:
+        parts.append(f"{snap['pct_above_200dma']:.0f}% above 200-DMA")
+    parts.append(f"52W highs {snap['new_highs']} / lows {snap['new_lows']}")
+    if snap["mcclellan"] is not None:
+        parts.append(f"McClellan {snap['mcclellan']:+.0f}")
+    return " | ".join(parts)
@@ -0,0 +1,268 @@
+"""
+FinOS Correlation — rolling return correlation/covariance across the universe
+
+Daily log returns over the last CORR_WINDOW completed sessions. The matrix is
+kept as running pairwise sums (counts, Σx, Σx², Σxy over the days both symbols
+traded), so each new session is an outer-product add for the new day and a
+subtract for the day leaving the window. Every CORR_WINDOW days the sums are
+rebuilt from the stored window to shed floating-point drift.
+
+The published correlation and covariance are float32 in POSIX shared memory,
+described by DATA_DIR/correlation.json, so other processes on the host can map
+them read-only with `attach()`. Without shared memory they stay in-process.
+"""
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+import pytz
+from typing import Dict, List, Optional, Tuple
+
+from ohlcv_store import DATA_DIR, OHLCVStore
+
+CORR_WINDOW = 60          # sessions of returns
+CORR_MIN_OBS = 40         # fewer shared sessions → NaN correlation
+CORR_TIER = 2             # universe tiers covered (tier 3 is too illiquid to matter)
+CORR_THRESHOLD = 0.8      # signals on names at least this correlated are grouped
+CORR_CHECK = 3600         # s between checks of the store for new sessions
+SHM_PREFIX = "finos_corr"
+
+
+def _completed(dates: pd.DatetimeIndex) -> int:
+    """How many of `dates` are finished sessions (today's bar forms until 15:30 IST)."""
+    now = pd.Timestamp.now(tz=pytz.timezone("Asia/Kolkata"))
+    today = pd.Timestamp(now.date())
+    if len(dates) and dates[-1] >= today and (now.hour, now.minute) < (15, 30):
+        return int(dates.searchsorted(today))
+    return len(dates)
+
+
+class CorrelationMatrix:
+    """Correlation/covariance of daily returns for a fixed set of symbols (kept
+    sorted, so the caller's ranking order doesn't matter); a change of
+    membership (tier changes, listings, quarantine) rebuilds the window from
+    the store."""
+
+    def __init__(self, store: OHLCVStore, window: int = CORR_WINDOW, meta: Optional[str] = None):
+        self.store = store
+        self.window = window
+        self.meta = meta or os.path.join(DATA_DIR, "correlation.json")
+        self.symbols: List[str] = []
+        self.dates: List[pd.Timestamp] = []       # session of each return in the window
+        self._pos: Dict[str, int] = {}
+        self._R = np.empty((0, 0))                 # window × N returns, 0 where missing
+        self._M = np.empty((0, 0))                 # window × N, 1.0 where the return exists
+        self._sums: Optional[Tuple[np.ndarray, ...]] = None
+        self._pushes = 0
+        self._checked = 0.0
+        self._corr: Optional[np.ndarray] = None    # (2, N, N) float32: corr, cov
+        self._shm = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def close(self):
+        """Drop the published segment (the meta file then points at nothing)."""
+        shm, self._shm, self._corr = self._shm, None, None
+        if shm is not None:
+            try:
+                shm.unlink()
+                shm.close()
+            except (BufferError, OSError):
+                pass
+
+    # ── Sums ─────────────────────────────────────────────────────────────────
+    @staticmethod
+    def _terms(R: np.ndarray, M: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """(n, Σx, Σx², Σxy) over rows, pairwise: entry [i, j] sums the rows where
+        both i and j have a return, and Σx / Σx² are symbol i's side of that."""
+        X = R * M
+        return M.T @ M, X.T @ M, (X * R).T @ M, X.T @ X
+
+    def _rebuild(self):
+        self._sums = self._terms(self._R, self._M)
+        self._pushes = 0
+
+    def _push(self, date: pd.Timestamp, r: np.ndarray, m: np.ndarray):
+        full = len(self.dates) >= self.window
+        old = (self._R[:1], self._M[:1])
+        drop = 1 if full else 0
+        self._R = np.vstack([self._R[drop:], r[None]])
+        self._M = np.vstack([self._M[drop:], m[None]])
+        self.dates = self.dates[drop:] + [date]
+        self._pushes += 1
+        if self._pushes >= self.window:
+            self._rebuild()
+            return
+        for s, add in zip(self._sums, self._terms(r[None], m[None])):
+            s += add
+        if full:
+            for s, sub in zip(self._sums, self._terms(*old)):
+                s -= sub
+
+    # ── Updates ──────────────────────────────────────────────────────────────
+    def update(self, symbols: List[str], force: bool = False) -> bool:
+        """Bring the window up to the latest completed session in the store.
+        Returns True when the published matrix changed."""
+        with self._lock:
+            if not force and time.time() - self._checked < CORR_CHECK and self._corr is not None:
+                return False
+            self._checked = time.time()
+            from ohlcv_panel import Panel
+            since = pd.Timestamp.now().normalize() - pd.Timedelta(days=self.window * 2 + 30)
+            p = Panel.from_frames(self.store.read_many(sorted(set(symbols)), since, min_bars=2))
+            T = _completed(p.dates)
+            if len(p) < 2 or T < 2:
+                return False
+            with np.errstate(all="ignore"):
+                rets = np.log(p.close[:, 1:T] / p.close[:, :T - 1]).T      # (T-1) × N
+            ok = np.isfinite(rets)
+            dates = list(p.dates[1:T])
+            if p.symbols == self.symbols and self.dates and self.dates[-1] in dates:
+                k = dates.index(self.dates[-1]) + 1
+                if k == len(dates):
+                    return False
+                for t in range(k, len(dates)):
+                    self._push(dates[t], np.where(ok[t], rets[t], 0.0), ok[t].astype(np.float64))
+            else:
+                self.symbols, self._pos = list(p.symbols), {s: i for i, s in enumerate(p.symbols)}
+                self.dates = dates[-self.window:]
+                self._R = np.where(ok, rets, 0.0)[-self.window:]
+                self._M = ok.astype(np.float64)[-self.window:]
+                self._rebuild()
+            self._publish()
+            return True
+
+    def _matrices(self) -> Tuple[np.ndarray, np.ndarray]:
+        n, sx, sxx, sxy = self._sums
+        with np.errstate(all="ignore"):
+            cov = (sxy - sx * sx.T / n) / (n - 1)
+            var = (sxx - sx * sx / n) / (n - 1)          # symbol i's variance over the shared days
+            corr = cov / np.sqrt(var * var.T)
+        low = n < CORR_MIN_OBS
+        corr[low], cov[low] = np.nan, np.nan
+        np.fill_diagonal(corr, np.where(np.diag(low), np.nan, 1.0))
+        return np.clip(corr, -1.0, 1.0), cov
+
+    def _publish(self):
+        corr, cov = self._matrices()
+        N = len(self.symbols)
+        shm = None
+        try:
+            from multiprocessing import shared_memory
+            name = f"{SHM_PREFIX}_{os.getpid()}_{int(time.time() * 1000) % 10 ** 9}"
+            shm = shared_memory.SharedMemory(name=name, create=True, size=max(1, 2 * N * N * 4))
+            buf = np.ndarray((2, N, N), dtype=np.float32, buffer=shm.buf)
+        except Exception:
+            buf = np.empty((2, N, N), dtype=np.float32)
+        buf[0], buf[1] = corr, cov
+        old, self._shm, self._corr = self._shm, shm, buf
+        if shm is not None:
+            self._write_meta(shm.name, N)
+        if old is not None:
+            old.unlink()
+            try:
+                old.close()
+            except BufferError:
+                pass      # a reader still holds a view; the mapping goes when it does
+
+    def _write_meta(self, name: str, n: int):
+        meta = {"shm": name, "shape": [2, n, n], "dtype": "float32", "symbols": self.symbols,
+                "as_of": self.dates[-1].date().isoformat(), "window": self.window, "pid": os.getpid()}
+        try:
+            os.makedirs(os.path.dirname(self.meta), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.meta), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(meta, fh)
+            os.replace(tmp, self.meta)
+        except OSError:
+            pass
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+    @property
+    def corr(self) -> Optional[np.ndarray]:
+        return None if self._corr is None else self._corr[0]
+
+    @property
+    def cov(self) -> Optional[np.ndarray]:
+        return None if self._corr is None else self._corr[1]
+
+    def index(self, sym: str) -> Optional[int]:
+        return self._pos.get(sym)
+
+    def pair(self, a: str, b: str) -> float:
+        i, j = self._pos.get(a), self._pos.get(b)
+        if self._corr is None or i is None or j is None:
+            return float("nan")
+        return float(self._corr[0, i, j])
+
+    def stats(self) -> Dict:
+        return {"symbols": len(self.symbols), "window": self.window,
+                "as_of": self.dates[-1].date().isoformat() if self.dates else None,
+                "shared_memory": self._shm.name if self._shm is not None else None}
+
+
+def attach(meta: Optional[str] = None) -> Optional[Tuple[List[str], np.ndarray, object]]:
+    """Map the newest published matrix read-only from another process:
+    (symbols, (2, N, N) float32 array [corr, cov], handle to keep alive)."""
+    meta = meta or os.path.join(DATA_DIR, "correlation.json")
+    try:
+        with open(meta, "r", encoding="utf-8") as fh:
+            m = json.load(fh)
+        from multiprocessing import resource_tracker, shared_memory
+        shm = shared_memory.SharedMemory(name=m["shm"])
+        if m.get("pid") != os.getpid():
+            try:
+                # the publisher owns the segment; don't let this process's tracker unlink it
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+    except Exception:
+        return None
+    arr = np.ndarray(tuple(m["shape"]), dtype=np.float32, buffer=shm.buf)
+    arr.flags.writeable = False
+    return m["symbols"], arr, shm
+
+
+# ── Correlated signals ────────────────────────────────────────────────────────
+def annotate(signals: List[Dict], matrix: CorrelationMatrix, key=lambda s: s,
+             threshold: float = CORR_THRESHOLD) -> Tuple[List[Dict], List[Dict]]:
+    """Group same-direction signals on correlated names. Signals are taken in
+    order (strongest first); one whose symbol correlates ≥ threshold with an
+    earlier group leader of the same direction joins that group and gets
+    `correlated_with` / `correlation`. `key` maps a signal's symbol to the
+    matrix's. Returns (signals, [{leader, signal, members}] groups of 2+)."""
+    if matrix.corr is None:
+        return signals, []
+    corr = matrix.corr
+    leaders: Dict[str, Tuple[List[int], List[Dict]]] = {}    # direction → (matrix rows, groups)
+    out = []
+    for sig in signals:
+        i = matrix.index(key(sig["symbol"]))
+        if i is None:
+            out.append(sig)
+            continue
+        rows, groups = leaders.setdefault(sig["signal"], ([], []))
+        if i in rows:
+            # another algorithm on a leader's own symbol: not a correlated name
+            out.append(sig)
+            continue
+        best = None
+        if rows:
+            c = corr[i, rows]
+            k = int(np.nanargmax(c)) if np.isfinite(c).any() else -1
+            if k >= 0 and c[k] >= threshold:
+                best = k
+        if best is None:
+            rows.append(i)
+            groups.append({"leader": sig["symbol"], "signal": sig["signal"], "members": []})
+            out.append(sig)
+        else:
+            g = groups[best]
+            g["members"].append(sig["symbol"])
+            out.append({**sig, "correlated_with": g["leader"], "correlation": round(float(corr[i, rows[best]]), 3)})
+    clusters = [g for _, gs in leaders.values() for g in gs if g["members"]]
+    return out, clusters
@@ -0,0 +1,120 @@
+"""
+FinOS Fundamentals Snapshot — persisted yfinance `.info` subset per symbol
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from ohlcv_store import DATA_DIR
+
+# Only what the long-term algorithms read; keeps the snapshot file small
+INFO_FIELDS = (
+    "returnOnEquity", "debtToEquity", "trailingPE", "forwardPE",
+    "earningsGrowth", "revenueGrowth", "dividendYield",
+    "currentPrice", "regularMarketPrice", "sector", "industry",
+)
+TTL = 7 * 86400          # per-symbol refresh age; fundamentals move quarterly
+REFRESH_WORKERS = 8
+SAVE_EVERY = 50          # fetched symbols per snapshot save during a refresh
+COLD_WAIT = 20           # s a scan may block when the snapshot is empty
+
+
+class FundamentalsStore:
+    """{sym: {"t": refreshed_at, "info": {...}}} in one JSON file.
+
+    Scans only ever read the snapshot. `refresh_async` tops it up in a single
+    background thread, fetching stale or missing symbols in parallel and saving
+    every SAVE_EVERY results, so a cold start's first batches are readable
+    while the rest download.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(DATA_DIR, "fundamentals.json")
+        self._snap: Dict[str, Dict] = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                self._snap = json.load(fh)
+            self._mtime = mtime
+        except Exception:
+            pass
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(self._snap, fh)
+        os.replace(tmp, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """{sym: info} for every symbol ever fetched."""
+        with self._lock:
+            self._reload()
+            return {s: e["info"] for s, e in self._snap.items()}
+
+    def stale(self, symbols: List[str], max_age: float = TTL) -> List[str]:
+        now = time.time()
+        with self._lock:
+            self._reload()
+            return [s for s in symbols if now - self._snap.get(s, {}).get("t", 0) >= max_age]
+
+    def refresh(self, symbols: List[str], max_age: float = TTL) -> int:
+        """Fetch stale symbols in parallel and persist. Returns how many were updated."""
+        todo = self.stale(symbols, max_age)
+        if not todo:
+            return 0
+        n, batch = 0, {}
+        with ThreadPoolExecutor(max_workers=REFRESH_WORKERS) as pool:
+            futs = {pool.submit(_fetch_info, sym): sym for sym in todo}
+            for f in as_completed(futs):
+                info = f.result()
+                if info:
+                    batch[futs[f]] = {"t": time.time(), "info": info}
+                if len(batch) >= SAVE_EVERY:
+                    n += self._merge(batch)
+                    batch = {}
+        return n + self._merge(batch)
+
+    def _merge(self, batch: Dict[str, Dict]) -> int:
+        if not batch:
+            return 0
+        with self._lock:
+            self._reload()
+            self._snap.update(batch)
+            self._save()
+        return len(batch)
+
+    def refresh_async(self, symbols: List[str], max_age: float = TTL) -> threading.Thread:
+        """Start (or return the already running) background refresh."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.refresh, args=(list(symbols), max_age),
+                                                name="fundamentals-refresh", daemon=True)
+                self._thread.start()
+            return self._thread
+
+
+def _fetch_info(sym: str) -> Optional[Dict]:
+    try:
+        info = yf.Ticker(sym).info
+    except Exception:
+        return None
+    if not info:
+        return None
+    return {k: info.get(k) for k in INFO_FIELDS}
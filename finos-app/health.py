@@ -0,0 +1,107 @@
+"""
+FinOS Symbol Health — negative cache for symbols the upstream no longer serves
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from ohlcv_store import DATA_DIR
+
+HEALTH_STRIKES = 3          # consecutive bad fetches before a symbol is quarantined
+STRIKE_GAP = 300            # s; bad fetches closer together (retries, two intervals) count once
+RECHECK_BASE = 86400        # first quarantine (s); every failed re-check doubles it
+RECHECK_MAX = 30 * 86400
+
+
+class SymbolHealth:
+    """{sym: {"strikes", "reason", "last", "until", "interval"}} in one JSON file,
+    for symbols whose latest fetches failed ("error") or came back without bars
+    ("empty") — delisted or renamed tickers that still sit in a symbol list.
+
+    After HEALTH_STRIKES bad fetches in a row a symbol is quarantined for
+    RECHECK_BASE s; when that runs out it is fetched once more, and another bad
+    result doubles the quarantine (up to RECHECK_MAX). Any good fetch clears it.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(DATA_DIR, "symbol_health.json")
+        self._snap: Dict[str, Dict] = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                self._snap = json.load(fh)
+            self._mtime = mtime
+        except Exception:
+            pass
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump(self._snap, fh)
+        os.replace(tmp, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def record(self, ok: Iterable[str], bad: Dict[str, str]):
+        """Fold in one fetch run: symbols that returned bars, and {sym: reason}
+        for those that did not."""
+        now = time.time()
+        with self._lock:
+            self._reload()
+            changed = False
+            for sym in ok:
+                if self._snap.pop(sym, None) is not None:
+                    changed = True
+            for sym, reason in bad.items():
+                e = self._snap.setdefault(sym, {"strikes": 0, "last": 0.0, "until": 0.0, "interval": 0.0})
+                if now - e["last"] < STRIKE_GAP or e["until"] > now:
+                    continue
+                e["strikes"] += 1
+                e["last"], e["reason"] = now, reason
+                if e["interval"]:
+                    e["interval"] = min(e["interval"] * 2, RECHECK_MAX)
+                elif e["strikes"] >= HEALTH_STRIKES:
+                    e["interval"] = RECHECK_BASE
+                if e["interval"]:
+                    e["until"] = now + e["interval"]
+                changed = True
+            if changed:
+                self._save()
+
+    def quarantined(self) -> List[str]:
+        now = time.time()
+        with self._lock:
+            self._reload()
+            return sorted(s for s, e in self._snap.items() if e["until"] > now)
+
+    def allowed(self, symbols: List[str]) -> List[str]:
+        """`symbols` minus the quarantined ones, order kept."""
+        out = set(self.quarantined())
+        return [s for s in symbols if s not in out] if out else list(symbols)
+
+    def report(self) -> List[Dict]:
+        """Every symbol with recent bad fetches, quarantined ones first."""
+        now = time.time()
+        with self._lock:
+            self._reload()
+            rows = [{"symbol": s, "reason": e.get("reason"), "strikes": e["strikes"],
+                     "quarantined": e["until"] > now,
+                     "recheck_in": round(max(0.0, e["until"] - now)),
+                     "interval": e["interval"]} for s, e in self._snap.items()]
+        return sorted(rows, key=lambda r: (not r["quarantined"], r["symbol"]))
+
+    def stats(self) -> Dict[str, int]:
+        rows = self.report()
+        return {"tracked": len(rows), "quarantined": sum(r["quarantined"] for r in rows)}
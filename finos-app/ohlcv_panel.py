@@ -0,0 +1,436 @@
+"""
+FinOS OHLCV Panel — universe-wide price arrays + vectorized indicator kernels
+"""
+import threading
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+O, H, L, C, V = range(len(FIELDS))
+
+
+# ── Panel ─────────────────────────────────────────────────────────────────────
+class Panel:
+    """symbols × dates × OHLCV in one contiguous float64 array.
+
+    Dates are the union calendar of every symbol. A symbol that lists after the
+    first date (or was fetched with less history) is NaN-padded on the left:
+    `valid` marks real bars, `start`/`end` index each symbol's first/last bar
+    and `n_bars` replaces the old per-symbol `len(df)` checks.
+
+    A symbol can also miss dates inside its range (a suspended session, or a
+    date only another symbol has). Windows and shifts run over each symbol's
+    own bars: `compact` closes up the gaps in a row's bars, the kernel runs
+    there and `expand` puts the result back on the shared dates (NaN
+    where the symbol has no bar). `shift` does this for lagged values.
+    """
+
+    def __init__(self, symbols: List[str], dates, data: np.ndarray):
+        self.symbols = list(symbols)
+        self.dates = pd.DatetimeIndex(dates)
+        self.data = np.ascontiguousarray(data, dtype=np.float64)
+        self.valid = ~np.isnan(self.data[:, :, C])
+        self.n_bars = self.valid.sum(axis=1)
+        T = self.data.shape[1]
+        has = self.n_bars > 0
+        if T:
+            self.start = np.where(has, self.valid.argmax(axis=1), T)
+            self.end = np.where(has, T - 1 - self.valid[:, ::-1].argmax(axis=1), -1)
+        else:
+            self.start = np.zeros(len(self.symbols), dtype=np.int64)
+            self.end = np.full(len(self.symbols), -1, dtype=np.int64)
+        self._pos = {s: i for i, s in enumerate(self.symbols)}
+        # holes: some symbol misses a date between its first and last bar
+        self._holes = bool((self.n_bars < self.end - self.start + 1).any())
+        self._cmap = None
+        self.ind = Indicators(self)
+
+    @classmethod
+    def from_frames(cls, dfs: Dict[str, pd.DataFrame]) -> "Panel":
+        """Align {sym: OHLCV df} onto one date axis."""
+        syms = [s for s, df in dfs.items() if df is not None and len(df)]
+        if not syms:
+            return cls([], pd.DatetimeIndex([]), np.empty((0, 0, len(FIELDS))))
+        dates = dfs[syms[0]].index
+        for s in syms[1:]:
+            if not dfs[s].index.equals(dates):
+                dates = dates.union(dfs[s].index)
+        data = np.full((len(syms), len(dates), len(FIELDS)), np.nan)
+        for i, s in enumerate(syms):
+            df = dfs[s]
+            src = df.columns.get_indexer(FIELDS)
+            arr = df.to_numpy(dtype=np.float64)
+            rows = slice(None) if df.index.equals(dates) else dates.get_indexer(df.index)
+            for f, j in enumerate(src):
+                if j >= 0:
+                    data[i, rows, f] = arr[:, j]
+        return cls(syms, dates, data)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, sym: str) -> bool:
+        return sym in self._pos
+
+    def index(self, sym: str) -> int:
+        return self._pos[sym]
+
+    @property
+    def open(self) -> np.ndarray:   return self.data[:, :, O]
+    @property
+    def high(self) -> np.ndarray:   return self.data[:, :, H]
+    @property
+    def low(self) -> np.ndarray:    return self.data[:, :, L]
+    @property
+    def close(self) -> np.ndarray:  return self.data[:, :, C]
+    @property
+    def volume(self) -> np.ndarray: return self.data[:, :, V]
+
+    def last(self, x: np.ndarray, lag: int = 0) -> np.ndarray:
+        """Per-symbol value `lag` bars before its last bar (== series.iloc[-1 - lag])."""
+        x = np.asarray(x, dtype=np.float64)
+        if self._holes and lag > 0:
+            slot = self.start + self.n_bars - 1 - lag
+            ok = slot >= self.start
+            pos = np.where(ok, self._compaction()[np.arange(len(self.symbols)), np.maximum(slot, 0)], -1)
+        else:
+            pos = self.end - lag
+            ok = pos >= self.start
+        out = np.full(len(self.symbols), np.nan)
+        if ok.any():
+            rows = np.flatnonzero(ok)
+            out[rows] = x[rows, pos[rows]]
+        return out
+
+    # ── Per-symbol bars ──────────────────────────────────────────────────────
+    def _compaction(self) -> np.ndarray:
+        """(symbols × dates) date index of each compacted slot, -1 for padding.
+        Row i holds its n_bars real bars in slots start[i]..start[i] + n_bars[i] - 1;
+        rows without holes map each slot to itself. Also caches the flat
+        source/target indices of the rows that do move (`compact`/`expand`)."""
+        if self._cmap is None:
+            rows, cols = np.nonzero(self.valid)
+            first = np.concatenate([[0], np.cumsum(self.n_bars)[:-1]])
+            slot = self.start[rows] + np.arange(len(rows)) - first[rows]
+            cmap = np.full(self.valid.shape, -1, dtype=np.int64)
+            cmap[rows, slot] = cols
+            moved = slot != cols
+            T = len(self.dates)
+            self._moved_rows = np.unique(rows[moved])
+            keep = np.isin(rows, self._moved_rows)
+            self._flat = (rows[keep] * T + cols[keep], rows[keep] * T + slot[keep])
+            self._cmap = cmap
+        return self._cmap
+
+    def _move(self, x, src: int) -> np.ndarray:
+        x = np.array(x, dtype=np.float64)
+        if not self._holes:
+            return x
+        self._compaction()
+        out = x.copy()
+        out[self._moved_rows] = np.nan
+        out.reshape(-1)[self._flat[1 - src]] = x.reshape(-1)[self._flat[src]]
+        return out
+
+    def compact(self, x) -> np.ndarray:
+        """Each symbol's values at its own bars, gaps closed up from its first bar
+        (NaN after its last)."""
+        return self._move(x, 0)
+
+    def expand(self, x) -> np.ndarray:
+        """Inverse of `compact`: back onto the shared dates, NaN where a symbol has no bar."""
+        return self._move(x, 1)
+
+    def shift(self, x, k: int = 1) -> np.ndarray:
+        """`shift` over each symbol's own bars (== series.shift(k))."""
+        return self.expand(shift(self.compact(x), k))
+
+    def frame(self, sym: str) -> pd.DataFrame:
+        """One symbol back as a plain OHLCV DataFrame (valid bars only)."""
+        i = self._pos[sym]
+        df = pd.DataFrame(self.data[i], index=self.dates, columns=list(FIELDS))
+        return df[self.valid[i]]
+
+    def frames(self) -> Dict[str, pd.DataFrame]:
+        return {s: self.frame(s) for s in self.symbols}
+
+    def resample(self, rule: str) -> "Panel":
+        """The same symbols on a coarser timeframe (see RESAMPLE_BASE)."""
+        return resample(self, rule)
+
+
+# ── Resampling ────────────────────────────────────────────────────────────────
+# Coarser bars are derived from the stored base series instead of downloaded:
+# 15m/30m/1h from 5-minute bars, weekly and monthly
+# from daily bars. Intraday buckets are anchored at the NSE open (09:15 IST, so
+# the last hourly bar is 15:15–15:30) and bars outside the session are dropped;
+# weekly bars start on Monday, monthly on the 1st. Each bar is labelled with
+# its bucket's start, like yfinance. A bucket is open→close of the bars a symbol
+# actually has in it; a symbol with none in it gets a NaN bar.
+RESAMPLE_BASE = {"15m": "5m", "30m": "5m", "1h": "5m", "1wk": "1d", "1mo": "1d"}
+# Most base bars in one resampled bar, to turn a lookback into a base lookback
+BASE_FACTOR = {"15m": 3, "30m": 6, "1h": 12, "1wk": 5, "1mo": 23}
+SESSION_START = 9 * 60 + 15      # NSE cash session, minutes after midnight IST
+SESSION_END = 15 * 60 + 30
+_STEP_MINUTES = {"15m": 15, "30m": 30, "1h": 60}
+
+
+def _buckets(dates: pd.DatetimeIndex, rule: str) -> Tuple[np.ndarray, np.ndarray]:
+    """(mask of dates kept, bucket label of each kept date)."""
+    if rule not in RESAMPLE_BASE:
+        raise ValueError(f"unknown timeframe {rule!r}; expected one of {sorted(RESAMPLE_BASE)}")
+    day = dates.normalize()
+    if rule == "1wk":
+        return np.ones(len(dates), bool), (day - pd.to_timedelta(day.weekday, unit="D")).values
+    if rule == "1mo":
+        return np.ones(len(dates), bool), day.to_period("M").to_timestamp().values
+    mins = np.asarray(dates.hour * 60 + dates.minute)
+    keep = (mins >= SESSION_START) & (mins < SESSION_END)
+    step = _STEP_MINUTES[rule]
+    start = SESSION_START + (mins[keep] - SESSION_START) // step * step
+    return keep, day.values[keep] + start.astype("timedelta64[m]")
+
+
+def resample(p: "Panel", rule: str) -> "Panel":
+    """Aggregate every symbol at once: first valid open, max high, min low, last
+    valid close and summed volume per bucket (np.*.reduceat over the date axis)."""
+    keep, labels = _buckets(p.dates, rule)
+    cols = np.flatnonzero(keep)
+    if not len(p) or not len(cols):
+        return Panel(p.symbols, pd.DatetimeIndex([]), np.empty((len(p), 0, len(FIELDS))))
+    data, valid = p.data[:, cols], p.valid[:, cols]
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    pos = np.arange(len(cols))
+    first = np.minimum.reduceat(np.where(valid, pos, len(cols)), starts, axis=1)
+    last = np.maximum.reduceat(np.where(valid, pos, -1), starts, axis=1)
+    has = last >= 0
+    rows = np.arange(len(p))[:, None]
+    out = np.full((len(p), len(starts), len(FIELDS)), np.nan)
+    with np.errstate(invalid="ignore"):
+        out[:, :, O] = np.where(has, data[rows, np.minimum(first, len(cols) - 1), O], np.nan)
+        out[:, :, H] = np.fmax.reduceat(data[:, :, H], starts, axis=1)
+        out[:, :, L] = np.fmin.reduceat(data[:, :, L], starts, axis=1)
+        out[:, :, C] = np.where(has, data[rows, np.maximum(last, 0), C], np.nan)
+        out[:, :, V] = np.where(has, np.add.reduceat(np.where(valid, np.nan_to_num(data[:, :, V]), 0.0),
+                                                     starts, axis=1), np.nan)
+    out[~has] = np.nan
+    return Panel(p.symbols, labels[starts], out)
+
+
+# ── Per-scan indicator cache ──────────────────────────────────────────────────
+class Indicators:
+    """Memoized indicator arrays for one panel, keyed by (indicator, params).
+
+    Each entry holds the series for every symbol (row i == panel.symbols[i]),
+    so algorithms sharing ATR(14) or the 20-day volume mean compute it once.
+    `stats()` reports hits/misses to confirm the duplicate work is gone, and
+    the seconds spent computing entries (outermost only: ATR includes its TR).
+    Safe to share between algorithms running in threads: the first caller
+    computes an entry, concurrent callers wait for it.
+    """
+
+    def __init__(self, panel: "Panel"):
+        self.p = panel
+        self._memo: Dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.seconds = 0.0
+        self._depth = threading.local()
+
+    def _get(self, key: tuple, fn):
+        with self._lock:
+            slot = self._memo.get(key)
+            if slot is None:
+                slot = self._memo[key] = Future()
+                self.misses += 1
+                mine = True
+            else:
+                self.hits += 1
+                mine = False
+        if mine:
+            depth = getattr(self._depth, "n", 0)
+            self._depth.n = depth + 1
+            t = time.perf_counter()
+            try:
+                slot.set_result(fn())
+            except BaseException as e:
+                slot.set_exception(e)
+            finally:
+                self._depth.n = depth
+                if not depth:
+                    with self._lock:
+                        self.seconds += time.perf_counter() - t
+        return slot.result()
+
+    def field(self, name: str) -> np.ndarray:
+        return self.p.data[:, :, FIELDS.index(name)]
+
+    def bars(self, name: str) -> np.ndarray:
+        """A field compacted to each symbol's own bars (see Panel.compact)."""
+        if not self.p._holes:
+            return self.field(name)
+        return self._get(("bars", name), lambda: self.p.compact(self.field(name)))
+
+    def _per_symbol(self, key: tuple, fn, *fields: str) -> np.ndarray:
+        """fn over the compacted fields, expanded back onto the panel dates."""
+        return self._get(key, lambda: self.p.expand(fn(*(self.bars(f) for f in fields))))
+
+    def series(self, sym: str, name: str, *params) -> np.ndarray:
+        """One symbol's row of a cached indicator, e.g. series("TCS.NS", "atr", 14)."""
+        return getattr(self, name)(*params)[self.p.index(sym)]
+
+    def sma(self, p: int, field: str = "Close") -> np.ndarray:
+        return self._per_symbol(("sma", field, p), lambda x: rolling_mean(x, p), field)
+
+    def std(self, p: int, field: str = "Close") -> np.ndarray:
+        return self._per_symbol(("std", field, p), lambda x: rolling_std(x, p), field)
+
+    def ema(self, span: int, field: str = "Close") -> np.ndarray:
+        return self._per_symbol(("ema", field, span), lambda x: calc_ema(x, span), field)
+
+    def rsi(self, p: int = 14) -> np.ndarray:
+        return self._per_symbol(("rsi", p), lambda x: calc_rsi(x, p), "Close")
+
+    def _tr_bars(self) -> np.ndarray:
+        return self._get(("tr", "bars"), lambda: true_range(self.bars("High"), self.bars("Low"),
+                                                            self.bars("Close")))
+
+    def tr(self) -> np.ndarray:
+        return self._get(("tr",), lambda: self.p.expand(self._tr_bars()))
+
+    def atr(self, p: int = 14) -> np.ndarray:
+        return self._get(("atr", p), lambda: self.p.expand(rolling_mean(self._tr_bars(), p)))
+
+    def count(self) -> np.ndarray:
+        """Bars seen so far per symbol (n_bars as of each date)."""
+        return self._get(("count",), lambda: np.cumsum(self.p.valid, axis=1))
+
+    def highest(self, p: int, field: str = "Close") -> np.ndarray:
+        return self._per_symbol(("highest", field, p), lambda x: rolling_nanmax(x, p), field)
+
+    def lowest(self, p: int, field: str = "Close") -> np.ndarray:
+        return self._per_symbol(("lowest", field, p), lambda x: rolling_nanmin(x, p), field)
+
+    def bb(self, p: int = 20, std: float = 2.0):
+        m, d = self.sma(p), self.std(p)
+        return m + std * d, m, m - std * d
+
+    def keltner(self, p: int = 20, mult: float = 1.5):
+        m, a = self.ema(p), self.atr(p)
+        return m + mult * a, m, m - mult * a
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._memo),
+                "seconds": self.seconds}
+
+
+# ── Kernels (operate along the last axis: one series or a whole panel) ───────
+def shift(x, k: int = 1) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full(x.shape, np.nan)
+    T = x.shape[-1]
+    if k == 0:
+        out[...] = x
+    elif 0 < k < T:
+        out[..., k:] = x[..., :T - k]
+    elif -T < k < 0:
+        out[..., :T + k] = x[..., -k:]
+    return out
+
+def _rolling_sum(x: np.ndarray, p: int) -> np.ndarray:
+    """Window sum; NaN unless all `p` values in the window are present (pandas min_periods=p)."""
+    T = x.shape[-1]
+    out = np.full(x.shape, np.nan)
+    if p < 1 or p > T:
+        return out
+    nan = np.isnan(x)
+    pad = np.zeros(x.shape[:-1] + (1,))
+    cs = np.concatenate([pad, np.cumsum(np.where(nan, 0.0, x), axis=-1)], axis=-1)
+    cn = np.concatenate([pad, np.cumsum(~nan, axis=-1, dtype=np.float64)], axis=-1)
+    s = cs[..., p:] - cs[..., :-p]
+    n = cn[..., p:] - cn[..., :-p]
+    out[..., p - 1:] = np.where(n == p, s, np.nan)
+    return out
+
+def rolling_mean(x, p: int) -> np.ndarray:
+    return _rolling_sum(np.asarray(x, dtype=np.float64), p) / p
+
+def _row_anchor(x: np.ndarray) -> np.ndarray:
+    """Per-row minimum (0 for empty rows) — shifts data near zero before squaring."""
+    if x.shape[-1] == 0:
+        return np.zeros(x.shape[:-1] + (1,))
+    a = np.fmin.reduce(x, axis=-1, keepdims=True)
+    return np.where(np.isnan(a), 0.0, a)
+
+def rolling_std(x, p: int) -> np.ndarray:
+    """Sample std (ddof=1, like pandas). Centred per row before summing squares."""
+    x = np.asarray(x, dtype=np.float64)
+    if p < 2:
+        return np.full(x.shape, np.nan)
+    with np.errstate(all="ignore"):
+        z = x - _row_anchor(x)
+        s, s2 = _rolling_sum(z, p), _rolling_sum(z * z, p)
+        var = (s2 - s * s / p) / (p - 1)
+    return np.sqrt(np.clip(var, 0.0, None))
+
+def _rolling_extreme(x, p: int, op) -> np.ndarray:
+    """Sliding max/min in O(log p) whole-array passes (doubling windows)."""
+    m = np.asarray(x, dtype=np.float64).copy()
+    w = 1
+    while w * 2 <= p:
+        m = op(m, shift(m, w))
+        w *= 2
+    return op(m, shift(m, p - w)) if p > w else m
+
+def rolling_max(x, p: int) -> np.ndarray:
+    return _rolling_extreme(x, p, np.maximum)
+
+def rolling_min(x, p: int) -> np.ndarray:
+    return _rolling_extreme(x, p, np.minimum)
+
+def rolling_nanmax(x, p: int) -> np.ndarray:
+    """Max of the last `p` values ignoring gaps (NaN only if the whole window is)."""
+    return _rolling_extreme(x, p, np.fmax)
+
+def rolling_nanmin(x, p: int) -> np.ndarray:
+    return _rolling_extreme(x, p, np.fmin)
+
+def calc_ema(x, span: int) -> np.ndarray:
+    """EMA (adjust=False). Seeds at each row's first valid value, carries over gaps."""
+    x = np.asarray(x, dtype=np.float64)
+    a = 2.0 / (span + 1)
+    out = np.empty(x.shape)
+    prev = np.full(x.shape[:-1], np.nan)
+    for t in range(x.shape[-1]):
+        xt = x[..., t]
+        step = np.where(np.isnan(xt), prev, a * xt + (1 - a) * prev)
+        prev = np.where(np.isnan(prev), xt, step)
+        out[..., t] = prev
+    return out
+
+def calc_rsi(x, p: int = 14) -> np.ndarray:
+    d = np.diff(np.asarray(x, dtype=np.float64), axis=-1, prepend=np.nan)
+    g = rolling_mean(np.clip(d, 0, None), p)
+    l = rolling_mean(np.clip(-d, 0, None), p)
+    with np.errstate(all="ignore"):
+        return 100 - (100 / (1 + g / (l + 1e-10)))
+
+def true_range(h, l, c) -> np.ndarray:
+    h, l = np.asarray(h, dtype=np.float64), np.asarray(l, dtype=np.float64)
+    pc = shift(c, 1)
+    return np.fmax(np.fmax(h - l, np.abs(h - pc)), np.abs(l - pc))
+
+def calc_atr(h, l, c, p: int = 14) -> np.ndarray:
+    return rolling_mean(true_range(h, l, c), p)
+
+def calc_bb(x, p: int = 20, std: float = 2.0):
+    m = rolling_mean(x, p); d = rolling_std(x, p)
+    return m + std * d, m, m - std * d
+
+def calc_keltner(h, l, c, p: int = 20, mult: float = 1.5):
+    m = calc_ema(c, p); a = calc_atr(h, l, c, p)
+    return m + mult * a, m, m - mult * a
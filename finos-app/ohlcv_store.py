@@ -0,0 +1,303 @@
+"""
+FinOS OHLCV Store — persistent per-symbol daily bars with incremental append
+
+Bars are stored unadjusted, next to a per-symbol corporate-actions table
+(splits and dividends). Reads apply the actions as one cumulative factor per
+bar, computed lazily and cached until the bars or the actions change, so a
+split or dividend never rewrites stored history and appends stay a tail merge.
+"""
+import os
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, unquote
+
+from ohlcv_panel import FIELDS
+
+# Vercel only allows writes under /tmp; point FINOS_DATA_DIR elsewhere locally
+DATA_DIR = os.environ.get("FINOS_DATA_DIR", os.path.join(tempfile.gettempdir(), "finos"))
+
+# yfinance period strings → calendar days of history they cover
+PERIOD_DAYS = {
+    "5d": 7, "1mo": 31, "3mo": 93, "6mo": 186,
+    "1y": 366, "2y": 731, "5y": 1827, "10y": 3653,
+}
+
+# yfinance action columns (history(..., actions=True)): cash dividend per
+# share and split ratio (2.0 for 2:1), 0 on days without one
+ACTIONS = ("Dividends", "Stock Splits")
+
+
+class OHLCVStore:
+    """One columnar .npz per symbol: `dates` (int64 ns) + a (bars × OHLCV) float64 block.
+
+    `since` records the earliest date ever requested for the symbol, so a
+    recently listed stock isn't re-downloaded forever for "missing" history.
+    The file mtime doubles as the last-fetched time. Loaded arrays are kept in
+    memory and only re-read when the file changes.
+
+    Fetched frames are split-adjusted upstream; write/append undo that with the
+    frame's own split column, so stored bars are as traded. Splits and
+    dividends go to actions/<symbol>.npz (`dates`, `split`, `dividend`, with
+    dividends in the raw price of their ex-date). `read` returns bars adjusted
+    like yfinance's auto_adjust (prices for splits and dividends, volume for
+    splits) unless `adjust=False`. Files written before actions were tracked
+    hold already-adjusted bars, which is still right: later actions stack on.
+    """
+
+    def __init__(self, root: Optional[str] = None, interval: str = "1d"):
+        self.root = os.path.join(root or DATA_DIR, "ohlcv", interval)
+        self.daily = interval[-1] in "dk" or interval.endswith("mo")
+        self._mem: Dict[str, Dict] = {}
+        self._acts: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def path(self, sym: str) -> str:
+        return os.path.join(self.root, quote(sym, safe="") + ".npz")
+
+    def actions_path(self, sym: str) -> str:
+        return os.path.join(self.root, "actions", quote(sym, safe="") + ".npz")
+
+    def _load(self, sym: str) -> Optional[Dict]:
+        p = self.path(sym)
+        try:
+            mtime = os.path.getmtime(p)
+        except OSError:
+            return None
+        hit = self._mem.get(sym)
+        if hit and hit["mtime"] == mtime:
+            return hit
+        try:
+            with np.load(p) as z:
+                entry = {"mtime": mtime, "dates": z["dates"].view("datetime64[ns]"),
+                         "data": z["data"], "since": np.datetime64(int(z["since"]), "ns")}
+        except Exception:
+            return None
+        self._mem[sym] = entry
+        return entry
+
+    def _load_actions(self, sym: str) -> Optional[Dict]:
+        p = self.actions_path(sym)
+        try:
+            mtime = os.path.getmtime(p)
+        except OSError:
+            return None
+        hit = self._acts.get(sym)
+        if hit and hit["mtime"] == mtime:
+            return hit
+        try:
+            with np.load(p) as z:
+                entry = {"mtime": mtime, "dates": z["dates"].view("datetime64[ns]"),
+                         "split": z["split"], "dividend": z["dividend"]}
+        except Exception:
+            return None
+        self._acts[sym] = entry
+        return entry
+
+    def _atomic(self, path: str, **arrays):
+        """Atomic (tmp file + rename) so concurrent readers never see half a file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                np.savez(fh, **arrays)
+            os.replace(tmp, path)
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _save(self, sym: str, dates: np.ndarray, data: np.ndarray, since: np.datetime64):
+        with self._lock:
+            self._atomic(self.path(sym), dates=dates.astype("datetime64[ns]").view(np.int64), data=data,
+                         since=np.int64(since.astype("datetime64[ns]").view(np.int64)))
+            self._mem.pop(sym, None)
+
+    def _save_actions(self, sym: str, acts: Tuple[np.ndarray, np.ndarray, np.ndarray]):
+        """Rewrite the symbol's actions only when they changed, so the adjusted
+        frames cached against them survive ordinary appends."""
+        old = self._load_actions(sym)
+        if old is not None and len(old["dates"]) == len(acts[0]) and all(
+                np.array_equal(old[k], v) for k, v in zip(("dates", "split", "dividend"), acts)):
+            return
+        with self._lock:
+            if not len(acts[0]):
+                if old is not None:
+                    os.remove(self.actions_path(sym))
+            else:
+                self._atomic(self.actions_path(sym), dates=acts[0].astype("datetime64[ns]").view(np.int64),
+                             split=acts[1], dividend=acts[2])
+            self._acts.pop(sym, None)
+
+    def read(self, sym: str, adjust: bool = True) -> Optional[pd.DataFrame]:
+        e = self._load(sym)
+        if e is None:
+            return None
+        if "df" not in e:
+            e["df"] = pd.DataFrame(e["data"], index=pd.DatetimeIndex(e["dates"]), columns=list(FIELDS))
+        a = self._load_actions(sym) if adjust else None
+        if a is None:
+            return e["df"]
+        if e.get("adj_key") != a["mtime"]:
+            price, volume = _factors(e["dates"], e["data"][:, FIELDS.index("Close")],
+                                     a["dates"], a["split"], a["dividend"])
+            data = e["data"] * np.where(np.arange(len(FIELDS)) == FIELDS.index("Volume"),
+                                        volume[:, None], price[:, None])
+            e["adj"] = pd.DataFrame(data, index=e["df"].index, columns=list(FIELDS))
+            e["adj_key"] = a["mtime"]
+        return e["adj"]
+
+    def actions(self, sym: str) -> pd.DataFrame:
+        """The symbol's stored splits and dividends, yfinance-style columns."""
+        a = self._load_actions(sym)
+        if a is None:
+            return pd.DataFrame(columns=list(ACTIONS), index=pd.DatetimeIndex([]))
+        return pd.DataFrame({"Dividends": a["dividend"], "Stock Splits": np.where(a["split"] == 1.0, 0.0, a["split"])},
+                            index=pd.DatetimeIndex(a["dates"]))
+
+    def stat(self, sym: str) -> Optional[Dict]:
+        """{since, first, last, fetched_at} for a stored symbol, else None."""
+        e = self._load(sym)
+        if not e or not len(e["dates"]):
+            return None
+        return {"since": pd.Timestamp(e["since"]), "first": pd.Timestamp(e["dates"][0]),
+                "last": pd.Timestamp(e["dates"][-1]), "fetched_at": e["mtime"]}
+
+    def write(self, sym: str, df: pd.DataFrame, since: Optional[pd.Timestamp] = None):
+        """Replace a symbol's bars (and its actions, by the frame's action columns)."""
+        dates, data = _normalize(df, self.daily)
+        acts = _actions(df, self.daily)
+        data = _unsplit(dates, data, acts)
+        if since is None:
+            prev = self._load(sym)
+            since = prev["since"] if prev else (dates[0] if len(dates) else np.datetime64("now"))
+        self._save(sym, dates, data, np.datetime64(pd.Timestamp(since).to_datetime64()))
+        self._save_actions(sym, acts)
+
+    def append(self, sym: str, new: pd.DataFrame):
+        """Merge a tail of new bars onto stored history. Stored bars from the first
+        new date on are replaced, so a partial intraday bar gets the settled values.
+        Actions in the tail replace stored ones from the same date on."""
+        old = self._load(sym)
+        if old is None:
+            return self.write(sym, new)
+        dates, data = _normalize(new, self.daily)
+        acts = _actions(new, self.daily)
+        data = _unsplit(dates, data, acts)
+        if not len(dates):
+            return self._save(sym, old["dates"], old["data"], old["since"])
+        prev = self._load_actions(sym)
+        if prev is not None:
+            held = prev["dates"] < dates[0]
+            acts = tuple(np.concatenate([prev[k][held], v]) for k, v in zip(("dates", "split", "dividend"), acts))
+        keep = old["dates"] < dates[0]
+        dates = np.concatenate([old["dates"][keep], dates])
+        data = np.concatenate([old["data"][keep], data])
+        self._save(sym, dates, data, old["since"])
+        self._save_actions(sym, acts)
+
+    def read_many(self, symbols: List[str], since: Optional[pd.Timestamp] = None,
+                  min_bars: int = 6, adjust: bool = True) -> Dict[str, pd.DataFrame]:
+        out: Dict[str, pd.DataFrame] = {}
+        for sym in symbols:
+            df = self.read(sym, adjust)
+            if df is None:
+                continue
+            if since is not None:
+                df = df.iloc[df.index.searchsorted(since):]
+            if len(df) >= min_bars:
+                out[sym] = df
+        return out
+
+    def symbols(self) -> List[str]:
+        try:
+            return sorted(unquote(f[:-4]) for f in os.listdir(self.root) if f.endswith(".npz"))
+        except OSError:
+            return []
+
+
+def _index(index: pd.Index, daily: bool = True) -> np.ndarray:
+    """Tz-naive datetime64[ns]: daily floored to midnight, intraday in IST wall time."""
+    idx = pd.DatetimeIndex(index)
+    if idx.tz is not None:
+        idx = idx.tz_localize(None) if daily else idx.tz_convert("Asia/Kolkata").tz_localize(None)
+    if daily:
+        idx = idx.normalize()
+    return idx.values.astype("datetime64[ns]")
+
+
+def _normalize(df: pd.DataFrame, daily: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """(dates, bars × OHLCV) arrays: tz-naive, sorted, de-duplicated, all-NaN rows dropped.
+    Daily bars are floored to midnight; intraday keeps exchange-local (IST) wall time."""
+    src = df.columns.get_indexer(FIELDS)
+    raw = df.to_numpy(dtype=np.float64) if len(df.columns) else np.empty((len(df), 0))
+    data = np.full((len(df), len(FIELDS)), np.nan)
+    for f, j in enumerate(src):
+        if j >= 0:
+            data[:, f] = raw[:, j]
+    dates = _index(df.index, daily)
+    keep = ~np.isnan(data).all(axis=1)
+    dates, data = dates[keep], data[keep]
+    if len(dates) > 1 and not (dates[1:] > dates[:-1]).all():
+        # stable sort, then keep the last row of each duplicated timestamp
+        order = np.argsort(dates, kind="stable")
+        dates, data = dates[order], data[order]
+        last = np.append(dates[1:] != dates[:-1], True)
+        dates, data = dates[last], data[last]
+    return dates, data
+
+
+def _actions(df: pd.DataFrame, daily: bool = True) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(dates, split ratio, dividend) for the rows of a fetched frame that carry an
+    action, sorted; empty when the frame has no action columns. Split ratios are
+    1.0 where there is no split, and dividends are as fetched (split-adjusted)."""
+    n = len(df)
+    split = df["Stock Splits"].to_numpy(dtype=np.float64) if "Stock Splits" in df else np.ones(n)
+    div = df["Dividends"].to_numpy(dtype=np.float64) if "Dividends" in df else np.zeros(n)
+    split = np.where(np.isfinite(split) & (split > 0), split, 1.0)
+    div = np.where(np.isfinite(div) & (div > 0), div, 0.0)
+    has = (split != 1.0) | (div != 0.0)
+    dates = _index(df.index[has], daily)
+    order = np.argsort(dates, kind="stable")
+    return dates[order], split[has][order], div[has][order]
+
+
+def _later(at: np.ndarray, ratio: np.ndarray, when: np.ndarray) -> np.ndarray:
+    """Product of `ratio` over the events in sorted `at` strictly after each of `when`."""
+    tail = np.append(np.cumprod(ratio[::-1])[::-1], 1.0)
+    return tail[np.searchsorted(at, when, side="right")]
+
+
+def _unsplit(dates: np.ndarray, data: np.ndarray,
+             acts: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> np.ndarray:
+    """Undo the upstream split adjustment of freshly fetched bars: a bar before a
+    split in the frame is scaled back to the price it traded at. The frame's
+    dividends (in `acts`) are rescaled in place the same way."""
+    at, split, div = acts
+    if not (split != 1.0).any():
+        return data
+    m = _later(at, split, dates)
+    div *= _later(at, split, at)
+    vol = FIELDS.index("Volume")
+    return data * np.where(np.arange(len(FIELDS)) == vol, 1.0 / m[:, None], m[:, None])
+
+
+def _factors(dates: np.ndarray, close: np.ndarray, at: np.ndarray, split: np.ndarray,
+             div: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(price, volume) multipliers turning raw bars into adjusted ones. Each
+    action scales every bar before its ex-date: a split by 1/ratio (volume by
+    ratio), a dividend by 1 − dividend / previous close, with the previous
+    close in the ex-date's (post-split) price."""
+    i = np.searchsorted(dates, at, side="left") - 1
+    prev = np.where(i >= 0, close[np.maximum(i, 0)], np.nan)
+    with np.errstate(all="ignore"):
+        f = 1.0 / split - np.where(div > 0, div / prev, 0.0)
+    f = np.where(np.isfinite(f) & (f > 0), f, 1.0 / split)
+    return _later(at, f, dates), _later(at, split, dates)
+
+
+def period_start(period: str, today: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+    today = (today or pd.Timestamp.now()).normalize()
+    return today - pd.Timedelta(days=PERIOD_DAYS.get(period, 366))
@@ -0,0 +1,418 @@
+"""
+FinOS Online Indicators — O(1)-per-bar indicator state, serializable between scans
+
+Each object follows one series. `update(...)` commits a bar and returns the
+new value, `peek(...)` returns what update would without committing (e.g. for
+a still-forming daily bar) and `value` holds the last result. `state()` is a
+plain JSON-able dict; `restore(state)` rebuilds any indicator from it.
+Warm-up and NaN handling follow the batch kernels in ohlcv_panel, so a seeded
+indicator continues exactly where calc_ema / calc_atr / rolling_mean / ... end.
+"""
+import json
+import math
+import os
+import tempfile
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from ohlcv_panel import FIELDS, C, H, L
+
+NAN = float("nan")
+_KINDS: Dict[str, type] = {}
+
+
+def _kind(cls):
+    _KINDS[cls.__name__] = cls
+    return cls
+
+
+def restore(state: Dict) -> "Online":
+    obj = _KINDS[state["kind"]].__new__(_KINDS[state["kind"]])
+    obj._load(state)
+    return obj
+
+
+class Online:
+    # Attributes holding deques, saved as lists: name → whether the deque was
+    # created with maxlen=p (a fixed window) rather than unbounded
+    _deques: Dict[str, bool] = {}
+
+    def state(self) -> Dict:
+        d = {k: list(v) if k in self._deques else v for k, v in self.__dict__.items()}
+        d["kind"] = type(self).__name__
+        return d
+
+    def _load(self, state: Dict):
+        for k, v in state.items():
+            if k == "kind":
+                continue
+            if k in self._deques:
+                v = deque((tuple(e) if isinstance(e, list) else e for e in v),
+                          maxlen=state["p"] if self._deques[k] else None)
+            setattr(self, k, v)
+
+
+# ── Averages ──────────────────────────────────────────────────────────────────
+@_kind
+class EMA(Online):
+    """adjust=False EMA seeded at the first value; NaN bars carry the last value."""
+
+    def __init__(self, span: int):
+        self.a = 2.0 / (span + 1)
+        self.value = NAN
+
+    def peek(self, x: float) -> float:
+        if math.isnan(x):
+            return self.value
+        return x if math.isnan(self.value) else self.a * x + (1 - self.a) * self.value
+
+    def update(self, x: float) -> float:
+        self.value = self.peek(x)
+        return self.value
+
+
+@_kind
+class RollingMean(Online):
+    """Mean of the last `p` values via a running sum; NaN unless all `p` are present.
+    The sum is rebuilt from the window every `p` bars so rounding cannot drift."""
+    _deques = {"buf": True}
+
+    def __init__(self, p: int):
+        self.p = p
+        self.buf = deque(maxlen=p)
+        self.s = 0.0          # sum of non-NaN values in the window
+        self.nans = 0
+        self.k = 0
+        self.value = NAN
+
+    def _step(self, x: float):
+        """(sum, nans, full) after pushing x."""
+        s, nans = self.s, self.nans
+        if len(self.buf) == self.p:
+            old = self.buf[0]
+            if math.isnan(old):
+                nans -= 1
+            else:
+                s -= old
+        if math.isnan(x):
+            nans += 1
+        else:
+            s += x
+        return s, nans, len(self.buf) + 1 >= self.p
+
+    def peek(self, x: float) -> float:
+        s, nans, full = self._step(x)
+        return s / self.p if full and not nans else NAN
+
+    def update(self, x: float) -> float:
+        self.s, self.nans, full = self._step(x)
+        self.buf.append(x)
+        self.k += 1
+        if self.k % self.p == 0:
+            self.s = math.fsum(v for v in self.buf if not math.isnan(v))
+        self.value = self.s / self.p if full and not self.nans else NAN
+        return self.value
+
+
+@_kind
+class RollingStd(Online):
+    """Sample std (ddof=1) of the last `p` values from running sums of the
+    values and their squares, both taken about an anchor (the first value seen)
+    so squaring prices of ~1000s doesn't cancel away the variance."""
+    _deques = {"buf": True}
+
+    def __init__(self, p: int):
+        self.p = p
+        self.buf = deque(maxlen=p)
+        self.anchor = NAN
+        self.s = self.s2 = 0.0
+        self.nans = 0
+        self.k = 0
+        self.value = NAN
+
+    def _step(self, x: float):
+        s, s2, nans = self.s, self.s2, self.nans
+        anchor = x if math.isnan(self.anchor) else self.anchor
+        if len(self.buf) == self.p:
+            old = self.buf[0]
+            if math.isnan(old):
+                nans -= 1
+            else:
+                s -= old - anchor
+                s2 -= (old - anchor) ** 2
+        if math.isnan(x):
+            nans += 1
+        else:
+            s += x - anchor
+            s2 += (x - anchor) ** 2
+        return s, s2, nans, anchor, len(self.buf) + 1 >= self.p
+
+    def _std(self, s: float, s2: float, nans: int, full: bool) -> float:
+        if not full or nans or self.p < 2:
+            return NAN
+        return math.sqrt(max((s2 - s * s / self.p) / (self.p - 1), 0.0))
+
+    def peek(self, x: float) -> float:
+        s, s2, nans, _, full = self._step(x)
+        return self._std(s, s2, nans, full)
+
+    def update(self, x: float) -> float:
+        self.s, self.s2, self.nans, self.anchor, full = self._step(x)
+        self.buf.append(x)
+        self.k += 1
+        if self.k % self.p == 0:
+            vals = [v - self.anchor for v in self.buf if not math.isnan(v)]
+            self.s, self.s2 = math.fsum(vals), math.fsum(v * v for v in vals)
+        self.value = self._std(self.s, self.s2, self.nans, full)
+        return self.value
+
+
+# ── Extremes ──────────────────────────────────────────────────────────────────
+@_kind
+class RollingMax(Online):
+    """Max of the last `p` values with a monotonic deque of (bar, value): each
+    value is pushed and popped at most once. Like rolling_max, NaN while the
+    window is short or holds a NaN."""
+    _deques = {"q": False}
+    sign = 1.0
+
+    def __init__(self, p: int):
+        self.p = p
+        self.q = deque()      # (bar index, sign * value), values decreasing
+        self.i = -1           # index of the last committed bar
+        self.last_nan = -1 << 62
+        self.value = NAN
+
+    def _front(self, i: int) -> Optional[float]:
+        """Largest stored value still inside a window ending at bar i."""
+        for j, v in self.q:
+            if j > i - self.p:
+                return v
+        return None
+
+    def _result(self, m: Optional[float], i: int, last_nan: int) -> float:
+        if i + 1 < self.p or last_nan > i - self.p or m is None:
+            return NAN
+        return self.sign * m
+
+    def peek(self, x: float) -> float:
+        i = self.i + 1
+        if math.isnan(x):
+            return NAN
+        front = self._front(i)
+        m = self.sign * x if front is None else max(front, self.sign * x)
+        return self._result(m, i, self.last_nan)
+
+    def update(self, x: float) -> float:
+        self.i += 1
+        if math.isnan(x):
+            self.last_nan = self.i
+        else:
+            v = self.sign * x
+            while self.q and self.q[-1][1] <= v:
+                self.q.pop()
+            self.q.append((self.i, v))
+        while self.q and self.q[0][0] <= self.i - self.p:
+            self.q.popleft()
+        self.value = self._result(self.q[0][1] if self.q else None, self.i, self.last_nan)
+        return self.value
+
+
+@_kind
+class RollingMin(RollingMax):
+    sign = -1.0
+
+
+# ── Price indicators ──────────────────────────────────────────────────────────
+@_kind
+class ATR(Online):
+    """Mean true range over `p` bars (calc_atr); the first bar's TR is high − low."""
+
+    def __init__(self, p: int = 14):
+        self.prev_close = NAN
+        self.mean = RollingMean(p)
+        self.value = NAN
+
+    def _tr(self, h: float, l: float) -> float:
+        if math.isnan(self.prev_close):
+            return h - l
+        return max(h - l, abs(h - self.prev_close), abs(l - self.prev_close))
+
+    def peek(self, h: float, l: float, c: float) -> float:
+        return self.mean.peek(self._tr(h, l))
+
+    def update(self, h: float, l: float, c: float) -> float:
+        self.value = self.mean.update(self._tr(h, l))
+        self.prev_close = c
+        return self.value
+
+    def state(self) -> Dict:
+        return {"kind": "ATR", "prev_close": self.prev_close, "mean": self.mean.state(), "value": self.value}
+
+    def _load(self, state: Dict):
+        self.prev_close, self.value = state["prev_close"], state["value"]
+        self.mean = restore(state["mean"])
+
+
+@_kind
+class RSI(Online):
+    """Wilder RSI: average gain/loss seeded with the mean of the first `p` moves,
+    then smoothed as avg = (avg·(p−1) + move) / p. wilder=False uses plain
+    `p`-bar means instead, matching calc_rsi."""
+
+    def __init__(self, p: int = 14, wilder: bool = True):
+        self.p, self.wilder = p, wilder
+        self.prev = NAN                   # a NaN bar breaks the next move too, as in calc_rsi
+        self.n = 0                        # moves seen (Wilder seeding)
+        self.g = self.l = 0.0             # Wilder averages (sums while seeding)
+        self.gm, self.lm = (None, None) if wilder else (RollingMean(p), RollingMean(p))
+        self.value = NAN
+
+    @staticmethod
+    def _rsi(g: float, l: float) -> float:
+        return 100 - (100 / (1 + g / (l + 1e-10)))
+
+    def _step(self, x: float):
+        """(n, g, l, value) after a move to x (Wilder)."""
+        d = x - self.prev
+        if math.isnan(d):
+            return self.n, self.g, self.l, self.value
+        up, dn = max(d, 0.0), max(-d, 0.0)
+        n = self.n + 1
+        if n < self.p:
+            return n, self.g + up, self.l + dn, NAN
+        if n == self.p:
+            g, l = (self.g + up) / self.p, (self.l + dn) / self.p
+        else:
+            g, l = (self.g * (self.p - 1) + up) / self.p, (self.l * (self.p - 1) + dn) / self.p
+        return n, g, l, self._rsi(g, l)
+
+    def peek(self, x: float) -> float:
+        if self.wilder:
+            return self._step(x)[3]
+        d = x - self.prev
+        return self._rsi(self.gm.peek(max(d, 0.0) if not math.isnan(d) else NAN),
+                         self.lm.peek(max(-d, 0.0) if not math.isnan(d) else NAN))
+
+    def update(self, x: float) -> float:
+        if self.wilder:
+            self.n, self.g, self.l, self.value = self._step(x)
+        else:
+            d = x - self.prev
+            self.value = self._rsi(self.gm.update(max(d, 0.0) if not math.isnan(d) else NAN),
+                                   self.lm.update(max(-d, 0.0) if not math.isnan(d) else NAN))
+        self.prev = x
+        return self.value
+
+    def state(self) -> Dict:
+        d = {k: v for k, v in self.__dict__.items() if k not in ("gm", "lm")}
+        d.update(kind="RSI", gm=self.gm and self.gm.state(), lm=self.lm and self.lm.state())
+        return d
+
+    def _load(self, state: Dict):
+        for k, v in state.items():
+            if k != "kind":
+                setattr(self, k, restore(v) if k in ("gm", "lm") and v else v)
+
+
+# ── Per-symbol banks ──────────────────────────────────────────────────────────
+def _feed(ind: Online, bar: np.ndarray, field: int = C, peek: bool = False) -> float:
+    """Drive an indicator from one OHLCV bar: ATR takes (h, l, c), others one field."""
+    fn = ind.peek if peek else ind.update
+    if isinstance(ind, ATR):
+        return fn(bar[H], bar[L], bar[C])
+    return fn(bar[field])
+
+
+class OnlineBank:
+    """{symbol: {name: indicator}} built from `spec` ({name: factory} or
+    {name: (factory, field)} for a field other than Close), advanced only by
+    bars newer than each symbol's last one and saved as one JSON file.
+
+        bank = OnlineBank({"atr10": lambda: ATR(10), "vol20": (lambda: RollingMean(20), "Volume")}, path)
+        bank.advance(sym, store.read(sym))   # first call seeds, later calls add the tail
+        bank.values(sym)                      # {"atr10": ..., "ema9": ...}
+
+    `sync` is the form for bars whose history can change under the bank (adjusted
+    prices re-scaled by a new split or dividend): it re-seeds a symbol whose last
+    seen bar is missing from, or has another close in, the bars given.
+    """
+
+    def __init__(self, spec: Dict, path: Optional[str] = None):
+        self.spec = {k: f if isinstance(f, tuple) else (f, "Close") for k, f in spec.items()}
+        self._field = {k: FIELDS.index(fld) for k, (_, fld) in self.spec.items()}
+        self.path = path
+        self._syms: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self.load()
+
+    def advance(self, sym: str, df: pd.DataFrame) -> int:
+        """Feed the bars of `df` after the last one seen for `sym`. Returns how many."""
+        return self.feed(sym, df.index.values, df.reindex(columns=list(FIELDS)).to_numpy(dtype=np.float64))
+
+    def feed(self, sym: str, dates: np.ndarray, bars: np.ndarray) -> int:
+        """`advance` for datetime64 `dates` and their (len(dates), FIELDS) bar rows."""
+        entry = self._syms.get(sym)
+        if entry is None:
+            entry = self._syms[sym] = {"last": None, "close": NAN,
+                                       "ind": {k: f() for k, (f, _) in self.spec.items()}}
+        if entry["last"] is not None:
+            k = int(np.searchsorted(dates, np.datetime64(entry["last"], "ns"), side="right"))
+            dates, bars = dates[k:], bars[k:]
+        if not len(dates):
+            return 0
+        for bar in bars:
+            for k, ind in entry["ind"].items():
+                _feed(ind, bar, self._field[k])
+        entry["last"], entry["close"] = str(np.datetime_as_string(dates[-1], unit="s")), float(bars[-1, C])
+        return len(dates)
+
+    def sync(self, sym: str, dates: np.ndarray, bars: np.ndarray) -> int:
+        """`feed`, re-seeding `sym` from `bars` when its state doesn't continue them."""
+        entry = self._syms.get(sym)
+        if entry is not None and entry["last"] is not None:
+            t = np.datetime64(entry["last"], "ns")
+            k = int(np.searchsorted(dates, t))
+            if k == len(dates) or dates[k] != t or not abs(bars[k, C] - entry["close"]) <= 1e-9 * abs(bars[k, C]):
+                del self._syms[sym]
+        return self.feed(sym, dates, bars)
+
+    def values(self, sym: str) -> Dict[str, float]:
+        entry = self._syms.get(sym)
+        return {k: ind.value for k, ind in entry["ind"].items()} if entry else {}
+
+    def peek(self, sym: str, bar) -> Dict[str, float]:
+        """Indicator values if `bar` (Open, High, Low, Close, Volume) were the next bar."""
+        entry = self._syms.get(sym)
+        bar = np.asarray(bar, dtype=np.float64)
+        return {k: _feed(ind, bar, self._field[k], peek=True) for k, ind in entry["ind"].items()} if entry else {}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {s: {"last": e["last"], "close": e.get("close", NAN),
+                        "ind": {k: i.state() for k, i in e["ind"].items()}}
+                    for s, e in self._syms.items()}
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(data, fh)
+            os.replace(tmp, self.path)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except Exception:
+            return
+        with self._lock:
+            # Indicators not in the current spec are dropped; new ones re-seed the symbol
+            self._syms = {s: {"last": e["last"], "close": e.get("close", NAN),
+                              "ind": {k: restore(v) for k, v in e["ind"].items()}}
+                          for s, e in data.items() if set(e["ind"]) == set(self.spec)}
@@ -0,0 +1,206 @@
+"""
+FinOS Pairs — Engle–Granger cointegration and spread z-scores within industries
+
+Candidate pairs are every two names of one industry group (the most liquid
+PAIRS_GROUP_MAX of it) among the liquid tiers. For each pair the log prices of
+the last PAIRS_WINDOW completed sessions are regressed on each other (both
+ways; the stronger direction is kept) and the residual spread gets an ADF test
+(one lag), an AR(1) half-life and the z-score of its latest value.
+
+The tests run in batches on a process pool. The log-price matrix goes to the
+workers once, through POSIX shared memory they map read-only; tasks carry only
+row indices. Without shared memory or a pool the batches run in-process.
+Results are cached per last completed session, so they change with the next
+daily bar.
+"""
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from correlation import _completed
+from ohlcv_panel import Panel
+from ohlcv_store import OHLCVStore, period_start
+
+PAIRS_WINDOW = 240        # sessions of log prices tested
+PAIRS_TIER = 2            # universe tiers paired
+PAIRS_GROUP_MAX = 30      # names per industry group (most liquid first)
+PAIRS_BATCH = 500         # pairs per pool task
+PAIRS_WORKERS = min(4, os.cpu_count() or 1)
+PAIRS_CHECK = 900         # s between checks of the store for a new session
+PAIRS_Z = 2.0             # |z| of the spread that makes a pair a trade
+HALF_LIFE = (1.0, 30.0)   # sessions; slower spreads don't revert within a swing
+# Engle–Granger critical values of the ADF t on residuals, two series with a
+# constant (MacKinnon 2010, asymptotic)
+EG_CRIT = (("1%", -3.90), ("5%", -3.34))
+
+
+# ── Tests (vectorized over pairs) ────────────────────────────────────────────
+def engle_granger(Y: np.ndarray, X: np.ndarray) -> np.ndarray:
+    """Rows of Y regressed on the same rows of X: (5, pairs) of ADF t-stat,
+    hedge ratio, intercept, half-life and latest z-score of the residuals."""
+    xm, ym = X.mean(axis=1, keepdims=True), Y.mean(axis=1, keepdims=True)
+    xd, yd = X - xm, Y - ym
+    with np.errstate(all="ignore"):
+        b = (xd * yd).sum(axis=1) / (xd * xd).sum(axis=1)
+        e = yd - b[:, None] * xd                   # spread, mean zero
+        de = np.diff(e, axis=1)
+        # ADF: Δe_t = γ e_{t-1} + φ Δe_{t-1}, no constant (e is demeaned)
+        dy, x1, x2 = de[:, 1:], e[:, 1:-1], de[:, :-1]
+        s11, s22, s12 = (x1 * x1).sum(axis=1), (x2 * x2).sum(axis=1), (x1 * x2).sum(axis=1)
+        r1, r2 = (x1 * dy).sum(axis=1), (x2 * dy).sum(axis=1)
+        det = s11 * s22 - s12 * s12
+        g, phi = (s22 * r1 - s12 * r2) / det, (s11 * r2 - s12 * r1) / det
+        ssr = ((dy - g[:, None] * x1 - phi[:, None] * x2) ** 2).sum(axis=1)
+        t = g / np.sqrt(ssr / (dy.shape[1] - 2) * s22 / det)
+        # half-life of e_t = (1 + λ) e_{t-1}
+        lam = (e[:, :-1] * de).sum(axis=1) / (e[:, :-1] ** 2).sum(axis=1)
+        hl = np.where((lam < 0) & (lam > -1), -np.log(2) / np.log1p(lam), np.inf)
+        z = e[:, -1] / e.std(axis=1, ddof=1)
+    return np.stack([t, b, (ym - b[:, None] * xm)[:, 0], hl, z])
+
+
+def test_pairs(P: np.ndarray, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """(6, pairs): `engle_granger` in the direction with the more negative t,
+    plus 1.0 where that is right ~ left."""
+    fwd, rev = engle_granger(P[left], P[right]), engle_granger(P[right], P[left])
+    flip = np.nan_to_num(rev[0], nan=np.inf) < np.nan_to_num(fwd[0], nan=np.inf)
+    return np.vstack([np.where(flip, rev, fwd), flip.astype(np.float64)])
+
+
+# ── Process pool over shared memory ──────────────────────────────────────────
+_shared: Optional[Tuple[object, np.ndarray]] = None      # worker: (segment, read-only view)
+
+
+def _attach(name: str, shape: Tuple[int, int]):
+    global _shared
+    from multiprocessing import shared_memory
+    shm = shared_memory.SharedMemory(name=name)
+    arr = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    arr.flags.writeable = False
+    _shared = (shm, arr)
+
+
+def _shared_task(task: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    return test_pairs(_shared[1], *task)
+
+
+def _run(P: np.ndarray, tasks: List[Tuple[np.ndarray, np.ndarray]]) -> Tuple[List[np.ndarray], int]:
+    """Results per task, and how many processes ran them."""
+    if PAIRS_WORKERS < 2 or len(tasks) < 2:
+        return [test_pairs(P, *t) for t in tasks], 1
+    try:
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(create=True, size=max(1, P.nbytes))
+    except Exception:
+        return [test_pairs(P, *t) for t in tasks], 1
+    try:
+        np.ndarray(P.shape, dtype=np.float64, buffer=shm.buf)[:] = P
+        # forkserver/spawn: forking the threaded API process could copy a held lock
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        workers = min(PAIRS_WORKERS, len(tasks))
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method),
+                                 initializer=_attach, initargs=(shm.name, P.shape)) as pool:
+            return list(pool.map(_shared_task, tasks)), workers
+    except Exception:
+        return [test_pairs(P, *t) for t in tasks], 1
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+# ── Scanner ──────────────────────────────────────────────────────────────────
+def _clean(sym: str) -> str:
+    return sym.replace(".NS", "").replace(".BO", "")
+
+
+class PairScanner:
+    """Pair tests over the daily store, cached in `cache` (a scan_cache tier)
+    under pairs_<last completed session>."""
+
+    def __init__(self, store: OHLCVStore, cache):
+        self.store = store
+        self.cache = cache
+        self._last: Optional[Dict] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def log_prices(self, symbols: List[str]) -> Tuple[List[str], pd.DatetimeIndex, np.ndarray]:
+        """(symbols, sessions, N × PAIRS_WINDOW log closes) for the symbols with
+        the whole window; single missing days carry the previous close."""
+        p = Panel.from_frames(self.store.read_many(symbols, period_start("1y"), min_bars=PAIRS_WINDOW))
+        T = _completed(p.dates)
+        if len(p) < 2 or T < PAIRS_WINDOW:
+            return [], pd.DatetimeIndex([]), np.empty((0, 0))
+        c = pd.DataFrame(p.close[:, T - PAIRS_WINDOW:T].T).ffill(limit=3).to_numpy().T
+        ok = np.isfinite(c).all(axis=1) & (c > 0).all(axis=1)
+        return [s for s, k in zip(p.symbols, ok) if k], p.dates[T - PAIRS_WINDOW:T], np.log(c[ok])
+
+    def run(self, groups: Dict[str, List[str]], force: bool = False) -> Dict:
+        """Test every within-group pair. `groups` maps an industry to its symbols,
+        most liquid first."""
+        with self._lock:
+            if not force and self._last and time.time() - self._checked < PAIRS_CHECK:
+                return self._last
+            self._checked = time.time()
+            groups = {g: s[:PAIRS_GROUP_MAX] for g, s in groups.items() if len(s) >= 2}
+            syms, dates, P = self.log_prices(sorted({s for m in groups.values() for s in m}))
+            if not len(syms):
+                self._last = {"as_of": None, "window": PAIRS_WINDOW, "groups": 0, "pairs_tested": 0,
+                              "cointegrated": 0, "signals": 0, "pairs": []}
+                return self._last
+            key = f"pairs_{dates[-1].date().isoformat()}"
+            hit = None if force else self.cache.get(key)
+            if hit is not None:
+                self._last = hit[1]
+                return self._last
+            self._last = self._scan(groups, syms, dates, P)
+            self.cache.set(key, self._last, 3 * 86400)
+            return self._last
+
+    def _scan(self, groups: Dict[str, List[str]], syms: List[str], dates: pd.DatetimeIndex,
+              P: np.ndarray) -> Dict:
+        t0 = time.perf_counter()
+        pos = {s: i for i, s in enumerate(syms)}
+        left, right, label = [], [], []
+        for g, members in groups.items():
+            idx = [pos[s] for s in members if s in pos]
+            for i, j in itertools.combinations(idx, 2):
+                left.append(i)
+                right.append(j)
+                label.append(g)
+        left, right = np.array(left, dtype=np.int64), np.array(right, dtype=np.int64)
+        tasks = [(left[k:k + PAIRS_BATCH], right[k:k + PAIRS_BATCH]) for k in range(0, len(left), PAIRS_BATCH)]
+        parts, workers = _run(P, tasks)
+        res = np.hstack(parts) if parts else np.empty((6, 0))
+        t, b, a, hl, z, flip = res
+        coint = np.isfinite(t) & (t < EG_CRIT[-1][1]) & (hl >= HALF_LIFE[0]) & (hl <= HALF_LIFE[1])
+        out = []
+        for k in np.flatnonzero(coint):
+            y, x = (right[k], left[k]) if flip[k] else (left[k], right[k])
+            ys, xs = _clean(syms[y]), _clean(syms[x])
+            signal = None
+            if abs(z[k]) >= PAIRS_Z:
+                signal = f"SHORT {ys} / LONG {xs}" if z[k] > 0 else f"LONG {ys} / SHORT {xs}"
+            out.append({"y": ys, "x": xs, "group": label[k], "hedge_ratio": round(float(b[k]), 3),
+                        "adf_t": round(float(t[k]), 2),
+                        "significance": next(lvl for lvl, cv in EG_CRIT if t[k] < cv),
+                        "half_life": round(float(hl[k]), 1), "zscore": round(float(z[k]), 2),
+                        "signal": signal})
+        out.sort(key=lambda r: (r["signal"] is None, -abs(r["zscore"])))
+        return {
+            "as_of": dates[-1].date().isoformat(),
+            "window": PAIRS_WINDOW,
+            "groups": len(groups),
+            "pairs_tested": len(left),
+            "cointegrated": len(out),
+            "signals": sum(r["signal"] is not None for r in out),
+            "pairs": out,
+            "workers": workers,
+            "seconds": round(time.perf_counter() - t0, 3),
+        }
@@ -0,0 +1,198 @@
+"""
+FinOS Scan Cache — bounded result cache: in-process LRU over a shared SQLite tier
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from ohlcv_store import DATA_DIR
+
+LOCAL_SIZE = 32           # entries kept per process
+LOCAL_TTL = 60            # s a copy pulled from the shared tier is trusted locally
+SHARED_SIZE = 256         # entries kept in the shared file
+
+
+def _default(o):
+    return o.item() if hasattr(o, "item") else str(o)
+
+
+class LRUCache:
+    """Per-process tier: {key: (stored_at, expires_at, value)}, least recently
+    used entry evicted past `maxsize`, expired entries dropped on read."""
+
+    def __init__(self, maxsize: int = LOCAL_SIZE):
+        self.maxsize = maxsize
+        self._d: "OrderedDict[str, Tuple[float, float, Any]]" = OrderedDict()
+        self._leases: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        with self._lock:
+            e = self._d.get(key)
+            if e is None:
+                return None
+            if e[1] <= time.time():
+                del self._d[key]
+                return None
+            self._d.move_to_end(key)
+            return e[0], e[2]
+
+    def set(self, key: str, value: Any, ttl: float, t: Optional[float] = None):
+        t = time.time() if t is None else t
+        with self._lock:
+            self._d[key] = (t, t + ttl, value)
+            self._d.move_to_end(key)
+            while len(self._d) > self.maxsize:
+                self._d.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._d.pop(key, None)
+
+    def claim(self, key: str, owner: str, lease: float) -> bool:
+        now = time.time()
+        with self._lock:
+            held = self._leases.get(key)
+            if held and held[1] > now and held[0] != owner:
+                return False
+            self._leases[key] = (owner, now + lease)
+            return True
+
+    def release(self, key: str, owner: str):
+        with self._lock:
+            if self._leases.get(key, (None,))[0] == owner:
+                del self._leases[key]
+
+
+class SQLiteCache:
+    """Shared tier for every worker on the host: one SQLite file (WAL), values
+    stored as JSON. Expired rows and the oldest rows past `max_entries` are
+    pruned on write. Leases let one worker compute while the others wait."""
+
+    def __init__(self, path: str, max_entries: int = SHARED_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._conn() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, t REAL, expires REAL, value TEXT)")
+            db.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT, expires REAL)")
+
+    def _conn(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        e = self.entry(key)
+        return (e[0], e[2]) if e else None
+
+    def entry(self, key: str) -> Optional[Tuple[float, float, Any]]:
+        """(stored_at, expires_at, value) of an unexpired entry."""
+        with self._conn() as db:
+            row = db.execute("SELECT t, expires, value FROM entries WHERE key = ? AND expires > ?",
+                             (key, time.time())).fetchone()
+        return (row[0], row[1], json.loads(row[2])) if row else None
+
+    def set(self, key: str, value: Any, ttl: float, t: Optional[float] = None):
+        t = time.time() if t is None else t
+        blob = json.dumps(value, default=_default)
+        with self._conn() as db:
+            db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", (key, t, t + ttl, blob))
+            db.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+            db.execute("DELETE FROM entries WHERE key NOT IN "
+                       "(SELECT key FROM entries ORDER BY t DESC LIMIT ?)", (self.max_entries,))
+
+    def delete(self, key: str):
+        with self._conn() as db:
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def claim(self, key: str, owner: str, lease: float) -> bool:
+        now = time.time()
+        with self._conn() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("DELETE FROM leases WHERE key = ? AND (expires <= ? OR owner = ?)", (key, now, owner))
+                db.execute("INSERT OR IGNORE INTO leases VALUES (?, ?, ?)", (key, owner, now + lease))
+                row = db.execute("SELECT owner FROM leases WHERE key = ?", (key,)).fetchone()
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+        return bool(row) and row[0] == owner
+
+    def release(self, key: str, owner: str):
+        with self._conn() as db:
+            db.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+
+class TieredCache:
+    """Reads hit the local LRU first, then the shared tier (copying the entry
+    down with its original timestamp, for LOCAL_TTL at most and never past the
+    shared entry's expiry); writes go to both. Without a shared tier it is
+    just the LRU."""
+
+    def __init__(self, local: Optional[LRUCache] = None, shared: Optional[SQLiteCache] = None):
+        self.local = local or LRUCache()
+        self.shared = shared
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def get(self, key: str) -> Optional[Tuple[float, Any]]:
+        hit = self.local.get(key)
+        if hit is None and self.shared is not None:
+            try:
+                e = self.shared.entry(key)
+            except sqlite3.Error:
+                e = None
+            if e is not None:
+                t, expires, value = e
+                self.local.set(key, value, min(time.time() + LOCAL_TTL, expires) - t, t)
+                hit = (t, value)
+        return hit
+
+    def set(self, key: str, value: Any, ttl: float):
+        t = time.time()
+        self.local.set(key, value, ttl, t)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, ttl, t)
+            except sqlite3.Error:
+                pass
+
+    def delete(self, key: str):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def claim(self, key: str, lease: float) -> Optional[str]:
+        """A lease token when the caller should compute `key`; None while
+        another worker holds an unexpired lease on it."""
+        owner = f"{self.owner}-{uuid.uuid4().hex[:8]}"
+        if self.shared is not None:
+            try:
+                return owner if self.shared.claim(key, owner, lease) else None
+            except sqlite3.Error:
+                pass
+        return owner if self.local.claim(key, owner, lease) else None
+
+    def release(self, key: str, owner: str):
+        if self.shared is not None:
+            try:
+                self.shared.release(key, owner)
+            except sqlite3.Error:
+                pass
+        self.local.release(key, owner)
+
+
+def default_cache() -> TieredCache:
+    """FINOS_SCAN_CACHE=memory keeps results per process; otherwise (default
+    "sqlite") workers on one host share DATA_DIR/scan_cache.sqlite."""
+    if os.environ.get("FINOS_SCAN_CACHE", "sqlite") == "memory":
+        return TieredCache()
+    try:
+        return TieredCache(shared=SQLiteCache(os.path.join(DATA_DIR, "scan_cache.sqlite")))
+    except (sqlite3.Error, OSError):
+        return TieredCache()
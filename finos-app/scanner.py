@@ -2,11 +2,27 @@
 FinOS Trade Scanner — Algorithm Suite (Nifty 500 Universe)
 """
 import yfinance as yf
+import numpy as np
 import pandas as pd
 import pytz
+import threading
 import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from datetime import datetime, date
-from typing import List, Dict
+from typing import Callable, Iterator, List, Dict, Optional, Tuple
+
+from ohlcv_panel import FIELDS, RESAMPLE_BASE, BASE_FACTOR, Panel, calc_rsi, calc_atr, calc_ema, calc_bb, calc_keltner
+from ohlcv_store import OHLCVStore, period_start
+import breadth
+import correlation
+import fundamentals
+import health
+import pairs
+import scan_cache
+import strength
+import timings
+import universe
 
 # ── Nifty 500 Universe (curated, 200+ liquid stocks) ──────────────────────────
 NIFTY500 = [
@@ -80,204 +96,508 @@ NIFTY500 = [
 # De-duplicate
 NIFTY500 = list(dict.fromkeys(NIFTY500))
 
-# Batches: scan in chunks to avoid timeout; cached per day
-_scan_cache: Dict = {}
+# Finished scans, shared by every worker on the host (scan_cache.py): one entry
+# per scan type per day, plus the newest of each type for latest_scan
+SCAN_TTL = 900            # s a finished scan is served from cache
+SCAN_MAX_STALE = 3600     # s past which a stale scan is no longer served while refreshing
+SCAN_LEASE = 120          # s other workers wait on an in-flight scan before running it themselves
+LATEST_TTL = 3 * 86400
+_scan_cache = scan_cache.default_cache()
+_refreshing: set = set()          # scan types with a background refresh in this process
+_refresh_lock = threading.Lock()
 
 # ── Timeout guard ─────────────────────────────────────────────────────────────
 class TimeoutStop(Exception):
     pass
 
 # ── Indicators ────────────────────────────────────────────────────────────────
-def calc_rsi(s: pd.Series, p: int = 14) -> pd.Series:
-    d = s.diff()
-    g = d.clip(lower=0).rolling(p).mean()
-    l = (-d.clip(upper=0)).rolling(p).mean()
-    return 100 - (100 / (1 + g / (l + 1e-10)))
+# Kernels live in ohlcv_panel and run along the last axis, so the same call
+# computes one series or the whole universe (symbols × dates) in one pass.
+# Algorithms go through `panel.ind`, which memoizes them for the whole scan.
 
-def calc_atr(h, l, c, p: int = 14) -> pd.Series:
-    tr = pd.concat([h - l, (h - c.shift()).abs(), (l - c.shift()).abs()], axis=1).max(axis=1)
-    return tr.rolling(p).mean()
+def _clean(sym: str) -> str:
+    return sym.replace(".NS", "").replace(".BO", "")
 
-def calc_ema(s: pd.Series, span: int) -> pd.Series:
-    return s.ewm(span=span, adjust=False).mean()
+# ── Batch download with chunk splitting ─────────────────────────────────────
+# Bars live in a local store per interval (ohlcv_store); the network is only
+# asked for symbols we've never seen or whose stored history is too short, plus
+# the bars after each symbol's last stored date. Daily bars refresh at most every
+# STORE_TTL s, 5-minute bars every INTRADAY_TTL s.
+STORE_TTL = 900
+INTRADAY_TTL = 300
+_stores: Dict[str, OHLCVStore] = {}
 
-def calc_bb(s: pd.Series, p: int = 20, std: float = 2.0):
-    m = s.rolling(p).mean(); d = s.rolling(p).std()
-    return m + std * d, m, m - std * d
+def _store_for(interval: str) -> OHLCVStore:
+    if interval not in _stores:
+        _stores[interval] = OHLCVStore(interval=interval)
+    return _stores[interval]
 
-def calc_keltner(h, l, c, p: int = 20, mult: float = 1.5):
-    m = calc_ema(c, p); a = calc_atr(h, l, c, p)
-    return m + mult * a, m, m - mult * a
+_store = _store_for("1d")
+_fundamentals = fundamentals.FundamentalsStore()
+# Symbols that keep failing or coming back empty (delisted, renamed) are
+# quarantined with growing re-check intervals and left out of the universe
+_health = health.SymbolHealth()
+_universe = universe.Universe(_store, NIFTY500, _health)
+_corr = correlation.CorrelationMatrix(_store)
+_breadth = breadth.Breadth()
+_pairs = pairs.PairScanner(_store, _scan_cache)
 
-def _clean(sym: str) -> str:
-    return sym.replace(".NS", "").replace(".BO", "")
+# ── Concurrent chunk fetcher ──────────────────────────────────────────────────
+# Up to FETCH_WORKERS chunks are in flight at once, each fetching FETCH_THREADS
+# symbols in parallel. A chunk attempt that errors or overruns its timeout is
+# split in half and retried with exponential backoff; symbols still missing
+# after FETCH_RETRIES, or when FETCH_BUDGET runs out, are reported as failed.
+# (Chunks use Ticker.history directly: the pinned yf.download keeps its results
+# in module globals, so two overlapping calls would clobber each other.)
+FETCH_WORKERS = 4
+FETCH_THREADS = 10
+FETCH_TIMEOUT = 10          # per-request socket timeout (s)
+FETCH_CHUNK_TIMEOUT = 20    # wall time allowed for one chunk attempt (s)
+FETCH_RETRIES = 2
+FETCH_BACKOFF = 0.5         # first retry delay (s), doubled each attempt
+FETCH_BUDGET = 45           # whole fetch, under Vercel's 60s maxDuration
 
-# ── Batch download with chunk splitting ─────────────────────────────────────
-def _batch(symbols: List[str], period: str = "1y", chunk: int = 50) -> Dict[str, pd.DataFrame]:
-    """Download symbols in chunks and merge. Returns {sym: OHLCV df}."""
+def _history(sym: str, min_bars: int, interval: str = "1d", **kw) -> Optional[pd.DataFrame]:
+    # Unadjusted bars plus the Dividends / Stock Splits columns: the store keeps
+    # raw bars and applies corporate actions itself on read
+    df = yf.Ticker(sym).history(interval=interval, auto_adjust=False, actions=True,
+                                timeout=FETCH_TIMEOUT, **kw)
+    df = df.dropna(how="all", subset=[c for c in FIELDS if c in df])
+    return df if len(df) >= min_bars else None
+
+def _download(batch: List[str], min_bars: int = 6, delay: float = 0.0,
+              timeout: float = FETCH_CHUNK_TIMEOUT, **kw) -> Tuple[Dict[str, pd.DataFrame], bool]:
+    """Fetch one chunk. Returns ({sym: OHLCV df}, ok) — ok is False when the
+    attempt errored or timed out rather than the upstream simply having no data."""
+    if delay:
+        time.sleep(delay)
     result: Dict[str, pd.DataFrame] = {}
-    for i in range(0, len(symbols), chunk):
-        batch = symbols[i: i + chunk]
+    ok = True
+    pool = ThreadPoolExecutor(max_workers=min(FETCH_THREADS, len(batch)))
+    futs = {pool.submit(_history, sym, min_bars, **kw): sym for sym in batch}
+    done, pending = wait(futs, timeout=timeout)
+    for f in done:
         try:
-            raw = yf.download(batch, period=period, interval="1d",
-                              auto_adjust=True, progress=False, threads=True)
-            if isinstance(raw.columns, pd.MultiIndex):
-                for sym in batch:
-                    try:
-                        df = raw.xs(sym, axis=1, level=1).dropna(how="all")
-                        if len(df) > 5:
-                            result[sym] = df
-                    except Exception:
-                        pass
-            else:
-                if len(batch) == 1 and len(raw) > 5:
-                    result[batch[0]] = raw.dropna(how="all")
+            df = f.result()
+            if df is not None:
+                result[futs[f]] = df
         except Exception:
-            pass
-    return result
+            ok = False
+    pool.shutdown(wait=False, cancel_futures=True)
+    return result, ok and not pending
+
+def _fetch_iter(jobs: List[Tuple[List[str], Dict]], chunk: int = 50,
+                tm: Optional[timings.ScanTimings] = None) -> Iterator[Tuple[Dict[str, pd.DataFrame], List[str]]]:
+    """Run (symbols, download kwargs) jobs as chunks on a bounded pool, yielding
+    ({sym: OHLCV df}, failed symbols) as each chunk attempt completes. Each
+    attempt's latency, bars and decoded size are recorded in `tm` if given.
+    Symbols that exhaust their retries count against their health; an error
+    only does when something else was fetched (not a wholesale outage)."""
+    failed: List[str] = []
+    fetched: set = set()
+    empty: set = set()          # missing from an attempt that otherwise went through
+    gave_up: List[str] = []
+    deadline = time.monotonic() + FETCH_BUDGET
+    pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+    pending: Dict = {}
+
+    def submit(batch: List[str], kw: Dict, attempt: int):
+        delay = FETCH_BACKOFF * 2 ** (attempt - 1) if attempt else 0.0
+        left = deadline - time.monotonic() - delay
+        if left <= 0:
+            failed.extend(batch)
+            return
+        f = pool.submit(_download, batch, delay=delay, timeout=min(FETCH_CHUNK_TIMEOUT, left), **kw)
+        pending[f] = (batch, kw, attempt, time.monotonic() + delay)
+
+    for symbols, kw in jobs:
+        for i in range(0, len(symbols), chunk):
+            submit(symbols[i: i + chunk], kw, 0)
+
+    try:
+        while pending:
+            done, _ = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for f in done:
+                batch, kw, attempt, started = pending.pop(f)
+                try:
+                    got, ok = f.result()
+                except Exception:
+                    got, ok = {}, False
+                if tm is not None:
+                    tm.chunk(kw.get("interval", "1d"), len(batch), len(got), time.monotonic() - started,
+                             sum(len(df) for df in got.values()),
+                             int(sum(df.memory_usage(index=True).sum() for df in got.values())), attempt)
+                missing = [s for s in batch if s not in got]
+                fetched.update(got)
+                if ok:
+                    empty.update(missing)
+                if missing and attempt >= FETCH_RETRIES:
+                    failed.extend(missing)
+                    gave_up.extend(missing)
+                elif missing and not ok and len(missing) > 1:
+                    half = (len(missing) + 1) // 2
+                    submit(missing[:half], kw, attempt + 1)
+                    submit(missing[half:], kw, attempt + 1)
+                elif missing:
+                    submit(missing, kw, attempt + 1)
+                if got or failed:
+                    yield got, failed
+                    failed = []
+
+        for batch, *_ in pending.values():
+            failed.extend(batch)
+        if failed:
+            yield {}, failed
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        bad = {s: "empty" if s in empty else "error" for s in gave_up}
+        _health.record(fetched, {s: r for s, r in bad.items() if r == "empty" or fetched})
+
+def _fetch(jobs: List[Tuple[List[str], Dict]], chunk: int = 50) -> Tuple[Dict[str, pd.DataFrame], List[str]]:
+    """All of `_fetch_iter` at once: ({sym: OHLCV df}, failed symbols)."""
+    result: Dict[str, pd.DataFrame] = {}
+    failed: List[str] = []
+    for got, bad in _fetch_iter(jobs, chunk):
+        result.update(got)
+        failed.extend(bad)
+    return result, failed
+
+def _stage(tm: Optional[timings.ScanTimings], name: str):
+    return tm.stage(name) if tm is not None else nullcontext()
+
+def _timed(fn, *args):
+    """(fn(*args), wall s, CPU s of this thread)."""
+    t, cpu = time.perf_counter(), time.thread_time()
+    out = fn(*args)
+    return out, time.perf_counter() - t, time.thread_time() - cpu
+
+def _batch_iter(symbols: List[str], period: str = "1y", chunk: int = 50,
+                failed: Optional[List[str]] = None, interval: str = "1d",
+                ttl: Optional[float] = None,
+                tm: Optional[timings.ScanTimings] = None) -> Iterator[Dict[str, pd.DataFrame]]:
+    """Bars for `symbols` over `period`, served from the local store.
+    Downloads in chunks only what the store is missing, yielding {sym: OHLCV df}
+    first for the symbols already fresh in the store, then once per fetched
+    chunk. Symbols that could not be fetched are appended to `failed` if given."""
+    store = _store_for(interval)
+    ttl = STORE_TTL if ttl is None else ttl
+    since = period_start(period)
+    full: List[str] = []
+    incr: Dict[pd.Timestamp, List[str]] = {}
+    now = time.time()
+    for sym in symbols:
+        st = store.stat(sym)
+        if st is None or st["since"] > since:
+            full.append(sym)
+        elif now - st["fetched_at"] >= ttl:
+            # Re-fetch from the day of the last stored bar: it may have been a partial one
+            incr.setdefault(st["last"].normalize(), []).append(sym)
+
+    stale = set(full).union(*incr.values())
+    with _stage(tm, "store_read"):
+        fresh = store.read_many([s for s in symbols if s not in stale], since)
+    if fresh:
+        yield fresh
+
+    jobs = [(full, {"period": period, "interval": interval})] if full else []
+    jobs += [(syms, {"start": day.strftime("%Y-%m-%d"), "interval": interval, "min_bars": 1})
+             for day, syms in incr.items()]
+    full = set(full)
+    for got, bad in _fetch_iter(jobs, chunk, tm):
+        with _stage(tm, "store_write"):
+            for sym, df in got.items():
+                if sym in full:
+                    store.write(sym, df, since=since)
+                else:
+                    store.append(sym, df)
+        if failed is not None:
+            failed.extend(bad)
+        # A failed incremental refresh still has its older stored bars
+        with _stage(tm, "store_read"):
+            part = store.read_many([s for s in symbols if s in got or (s in bad and s not in full)], since)
+        if part:
+            yield part
+
+def _batch(symbols: List[str], period: str = "1y", chunk: int = 50,
+           failed: Optional[List[str]] = None, interval: str = "1d",
+           ttl: Optional[float] = None) -> Dict[str, pd.DataFrame]:
+    """All of `_batch_iter` at once, in `symbols` order."""
+    got: Dict[str, pd.DataFrame] = {}
+    for part in _batch_iter(symbols, period, chunk, failed, interval, ttl):
+        got.update(part)
+    return {s: got[s] for s in symbols if s in got}
+
+# ── Algorithm registry ────────────────────────────────────────────────────────
+# Each algorithm declares the scan it belongs to and the data it needs: bars of
+# lookback at an interval, the OHLCV fields it reads and the liquidity tiers of
+# the NSE universe it covers (None = every listed EQ symbol). `fetch_plan` turns the enabled algorithms of a scan
+# into the smallest set of downloads; `scan_events` runs them without knowing
+# which algorithms exist. Adding one is just a decorated function.
+# Sources: "prices" algorithms get each chunk's Panel, "fundamentals" ones the
+# snapshot, and "ranks" ones the universe-wide relative-strength ranking once
+# every chunk is in (their bars are fetched like a price algorithm's).
+# An interval in RESAMPLE_BASE (15m, 1h, 1wk, ...) is not downloaded: the
+# algorithm's panel is resampled from its base series (5m or 1d), which is
+# fetched once for every algorithm sharing it.
+class Algorithm:
+    def __init__(self, name: str, fn: Callable, scan: str, bars: int = 0, interval: str = "1d",
+                 fields: Tuple[str, ...] = FIELDS, tier: Optional[int] = None,
+                 source: str = "prices", setups: Optional[Callable] = None, hold: int = 0):
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"{name}: unknown fields {sorted(unknown)}")
+        self.name, self.fn, self.scan = name, fn, scan
+        self.bars, self.interval, self.fields = bars, interval, tuple(fields)
+        self.base = RESAMPLE_BASE.get(interval, interval)      # interval actually fetched
+        self.base_bars = bars * BASE_FACTOR.get(interval, 1) if self.base != interval else bars
+        self.tier, self.source = tier, source
+        self.setups, self.hold = setups, hold      # full-history rule + max bars held (backtest)
+        self.enabled = True
+
+    def symbols(self) -> List[str]:
+        return _universe.members(self.tier)
+
+ALGORITHMS: Dict[str, Algorithm] = {}
+ALGO_WORKERS = 4
+_algo_pool = ThreadPoolExecutor(max_workers=ALGO_WORKERS, thread_name_prefix="scan-algo")
+
+# Bars a yfinance period covers (NSE: ~250 sessions a year, 75 five-minute bars
+# a session), smallest first; a lookback gets the first period that fits it
+PERIOD_BARS = {
+    "1d": (("1mo", 21), ("3mo", 63), ("6mo", 126), ("1y", 252), ("2y", 504), ("5y", 1260)),
+    "5m": (("5d", 375), ("1mo", 1575)),
+}
+
+def algorithm(scan: str, bars: int = 0, interval: str = "1d", fields: Tuple[str, ...] = FIELDS,
+              tier: Optional[int] = None, source: str = "prices", name: Optional[str] = None,
+              setups: Optional[Callable] = None, hold: int = 0):
+    """Register `fn` as a `scan` algorithm. Price algorithms take a Panel (of at
+    least `bars` bars where the symbol has them) and return signals; those that
+    also give their `setups` rule and a `hold` horizon can be backtested."""
+    def deco(fn: Callable) -> Callable:
+        key = name or fn.__name__.strip("_").replace("_signals", "")
+        ALGORITHMS[key] = Algorithm(key, fn, scan, bars, interval, fields, tier, source, setups, hold)
+        return fn
+    return deco
+
+def _enabled(scan_type: str, source: str = "prices") -> List[Algorithm]:
+    return [a for a in ALGORITHMS.values() if a.enabled and a.scan == scan_type and a.source == source]
+
+def _priced(scan_type: str) -> List[Algorithm]:
+    """Enabled algorithms that need bars fetched: price and rank algorithms."""
+    return _enabled(scan_type) + _enabled(scan_type, "ranks")
+
+def _period_for(interval: str, bars: int) -> str:
+    periods = PERIOD_BARS.get(interval, PERIOD_BARS["1d"])
+    return next((p for p, n in periods if n >= bars), periods[-1][0])
+
+def fetch_plan(scan_type: str) -> List[Dict]:
+    """One {interval, period, ttl, symbols, fields, algorithms} job per distinct
+    download: each symbol is fetched once per interval, for the longest lookback
+    among the enabled algorithms covering it, and re-fetched on its liquidity
+    tier's cadence (daily bars; intraday bars always use INTRADAY_TTL)."""
+    need: Dict[Tuple[str, str], int] = {}
+    for a in _priced(scan_type):
+        for sym in a.symbols():
+            need[(a.base, sym)] = max(need.get((a.base, sym), 0), a.base_bars)
+    jobs: Dict[Tuple[str, str, float], Dict] = {}
+    for (interval, sym), bars in need.items():
+        ttl = _universe.ttl(sym) if _store_for(interval).daily else INTRADAY_TTL
+        job = jobs.setdefault((interval, _period_for(interval, bars), ttl), {"symbols": []})
+        job["symbols"].append(sym)
+    for (interval, period, ttl), job in jobs.items():
+        algos = [a for a in _priced(scan_type) if a.base == interval]
+        job.update(interval=interval, period=period, ttl=ttl,
+                   fields=[f for f in FIELDS if any(f in a.fields for a in algos)],
+                   algorithms=[a.name for a in algos])
+    return list(jobs.values())
 
 # ── Algorithms ─────────────────────────────────────────────────────────────────
-def _52w_signals(dfs: Dict) -> List[Dict]:
-    out = []
-    for sym, df in dfs.items():
-        try:
-            c, v, h, l = df["Close"], df["Volume"], df["High"], df["Low"]
-            if len(c) < 100: continue
-            hi52 = c.max(); cur = float(c.iloc[-1])
-            avg_v = float(v.rolling(20).mean().iloc[-1])
-            cur_v = float(v.iloc[-1])
-            pct = (cur - hi52) / hi52 * 100
-            if -3.5 <= pct <= 0.5 and cur_v > avg_v * 1.4:
-                atr_v = float(calc_atr(h, l, c).iloc[-1])
-                conf = min(93, int(65 + min(25, (cur_v / avg_v - 1.4) * 18)))
-                out.append(build(sym, "52W High Breakout", "swing", "BUY",
-                    cur, cur * 0.92, cur * 1.10, cur * 1.20, conf,
-                    "Swing (2-6 weeks)", f"Within {abs(pct):.1f}% of 52W high. Vol {cur_v/avg_v:.1f}x.",
-                    "1:1.4", ["Momentum", "Breakout"]))
-        except Exception: pass
-    return out
+# Each daily algorithm is a `_setups` rule evaluated for every symbol at every
+# date at once — (symbols × dates) arrays of hit / side / entry / sl / t1 / t2 /
+# conf plus whatever its detail text needs. The live `_signals` function reads
+# each symbol's last bar and only loops over the (few) hits to build signals;
+# backtest.py replays the same rule over the whole history.
 
-def _rsi_signals(dfs: Dict) -> List[Dict]:
-    out = []
-    for sym, df in dfs.items():
-        try:
-            c, v, h, l = df["Close"], df["Volume"], df["High"], df["Low"]
-            if len(c) < 60: continue
-            rsi = calc_rsi(c)
-            cur, pr, cr = float(c.iloc[-1]), float(rsi.iloc[-2]), float(rsi.iloc[-1])
-            d200 = float(c.rolling(200).mean().iloc[-1]) if len(c) >= 200 else cur * 0.9
-            atr_v = float(calc_atr(h, l, c).iloc[-1])
-            avg_v = float(v.rolling(20).mean().iloc[-1]); cur_v = float(v.iloc[-1])
-            if pr < 35 and cr > pr + 1 and cur > d200 * 0.98 and cur_v > avg_v:
-                conf = min(88, int(55 + (35 - pr) * 2 + (cur_v / avg_v - 1) * 5))
-                out.append(build(sym, "RSI Oversold Bounce", "swing", "BUY",
-                    cur, cur - 2 * atr_v, cur + 3 * atr_v, cur + 5 * atr_v, conf,
-                    "Swing (1-3 weeks)", f"RSI {pr:.0f}→{cr:.0f}. Above 200DMA.",
-                    "1:1.5", ["RSI", "Mean Reversion"]))
-        except Exception: pass
+def _at_last(p: Panel, setups: Dict) -> Dict:
+    """Each setup array at its symbol's last bar (scalars pass through)."""
+    out = {}
+    for k, x in setups.items():
+        if np.ndim(x) != 2:
+            out[k] = x
+        elif x.dtype == bool:
+            out[k] = p.last(x) > 0
+        else:
+            out[k] = p.last(x)
     return out
 
-def _ema_signals(dfs: Dict) -> List[Dict]:
-    out = []
-    for sym, df in dfs.items():
-        try:
-            c, v, h, l = df["Close"], df["Volume"], df["High"], df["Low"]
-            if len(c) < 25: continue
-            e9, e21 = calc_ema(c, 9), calc_ema(c, 21)
-            cur = float(c.iloc[-1]); atr_v = float(calc_atr(h, l, c).iloc[-1])
-            avg_v = float(v.rolling(20).mean().iloc[-1]); cur_v = float(v.iloc[-1])
-            bull = float(e9.iloc[-2]) <= float(e21.iloc[-2]) and float(e9.iloc[-1]) > float(e21.iloc[-1])
-            bear = float(e9.iloc[-2]) >= float(e21.iloc[-2]) and float(e9.iloc[-1]) < float(e21.iloc[-1])
-            if bull or bear:
-                sig = "BUY" if bull else "SELL"; m = 1 if bull else -1
-                conf = min(85, int(60 + (cur_v / avg_v - 1) * 10))
-                out.append(build(sym, "EMA 9/21 Crossover", "swing", sig,
-                    cur, cur - m * 1.5 * atr_v, cur + m * 2.5 * atr_v, cur + m * 4 * atr_v,
-                    conf, "Swing (5-15 days)",
-                    f"EMA9 {'above' if bull else 'below'} EMA21. Vol {cur_v/avg_v:.1f}x.", "1:1.7",
-                    ["Trend", "EMA Crossover"]))
-        except Exception: pass
-    return out
+def _52w_setups(p: Panel) -> Dict:
+    c, v = p.close, p.volume
+    avg_v, hi52 = p.ind.sma(20, "Volume"), p.ind.highest(252)
+    with np.errstate(all="ignore"):
+        pct = (c - hi52) / hi52 * 100
+        ratio = v / avg_v
+        hit = (p.ind.count() >= 100) & (pct >= -3.5) & (pct <= 0.5) & (v > avg_v * 1.4) & np.isfinite(ratio)
+        conf = np.minimum(93, np.trunc(65 + np.minimum(25, (ratio - 1.4) * 18)))
+    return {"hit": hit, "side": 1, "entry": c, "sl": c * 0.92, "t1": c * 1.10, "t2": c * 1.20,
+            "conf": conf, "pct": pct, "ratio": ratio}
 
-def _bb_signals(dfs: Dict) -> List[Dict]:
-    out = []
-    for sym, df in dfs.items():
-        try:
-            c, h, l = df["Close"], df["High"], df["Low"]
-            if len(c) < 30: continue
-            bbu, _, bbl = calc_bb(c)
-            kcu, _, kcl = calc_keltner(h, l, c)
-            sq_on  = float(bbu.iloc[-1]) < float(kcu.iloc[-1]) and float(bbl.iloc[-1]) > float(kcl.iloc[-1])
-            sq_off = (float(bbu.iloc[-2]) < float(kcu.iloc[-2]) and
-                      float(bbl.iloc[-2]) > float(kcl.iloc[-2])) and not sq_on
-            if sq_on or sq_off:
-                cur = float(c.iloc[-1]); mom = (cur - float(c.iloc[-5])) / float(c.iloc[-5]) * 100
-                sig = "BUY" if mom >= 0 else "SELL"; m = 1 if mom >= 0 else -1
-                atr_v = float(calc_atr(h, l, c).iloc[-1])
-                conf = 78 if sq_off else 66
-                out.append(build(sym, "BB Squeeze (TTM)", "swing", sig,
-                    cur, cur - m * 1.5 * atr_v, cur + m * 3 * atr_v, cur + m * 5 * atr_v,
-                    conf, "Swing (2-4 weeks)",
-                    f"{'Squeeze released!' if sq_off else 'Coiling.'} Mom {mom:+.1f}% (5d).",
-                    "1:2", ["Squeeze", "Volatility"]))
-        except Exception: pass
-    return out
+@algorithm("swing", bars=252, fields=("Close", "Volume"), setups=_52w_setups, hold=30)
+def _52w_signals(p: Panel) -> List[Dict]:
+    s = _at_last(p, _52w_setups(p))
+    return [build(p.symbols[i], "52W High Breakout", "swing", "BUY",
+                  s["entry"][i], s["sl"][i], s["t1"][i], s["t2"][i], s["conf"][i],
+                  "Swing (2-6 weeks)", f"Within {abs(s['pct'][i]):.1f}% of 52W high. Vol {s['ratio'][i]:.1f}x.",
+                  "1:1.4", ["Momentum", "Breakout"])
+            for i in np.flatnonzero(s["hit"])]
 
-def _supertrend_signals(dfs: Dict) -> List[Dict]:
-    out = []
-    for sym, df in dfs.items():
-        try:
-            c, h, l, v = df["Close"], df["High"], df["Low"], df["Volume"]
-            if len(c) < 30: continue
-            atr14 = calc_atr(h, l, c, 10); hl2 = (h + l) / 2
-            lb = hl2 - 3 * atr14
-            e9, e21 = calc_ema(c, 9), calc_ema(c, 21)
-            cur = float(c.iloc[-1]); st_up = float(lb.iloc[-1])
-            bull = cur > st_up and float(c.iloc[-2]) > float(lb.iloc[-2])
-            ema_bull = float(e9.iloc[-1]) > float(e21.iloc[-1])
-            avg_v = float(v.rolling(20).mean().iloc[-1]); cur_v = float(v.iloc[-1])
-            if bull and ema_bull and cur_v > avg_v:
-                atr_v = float(atr14.iloc[-1])
-                conf = min(82, int(68 + (cur_v / avg_v - 1) * 8))
-                out.append(build(sym, "Supertrend + EMA", "intraday", "BUY",
-                    cur, st_up * 0.998, cur + 2 * atr_v, cur + 3.5 * atr_v,
-                    conf, "Intraday / Positional",
-                    f"Supertrend bullish. EMA9>EMA21. Vol {cur_v/avg_v:.1f}x.", "1:2",
-                    ["Supertrend", "Trend"]))
-        except Exception: pass
-    return out
+def _rsi_setups(p: Panel) -> Dict:
+    c, v = p.close, p.volume
+    rsi = p.ind.rsi(14)
+    pr = p.shift(rsi, 1)
+    d200 = np.where(p.ind.count() >= 200, p.ind.sma(200), c * 0.9)
+    atr_v, avg_v = p.ind.atr(14), p.ind.sma(20, "Volume")
+    with np.errstate(all="ignore"):
+        ratio = v / avg_v
+        hit = ((p.ind.count() >= 60) & (pr < 35) & (rsi > pr + 1) & (c > d200 * 0.98) & (v > avg_v)
+               & np.isfinite(ratio) & np.isfinite(atr_v))
+        conf = np.minimum(88, np.trunc(55 + (35 - pr) * 2 + (ratio - 1) * 5))
+    return {"hit": hit, "side": 1, "entry": c, "sl": c - 2 * atr_v, "t1": c + 3 * atr_v, "t2": c + 5 * atr_v,
+            "conf": conf, "pr": pr, "cr": rsi}
+
+@algorithm("swing", bars=200, setups=_rsi_setups, hold=15)
+def _rsi_signals(p: Panel) -> List[Dict]:
+    s = _at_last(p, _rsi_setups(p))
+    return [build(p.symbols[i], "RSI Oversold Bounce", "swing", "BUY",
+                  s["entry"][i], s["sl"][i], s["t1"][i], s["t2"][i], s["conf"][i],
+                  "Swing (1-3 weeks)", f"RSI {s['pr'][i]:.0f}→{s['cr'][i]:.0f}. Above 200DMA.",
+                  "1:1.5", ["RSI", "Mean Reversion"])
+            for i in np.flatnonzero(s["hit"])]
+
+def _ema_setups(p: Panel) -> Dict:
+    c, v = p.close, p.volume
+    e9, e21 = p.ind.ema(9), p.ind.ema(21)
+    e9p, e21p = p.shift(e9, 1), p.shift(e21, 1)
+    atr_v, avg_v = p.ind.atr(14), p.ind.sma(20, "Volume")
+    with np.errstate(all="ignore"):
+        ratio = v / avg_v
+        bull = (e9p <= e21p) & (e9 > e21)
+        bear = (e9p >= e21p) & (e9 < e21)
+        hit = (p.ind.count() >= 25) & (bull | bear) & np.isfinite(ratio) & np.isfinite(atr_v)
+        m = np.where(bull, 1, -1)
+        conf = np.minimum(85, np.trunc(60 + (ratio - 1) * 10))
+    return {"hit": hit, "side": m, "entry": c, "sl": c - m * 1.5 * atr_v, "t1": c + m * 2.5 * atr_v,
+            "t2": c + m * 4 * atr_v, "conf": conf, "ratio": ratio}
+
+@algorithm("swing", bars=25, setups=_ema_setups, hold=15)
+def _ema_signals(p: Panel) -> List[Dict]:
+    s = _at_last(p, _ema_setups(p))
+    return [build(p.symbols[i], "EMA 9/21 Crossover", "swing", "BUY" if s["side"][i] > 0 else "SELL",
+                  s["entry"][i], s["sl"][i], s["t1"][i], s["t2"][i], s["conf"][i], "Swing (5-15 days)",
+                  f"EMA9 {'above' if s['side'][i] > 0 else 'below'} EMA21. Vol {s['ratio'][i]:.1f}x.", "1:1.7",
+                  ["Trend", "EMA Crossover"])
+            for i in np.flatnonzero(s["hit"])]
 
-def _orb_signals() -> List[Dict]:
+def _bb_setups(p: Panel) -> Dict:
+    c = p.close
+    bbu, _, bbl = p.ind.bb(20, 2.0)
+    kcu, _, kcl = p.ind.keltner(20, 1.5)
+    sq_now = (bbu < kcu) & (bbl > kcl)
+    sq_prev = (p.shift(bbu, 1) < p.shift(kcu, 1)) & (p.shift(bbl, 1) > p.shift(kcl, 1))
+    sq_off = sq_prev & ~sq_now
+    c5, atr_v = p.shift(c, 4), p.ind.atr(14)
+    with np.errstate(all="ignore"):
+        mom = (c - c5) / c5 * 100
+        hit = (p.ind.count() >= 30) & (sq_now | sq_off) & np.isfinite(mom) & np.isfinite(atr_v)
+        m = np.where(mom >= 0, 1, -1)
+    return {"hit": hit, "side": m, "entry": c, "sl": c - m * 1.5 * atr_v, "t1": c + m * 3 * atr_v,
+            "t2": c + m * 5 * atr_v, "conf": np.where(sq_off, 78, 66), "sq_off": sq_off, "mom": mom}
+
+@algorithm("swing", bars=30, setups=_bb_setups, hold=20)
+def _bb_signals(p: Panel) -> List[Dict]:
+    s = _at_last(p, _bb_setups(p))
+    return [build(p.symbols[i], "BB Squeeze (TTM)", "swing", "BUY" if s["side"][i] > 0 else "SELL",
+                  s["entry"][i], s["sl"][i], s["t1"][i], s["t2"][i], s["conf"][i], "Swing (2-4 weeks)",
+                  f"{'Squeeze released!' if s['sq_off'][i] else 'Coiling.'} Mom {s['mom'][i]:+.1f}% (5d).",
+                  "1:2", ["Squeeze", "Volatility"])
+            for i in np.flatnonzero(s["hit"])]
+
+def _supertrend_setups(p: Panel) -> Dict:
+    c, h, l, v = p.close, p.high, p.low, p.volume
+    atr10 = p.ind.atr(10)
+    lb = (h + l) / 2 - 3 * atr10
+    e9, e21 = p.ind.ema(9), p.ind.ema(21)
+    avg_v = p.ind.sma(20, "Volume")
+    with np.errstate(all="ignore"):
+        ratio = v / avg_v
+        bull = (c > lb) & (p.shift(c, 1) > p.shift(lb, 1))
+        hit = (p.ind.count() >= 30) & bull & (e9 > e21) & (v > avg_v) & np.isfinite(ratio)
+        conf = np.minimum(82, np.trunc(68 + (ratio - 1) * 8))
+    return {"hit": hit, "side": 1, "entry": c, "sl": lb * 0.998, "t1": c + 2 * atr10, "t2": c + 3.5 * atr10,
+            "conf": conf, "ratio": ratio}
+
+@algorithm("intraday", bars=30, tier=1, setups=_supertrend_setups, hold=10)
+def _supertrend_signals(p: Panel) -> List[Dict]:
+    s = _at_last(p, _supertrend_setups(p))
+    return [build(p.symbols[i], "Supertrend + EMA", "intraday", "BUY",
+                  s["entry"][i], s["sl"][i], s["t1"][i], s["t2"][i], s["conf"][i], "Intraday / Positional",
+                  f"Supertrend bullish. EMA9>EMA21. Vol {s['ratio'][i]:.1f}x.", "1:2",
+                  ["Supertrend", "Trend"])
+            for i in np.flatnonzero(s["hit"])]
+
+# NSE cash session (IST wall time, as stored); the opening range is its first 15 min
+SESSION_OPEN = 9 * 60 + 15
+OR_MINUTES = 15
+
+@algorithm("intraday", bars=375, interval="5m", tier=1)
+def _orb_signals(p: Panel) -> List[Dict]:
+    """Opening Range Breakout on a 5-minute panel. For each symbol the session is
+    the day of its latest bar; the range is the 09:15–09:30 IST bars of that day."""
     out = []
-    for sym in NIFTY500[:20]:  # intraday: scan top liquid stocks only
-        try:
-            df = yf.Ticker(sym).history(period="2d", interval="5m")
-            if len(df) < 6: continue
-            or_data = df.iloc[-12:-9] if len(df) > 12 else df.iloc[:3]
-            rest    = df.iloc[-9:]    if len(df) > 12 else df.iloc[3:]
-            if len(or_data) < 2 or len(rest) == 0: continue
-            orh, orl = float(or_data["High"].max()), float(or_data["Low"].min())
-            cur, rng = float(rest["Close"].iloc[-1]), orh - orl
-            avg_v, cur_v = float(df["Volume"].mean()), float(rest["Volume"].mean())
-            if rng <= 0: continue
-            if cur > orh * 1.001 and cur_v > avg_v * 1.2:
-                out.append(build(sym, "Opening Range Breakout", "intraday", "BUY",
-                    orh, orl, orh + rng * 1.5, orh + rng * 2.5,
-                    73, "Intraday", f"ORB high {orh:.0f} | Range {rng:.0f}pts | Vol {cur_v/avg_v:.1f}x.",
-                    "1:1.5", ["ORB", "Breakout"]))
-            elif cur < orl * 0.999 and cur_v > avg_v * 1.2:
-                out.append(build(sym, "Opening Range Breakout", "intraday", "SHORT",
-                    orl, orh, orl - rng * 1.5, orl - rng * 2.5,
-                    70, "Intraday", f"ORB breakdown {orl:.0f} | Range {rng:.0f}pts | Vol {cur_v/avg_v:.1f}x.",
-                    "1:1.5", ["ORB", "Breakdown"]))
-        except Exception: pass
+    if not len(p) or not len(p.dates):
+        return out
+    c, h, l, v = p.close, p.high, p.low, p.volume
+    day = p.dates.normalize().values
+    mins = (p.dates.hour * 60 + p.dates.minute).values
+    last_day = np.where(p.end >= 0, day[np.maximum(p.end, 0)], np.datetime64("NaT"))
+    today = (day[None, :] == last_day[:, None]) & p.valid
+    in_or = today & (mins >= SESSION_OPEN) & (mins < SESSION_OPEN + OR_MINUTES)
+    after = today & (mins >= SESSION_OPEN + OR_MINUTES)
+
+    orh = np.fmax.reduce(np.where(in_or, h, np.nan), axis=1)
+    orl = np.fmin.reduce(np.where(in_or, l, np.nan), axis=1)
+    n_or, n_after = in_or.sum(axis=1), after.sum(axis=1)
+    vz = np.where(p.valid, v, 0.0)
+    with np.errstate(all="ignore"):
+        avg_v = vz.sum(axis=1) / p.n_bars
+        cur_v = np.where(after, vz, 0.0).sum(axis=1) / n_after
+        cur, rng = p.last(c), orh - orl
+        ok = (n_or >= 2) & (n_after > 0) & (rng > 0) & (cur_v > avg_v * 1.2) & (p.n_bars >= 6)
+        brk_up, brk_dn = ok & (cur > orh * 1.001), ok & (cur < orl * 0.999)
+        ratio = cur_v / avg_v
+    for i in np.flatnonzero(brk_up | brk_dn):
+        if brk_up[i]:
+            out.append(build(p.symbols[i], "Opening Range Breakout", "intraday", "BUY",
+                orh[i], orl[i], orh[i] + rng[i] * 1.5, orh[i] + rng[i] * 2.5,
+                73, "Intraday", f"ORB high {orh[i]:.0f} | Range {rng[i]:.0f}pts | Vol {ratio[i]:.1f}x.",
+                "1:1.5", ["ORB", "Breakout"]))
+        else:
+            out.append(build(p.symbols[i], "Opening Range Breakout", "intraday", "SHORT",
+                orl[i], orh[i], orl[i] - rng[i] * 1.5, orl[i] - rng[i] * 2.5,
+                70, "Intraday", f"ORB breakdown {orl[i]:.0f} | Range {rng[i]:.0f}pts | Vol {ratio[i]:.1f}x.",
+                "1:1.5", ["ORB", "Breakdown"]))
     return out
 
-def _quality_value_signals() -> List[Dict]:
+@algorithm("longterm", tier=2, source="fundamentals")
+def _quality_value_signals(snap: Dict[str, Dict], prices: Optional[Dict[str, float]] = None) -> List[Dict]:
+    """Score every symbol in the fundamentals snapshot; never touches the network.
+    Entry uses the latest stored close when we have one (the snapshot price ages)."""
     out = []
-    for sym in NIFTY500[:30]:  # fundamental: slow, limit to top 30
+    prices = prices or {}
+    for sym, info in snap.items():
         try:
-            info = yf.Ticker(sym).info
             if not info: continue
             roe  = (info.get("returnOnEquity", 0) or 0) * 100
             de   = info.get("debtToEquity", 999) or 999
@@ -286,7 +606,7 @@ def _quality_value_signals() -> List[Dict]:
             eg   = (info.get("earningsGrowth", 0) or 0) * 100
             rg   = (info.get("revenueGrowth", 0) or 0) * 100
             dy   = (info.get("dividendYield", 0) or 0) * 100
-            price = info.get("currentPrice") or info.get("regularMarketPrice") or 0
+            price = prices.get(sym) or info.get("currentPrice") or info.get("regularMarketPrice") or 0
             if not (roe > 15 and de < 100 and pe > 0 and price > 0): continue
             score = 0
             if roe > 20: score += 20
@@ -307,6 +627,25 @@ def _quality_value_signals() -> List[Dict]:
         except Exception: pass
     return out
 
+RS_LEADER = 95            # universe RS rating a leader needs (top 5%)
+RS_SECTOR_LEADER = 80     # ... and within its sector, where the sector is known
+RS_TIER = 2               # every tier is ranked; leaders come from tiers 1–2
+
+@algorithm("swing", bars=252, fields=("Close",), source="ranks")
+def _rs_leaders_signals(rs: strength.RelativeStrength) -> List[Dict]:
+    """The strongest names by weighted 3/6/12-month return against the whole
+    universe and against their sector (strength.py ranks them once per scan)."""
+    out = []
+    for sym in rs.leaders(RS_LEADER, RS_SECTOR_LEADER, lambda s: _universe.tier(s) <= RS_TIER):
+        e = rs.get(sym)
+        c = e["close"]
+        sector = f" | #{e['sector_rank']} of {e['sector_size']} in {e['sector']}" if e["sector"] else ""
+        out.append(build(sym, "Relative Strength Leader", "swing", "BUY", c, c * 0.92, c * 1.10, c * 1.20,
+                         min(90, 70 + (e["rs_rating"] - RS_LEADER) * 4), "Swing (2-6 weeks)",
+                         f"RS {e['rs_rating']} | 3M {e['ret_3m'] * 100:+.0f}% | 12M {e['ret_12m'] * 100:+.0f}%{sector}",
+                         "1:1.4", ["Momentum", "Relative Strength"]))
+    return out
+
 # ── Signal builder ────────────────────────────────────────────────────────────
 def build(sym, algo, algo_type, signal, entry, sl, t1, t2, conf, tf, detail, rr, tags):
     return {
@@ -319,52 +658,279 @@ def build(sym, algo, algo_type, signal, entry, sl, t1, t2, conf, tf, detail, rr,
     }
 
 # ── Master scanner with intelligent batching + caching ───────────────────────
-def run_scan(scan_type: str) -> Dict:
+# `scan_events` is the scan itself: it yields a "signals" event per algorithm as
+# each price chunk lands (the store-fresh symbols come first), then one
+# "summary" event with the deduplicated, ranked result. `run_scan` just drains
+# it; the SSE endpoint forwards the events as they happen.
+def _chunk_events(part: Dict[str, pd.DataFrame], algos: List[Algorithm], seen: set,
+                  signals: List[Dict], panels: List[Panel], chunk: int,
+                  tm: timings.ScanTimings, observers: Optional[Dict] = None) -> Iterator[Dict]:
+    """Run `algos` concurrently on the chunk — one panel per distinct tier set
+    (and resampled timeframe), so algorithms covering the same symbols share
+    its indicator cache. The chunk's widest daily panel is also passed to each
+    of `observers` ({timing stage: object with `add(panel)`})."""
+    groups: Dict[Optional[int], List[Algorithm]] = {}
+    for a in algos:
+        groups.setdefault(a.tier, []).append(a)
+    futs = {}
+    observed = False
+    for _, group in sorted(groups.items(), key=lambda g: -(g[0] or len(universe.TIER_TTL) + 1)):
+        members = set(group[0].symbols())
+        sub = {s: df for s, df in part.items() if s in members}
+        if not sub:
+            continue
+        with tm.stage("panel"):
+            panel = Panel.from_frames(sub)
+        panels.append(panel)
+        if group[0].base == "1d" and not observed:
+            observed = True
+            for stage, ob in (observers or {}).items():
+                with tm.stage(stage):
+                    ob.add(panel)
+        views = {a.base: panel for a in group}
+        for a in group:
+            if a.interval not in views:
+                with tm.stage("resample"):
+                    views[a.interval] = panel.resample(a.interval)
+                panels.append(views[a.interval])
+        futs.update({_algo_pool.submit(_timed, a.fn, views[a.interval]): (a, len(panel))
+                     for a in group if a.source == "prices"})
+    for f in as_completed(futs):
+        algo, n = futs[f]
+        found, wall, cpu = f.result()
+        tm.algorithm(algo.name, n, len(found), wall, cpu)
+        new = []
+        for sig in found:
+            k = (sig["symbol"], sig["algorithm"])
+            if k not in seen:
+                seen.add(k)
+                new.append(sig)
+        signals += new
+        yield {"event": "signals", "data": {"chunk": chunk, "symbols": n,
+                                            "algorithm": algo.name, "signals": new}}
+
+def _universe_event(algo: Algorithm, args: tuple, symbols: int, seen: set,
+                    signals: List[Dict], chunk: int, tm: timings.ScanTimings) -> Dict:
+    """Run a whole-universe (fundamentals / ranks) algorithm once; its signals event."""
+    found, wall, cpu = _timed(algo.fn, *args)
+    tm.algorithm(algo.name, symbols, len(found), wall, cpu)
+    new = [sig for sig in found if (sig["symbol"], sig["algorithm"]) not in seen]
+    seen.update((sig["symbol"], sig["algorithm"]) for sig in new)
+    signals += new
+    return {"event": "signals", "data": {"chunk": chunk, "symbols": symbols,
+                                        "algorithm": algo.name, "signals": new}}
+
+def snapshot_events(result: Dict) -> Iterator[Dict]:
+    """Replay a finished scan as the same event sequence (cache hits)."""
+    yield {"event": "signals", "data": {"chunk": 0, "symbols": result.get("universe", 0),
+                                        "algorithm": "all", "signals": result["signals"]}}
+    yield {"event": "summary", "data": {k: v for k, v in result.items() if k != "signals"}}
+
+def _cached(key: str, since: float) -> Optional[Dict]:
+    hit = _scan_cache.get(key)
+    return _aged(*hit) if hit and hit[0] >= since else None
+
+def _aged(t: float, result: Dict) -> Dict:
+    age = time.time() - t
+    return {**result, "stale": age > SCAN_TTL, "age_seconds": round(age, 1)}
+
+def _refresh_async(scan_type: str, max_age: float):
+    """At most one background refresh per scan type per process; the lease in
+    scan_events makes it one across workers."""
+    with _refresh_lock:
+        if scan_type in _refreshing:
+            return
+        _refreshing.add(scan_type)
+
+    def work():
+        try:
+            run_scan(scan_type, max_age=max_age)
+        except Exception as e:
+            print(f"Background {scan_type} refresh failed: {e}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(scan_type)
+
+    threading.Thread(target=work, name=f"scan-refresh-{scan_type}", daemon=True).start()
+
+def scan_events(scan_type: str, force: bool = False, max_age: float = SCAN_TTL,
+                out: Optional[Dict] = None, stale_ok: bool = False) -> Iterator[Dict]:
+    """Serve today's scan if one finished within `max_age` s (any worker's),
+    otherwise run it. While another worker holds the lease on the same scan,
+    wait for its result instead of computing it again. `force` is max_age=0.
+
+    With `stale_ok`, a scan up to SCAN_MAX_STALE old (`stale: true`) is served
+    at once and refreshed in the background instead. The result, with its
+    `stale` flag and `age_seconds`, is left in out["result"]."""
+    out = {} if out is None else out
     key = f"{scan_type}_{date.today().isoformat()}"
-    if key in _scan_cache and (time.time() - _scan_cache[key]["t"]) < 900:
-        return _scan_cache[key]["d"]
+    since = time.time() - (0 if force else max_age)
+    hit = _cached(key, since)
+    if hit is None and stale_ok and not force:
+        hit = _cached(f"latest_{scan_type}", time.time() - SCAN_MAX_STALE)
+        if hit is not None:
+            _refresh_async(scan_type, max_age)
+    lease = None if hit is not None else _scan_cache.claim(key, SCAN_LEASE)
+    if hit is None and lease is None:
+        deadline = time.time() + SCAN_LEASE
+        while hit is None and time.time() < deadline:
+            time.sleep(0.5)
+            hit = _cached(key, since)
+        if hit is None:
+            lease = _scan_cache.claim(key, SCAN_LEASE)   # holder died or stalled: take over
+    if hit is not None:
+        out["result"] = hit
+        yield from snapshot_events(hit)
+        return
+    try:
+        yield from _scan(scan_type, key, out)
+    finally:
+        if lease:
+            _scan_cache.release(key, lease)
 
+def _scan(scan_type: str, key: str, out: Dict) -> Iterator[Dict]:
+    tm = timings.ScanTimings(scan_type)
     ist = pytz.timezone("Asia/Kolkata")
     now = datetime.now(ist)
     signals: List[Dict] = []
+    seen: set = set()
+    failed: List[str] = []
+    panels: List[Panel] = []
+    snap: Dict[str, Dict] = {}
+    rs = strength.RelativeStrength()
+    bc = _breadth.counts()
+    partial = False
+    # Breadth is counted over the whole universe and 52 weeks of bars; a narrower
+    # or shorter daily panel (intraday's tier-1 Supertrend) would overwrite the
+    # day's row with partial counts, so only such scans feed and commit it
+    observers = {"relative_strength": rs}
+    full = any(a.base == "1d" and a.tier is None and a.base_bars >= breadth.HL_WINDOW
+               for a in _priced(scan_type))
+    if full:
+        observers["breadth"] = bc
+    n = 0
+
+    with tm.stage("plan"):
+        plan = fetch_plan(scan_type)
+    for job in plan:
+        algos = [a for a in _priced(scan_type) if a.base == job["interval"]]
+        parts = _batch_iter(job["symbols"], job["period"], failed=failed,
+                            interval=job["interval"], ttl=job["ttl"], tm=tm)
+        while True:
+            # time blocked on the next chunk of bars: downloads plus store I/O
+            with tm.stage("fetch_wait"):
+                part = next(parts, None)
+            if part is None:
+                break
+            n += 1
+            yield from _chunk_events(part, algos, seen, signals, panels, n, tm, observers)
+
+    fund_algos = _enabled(scan_type, "fundamentals")
+    if fund_algos:
+        # Score the whole universe from the fundamentals snapshot; stale symbols
+        # refresh in the background (a cold start waits up to COLD_WAIT s)
+        with tm.stage("fundamentals"):
+            covered = list(dict.fromkeys(s for a in fund_algos for s in a.symbols()))
+            worker = _fundamentals.refresh_async(covered)
+            snap = _fundamentals.snapshot()
+            if not snap:
+                worker.join(timeout=fundamentals.COLD_WAIT)
+                snap = _fundamentals.snapshot()
+            # a cold snapshot still filling in: score what is there, don't cache it
+            partial = worker.is_alive() and any(s not in snap for s in covered)
+            snap = {s: snap[s] for s in covered if s in snap}
+            prices = {}
+            for sym in snap:
+                st = _store.stat(sym)
+                if st and time.time() - st["fetched_at"] < 86400:
+                    prices[sym] = float(_store.read(sym)["Close"].iloc[-1])
+        for algo in fund_algos:
+            yield _universe_event(algo, (snap, prices), len(snap), seen, signals, n + 1, tm)
+
+    if full:
+        with tm.stage("breadth"):
+            _breadth.commit(bc)
 
-    if scan_type == "intraday":
-        # Intraday: Supertrend on EOD data + ORB on 5m data
-        dfs_3m = _batch(NIFTY500[:80], "3mo", chunk=40)
-        signals += _supertrend_signals(dfs_3m)
-        signals += _orb_signals()
-
-    elif scan_type == "swing":
-        # Swing: fetch 1y daily data in two chunks → run all 4 algos
-        chunk1 = _batch(NIFTY500[:100], "1y", chunk=50)
-        chunk2 = _batch(NIFTY500[100:200], "1y", chunk=50)
-        all_dfs = {**chunk1, **chunk2}
-        signals += _52w_signals(all_dfs)
-        signals += _rsi_signals(all_dfs)
-        signals += _ema_signals(all_dfs)
-        signals += _bb_signals(all_dfs)
-
-    elif scan_type == "longterm":
-        # Long-term: fundamental data (slow per ticker), limit universe
-        signals += _quality_value_signals()
-
-    # Deduplicate by symbol+algo, sort by confidence
-    seen = set()
-    unique = []
-    for s in signals:
-        k = (s["symbol"], s["algorithm"])
-        if k not in seen:
-            seen.add(k)
-            unique.append(s)
-    unique.sort(key=lambda x: x["confidence"], reverse=True)
+    # Relative strength: one rank over every daily close this scan loaded;
+    # scans without daily bars (intraday, longterm) reuse the last ranking
+    with tm.stage("relative_strength"):
+        if len(rs):
+            rs.rank({s: info.get("sector") for s, info in _fundamentals.snapshot().items() if info})
+            _scan_cache.set("rs_table", rs.table, LATEST_TTL)
+        else:
+            hit = _scan_cache.get("rs_table")
+            rs = strength.RelativeStrength(hit[1] if hit else None)
+    for algo in _enabled(scan_type, "ranks"):
+        yield _universe_event(algo, (rs,), len(rs.table), seen, signals, n + 1, tm)
+
+    # Sort the deduplicated signals by confidence
+    # (ties broken by symbol/algorithm: algorithms finish in any order)
+    unique = sorted(signals, key=lambda x: (-x["confidence"], x["symbol"], x["algorithm"]))
+    # Same-direction signals on highly correlated names (PSU banks, group stocks)
+    # point at one trade: each joins its strongest correlated leader
+    with tm.stage("correlation"):
+        _corr.update(_universe.members(correlation.CORR_TIER))
+        unique, clusters = correlation.annotate(unique, _corr, key=lambda s: f"{s}.NS")
+    unique = strength.annotate(unique, rs, key=lambda s: f"{s}.NS")
+    cache = {k: sum(pn.ind.stats()[k] for pn in panels)
+             for k in ("hits", "misses", "entries", "seconds")} if panels else None
+    if cache:
+        cache["seconds"] = round(cache["seconds"], 3)
 
     result = {
         "scan_type": scan_type,
         "signals": unique,
         "count": len(unique),
-        "universe": len(NIFTY500),
+        "universe": len({s for j in plan for s in j["symbols"]} | set(snap)),
+        "tiers": _universe.stats(),
         "scanned_at": now.isoformat(),
-        "market_note": "Live data via yFinance. Nifty 500 universe. Educational purposes only.",
+        "market_note": "Live data via yFinance. NSE equity universe, liquidity-tiered. Educational purposes only.",
+        "indicator_cache": cache,
+        "correlated_groups": clusters,
+        "failed_symbols": sorted(set(failed)),
+        "quarantined": _health.quarantined(),
+        "partial": partial,
+        "fetch_plan": [{"interval": j["interval"], "period": j["period"], "ttl": j["ttl"],
+                        "symbols": len(j["symbols"]),
+                        "algorithms": j["algorithms"]} for j in plan],
+        # always collected; the API attaches it only with ?debug=timings
+        "timings": tm.report(sorted(set(failed)), cache),
     }
-    _scan_cache[key] = {"t": time.time(), "d": result}
-    return result
+    if not partial:
+        _scan_cache.set(key, result, SCAN_TTL)
+        _scan_cache.set(f"latest_{scan_type}", result, LATEST_TTL)
+    out["result"] = {**result, "stale": False, "age_seconds": 0.0}
+    yield {"event": "summary", "data": {k: v for k, v in result.items() if k != "signals"}}
+
+def run_scan(scan_type: str, force: bool = False, max_age: float = SCAN_TTL,
+             stale_ok: bool = False) -> Dict:
+    """Run (or serve the cached) scan. The background scheduler passes its own
+    cadence as `max_age`, so schedulers in several workers share one run."""
+    out: Dict = {}
+    for _ in scan_events(scan_type, force, max_age, out, stale_ok):
+        pass
+    return out["result"]
+
+def latest_scan(scan_type: str, max_age: Optional[float] = None) -> Optional[Dict]:
+    """Most recent finished scan of this type (any day, or at most `max_age` s
+    old), with its age in seconds."""
+    entry = _scan_cache.get(f"latest_{scan_type}")
+    if not entry or (max_age is not None and time.time() - entry[0] > max_age):
+        return None
+    return _aged(*entry)
+
+def symbol_health() -> Dict:
+    """Symbols with recent failed or empty fetches; quarantined ones are skipped by scans."""
+    return {**_health.stats(), "symbols": _health.report()}
+
+def pair_scan(force: bool = False) -> Dict:
+    """Cointegrated pairs within each industry (sector where the industry is
+    unknown) of the liquid tiers, with spreads stretched past PAIRS_Z flagged."""
+    snap = _fundamentals.snapshot()
+    groups: Dict[str, List[str]] = {}
+    for s in _universe.members(pairs.PAIRS_TIER):
+        info = snap.get(s) or {}
+        g = info.get("industry") or info.get("sector")
+        if g:
+            groups.setdefault(g, []).append(s)
+    return _pairs.run(groups, force)
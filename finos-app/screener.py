@@ -0,0 +1,416 @@
+"""
+FinOS Screener — user expressions compiled to NumPy masks over cached indicators
+
+    rsi14 < 30 and close > sma200 and vol / vol_sma20 > 1.5
+
+The expression is tokenized and parsed by hand (no eval / exec / ast), then
+compiled into a tree of closures over per-symbol columns: each identifier is
+one indicator's value at every symbol's last daily bar, computed once per
+universe panel and memoized. A screen is then a handful of vector ops.
+
+Grammar (lowest precedence first):
+    expr := and ("or" and)*          cmp  := sum (("<" | "<=" | ">" | ">=" | "==" | "!=") sum)*
+    and  := not ("and" not)*         sum  := term (("+" | "-") term)*
+    not  := "not" not | cmp          term := unary (("*" | "/") unary)*
+    unary := "-" unary | atom        atom := number | ident | func "(" expr ("," expr)* ")" | "(" expr ")"
+Chained comparisons (`30 < rsi14 < 70`) mean each pair holds.
+"""
+import copy
+import re
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import scanner
+from ohlcv_panel import Indicators, Panel
+
+MAX_LEN = 500
+MAX_DEPTH = 40
+PANEL_TTL = 300           # s before the universe panel is rebuilt from the store
+COLUMN_CACHE = 64         # columns memoized per panel, least recently used dropped
+
+
+class ScreenError(ValueError):
+    """Bad expression; the message says where."""
+
+
+# ── Columns ───────────────────────────────────────────────────────────────────
+# identifier → (p, N) -> per-symbol value at the last bar. N is the trailing
+# number of the identifier (rsi14 → 14); plain names take no number.
+def _pct(a, b):
+    with np.errstate(all="ignore"):
+        return (a - b) / b * 100
+
+_PLAIN: Dict[str, Callable[[Panel], np.ndarray]] = {
+    "open": lambda p: p.last(p.open),
+    "high": lambda p: p.last(p.high),
+    "low": lambda p: p.last(p.low),
+    "close": lambda p: p.last(p.close),
+    "volume": lambda p: p.last(p.volume),
+    "vol": lambda p: p.last(p.volume),
+    "prev_close": lambda p: p.last(p.close, 1),
+    "chg": lambda p: _pct(p.last(p.close), p.last(p.close, 1)),
+    "bars": lambda p: p.n_bars.astype(np.float64),
+}
+_NUMBERED: Dict[str, Callable[[Panel, int], np.ndarray]] = {
+    "sma": lambda p, n: p.last(p.ind.sma(n)),
+    "ema": lambda p, n: p.last(p.ind.ema(n)),
+    "rsi": lambda p, n: p.last(p.ind.rsi(n)),
+    "atr": lambda p, n: p.last(p.ind.atr(n)),
+    "std": lambda p, n: p.last(p.ind.std(n)),
+    "vol_sma": lambda p, n: p.last(p.ind.sma(n, "Volume")),
+    "high": lambda p, n: p.last(p.ind.highest(n, "High")),
+    "low": lambda p, n: p.last(p.ind.lowest(n, "Low")),
+    "ret": lambda p, n: _pct(p.last(p.close), p.last(p.close, n)),
+    "bb_upper": lambda p, n: p.last(p.ind.bb(n)[0]),
+    "bb_lower": lambda p, n: p.last(p.ind.bb(n)[2]),
+}
+_IDENT = re.compile(r"([a-z_]+?)_?(\d+)$")
+_FUNCS = {"abs": (1, np.abs), "min": (2, np.fmin), "max": (2, np.fmax)}
+
+def column_names() -> List[str]:
+    return sorted(_PLAIN) + [f"{k}N" for k in sorted(_NUMBERED)]
+
+def _resolve(name: str) -> Callable[[Panel], np.ndarray]:
+    if name in _PLAIN:
+        return _PLAIN[name]
+    m = _IDENT.match(name)
+    if m and m.group(1) in _NUMBERED:
+        base, n = m.group(1), int(m.group(2))
+        if not 1 <= n <= 1000:
+            raise ScreenError(f"{name}: period must be 1-1000")
+        return lambda p: _NUMBERED[base](p, n)
+    raise ScreenError(f"unknown column '{name}' (known: {', '.join(column_names())})")
+
+
+# ── Tokenizer / parser ────────────────────────────────────────────────────────
+_TOKEN = re.compile(r"\s*(?:(\d+\.?\d*|\.\d+)|([A-Za-z_][A-Za-z0-9_]*)|(<=|>=|==|!=|[<>+\-*/(),]))")
+_CMP = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal,
+        "==": np.equal, "!=": np.not_equal}
+_ARITH = {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide}
+
+def _tokens(text: str) -> List[Tuple[str, str, int]]:
+    out, i = [], 0
+    text = text.rstrip()
+    while i < len(text):
+        m = _TOKEN.match(text, i)
+        if not m or m.end() == i:
+            raise ScreenError(f"unexpected character '{text[i:].lstrip()[:1]}' at {i}")
+        num, ident, op = m.groups()
+        pos = m.start(m.lastindex)
+        if num is not None:
+            out.append(("num", num, pos))
+        elif ident is not None:
+            ident = ident.lower()
+            out.append(("kw" if ident in ("and", "or", "not") else "id", ident, pos))
+        else:
+            out.append(("op", op, pos))
+        i = m.end()
+    out.append(("end", "", len(text)))
+    return out
+
+
+class _Parser:
+    """Builds nodes: ("num", v) | ("col", name) | ("fn", name, args) | ("neg", a)
+    | ("not", a) | ("bool", op, a, b) | ("cmp", [ops], [operands]) | ("arith", op, a, b)."""
+
+    def __init__(self, text: str):
+        self.toks = _tokens(text)
+        self.i = 0
+        self.depth = 0
+
+    def peek(self, *vals) -> bool:
+        kind, val, _ = self.toks[self.i]
+        return kind in ("op", "kw") and val in vals
+
+    def take(self):
+        tok = self.toks[self.i]
+        self.i += 1
+        return tok
+
+    def expect(self, val: str):
+        kind, v, pos = self.take()
+        if v != val or kind not in ("op", "kw"):
+            raise ScreenError(f"expected '{val}' at {pos}" + (f", got '{v}'" if v else ""))
+
+    def parse(self):
+        node = self.expr()
+        kind, v, pos = self.toks[self.i]
+        if kind != "end":
+            raise ScreenError(f"unexpected '{v}' at {pos}")
+        return node
+
+    def expr(self):
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise ScreenError("expression nested too deeply")
+        node = self.and_()
+        while self.peek("or"):
+            self.take()
+            node = ("bool", "or", node, self.and_())
+        self.depth -= 1
+        return node
+
+    def and_(self):
+        node = self.not_()
+        while self.peek("and"):
+            self.take()
+            node = ("bool", "and", node, self.not_())
+        return node
+
+    def not_(self):
+        if self.peek("not"):
+            self.take()
+            return ("not", self.not_())
+        return self.cmp()
+
+    def cmp(self):
+        operands, ops = [self.sum()], []
+        while self.peek(*_CMP):
+            ops.append(self.take()[1])
+            operands.append(self.sum())
+        return ("cmp", ops, operands) if ops else operands[0]
+
+    def sum(self):
+        node = self.term()
+        while self.peek("+", "-"):
+            node = ("arith", self.take()[1], node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while self.peek("*", "/"):
+            node = ("arith", self.take()[1], node, self.unary())
+        return node
+
+    def unary(self):
+        if self.peek("-"):
+            self.take()
+            return ("neg", self.unary())
+        return self.atom()
+
+    def atom(self):
+        kind, v, pos = self.take()
+        if kind == "num":
+            return ("num", float(v))
+        if kind == "id" and self.peek("("):
+            if v not in _FUNCS:
+                raise ScreenError(f"unknown function '{v}' at {pos}")
+            self.take()
+            args = [self.expr()]
+            while self.peek(","):
+                self.take()
+                args.append(self.expr())
+            self.expect(")")
+            if len(args) != _FUNCS[v][0]:
+                raise ScreenError(f"{v}() takes {_FUNCS[v][0]} argument(s)")
+            return ("fn", v, args)
+        if kind == "id":
+            _resolve(v)
+            return ("col", v)
+        if kind == "op" and v == "(":
+            node = self.expr()
+            self.expect(")")
+            return node
+        raise ScreenError(f"unexpected '{v}' at {pos}" if v else "unexpected end of expression")
+
+
+# ── Compiler ──────────────────────────────────────────────────────────────────
+Cols = Callable[[str], np.ndarray]
+
+def _compile(node) -> Tuple[Callable[[Cols], np.ndarray], bool]:
+    """(fn(cols) -> array, is_boolean)."""
+    kind = node[0]
+    if kind == "num":
+        v = node[1]
+        return (lambda cols: v), False
+    if kind == "col":
+        name = node[1]
+        return (lambda cols: cols(name)), False
+    if kind == "neg":
+        f, b = _compile(node[1])
+        _numeric(b, "-")
+        return (lambda cols: np.negative(f(cols))), False
+    if kind == "fn":
+        fns = [_compile(a) for a in node[2]]
+        for _, b in fns:
+            _numeric(b, node[1] + "()")
+        op = _FUNCS[node[1]][1]
+        return (lambda cols: op(*(f(cols) for f, _ in fns))), False
+    if kind == "arith":
+        (fa, ba), (fb, bb) = _compile(node[2]), _compile(node[3])
+        _numeric(ba or bb, node[1])
+        op = _ARITH[node[1]]
+        return (lambda cols: op(fa(cols), fb(cols))), False
+    if kind == "cmp":
+        fns = [_compile(o) for o in node[2]]
+        for _, b in fns:
+            _numeric(b, "comparison")
+        ops = [_CMP[o] for o in node[1]]
+
+        def cmp(cols):
+            vals = [f(cols) for f, _ in fns]
+            mask = ops[0](vals[0], vals[1])
+            for k in range(1, len(ops)):
+                mask = mask & ops[k](vals[k], vals[k + 1])
+            return mask
+        return cmp, True
+    if kind == "not":
+        f, b = _compile(node[1])
+        _boolean(b, "not")
+        return (lambda cols: np.logical_not(f(cols))), True
+    if kind == "bool":
+        (fa, ba), (fb, bb) = _compile(node[2]), _compile(node[3])
+        _boolean(ba and bb, node[1])
+        op = np.logical_and if node[1] == "and" else np.logical_or
+        return (lambda cols: op(fa(cols), fb(cols))), True
+    raise ScreenError(f"bad node {kind}")
+
+def _numeric(is_bool: bool, where: str):
+    if is_bool:
+        raise ScreenError(f"'{where}' needs numbers, got a condition")
+
+def _boolean(is_bool: bool, where: str):
+    if not is_bool:
+        raise ScreenError(f"'{where}' needs conditions, got a number")
+
+def _names(node) -> List[str]:
+    if node[0] == "col":
+        return [node[1]]
+    out = []
+    for part in node[1:]:
+        for sub in (part if isinstance(part, list) else [part]):
+            if isinstance(sub, tuple):
+                out += _names(sub)
+    return out
+
+def compile_screen(text: str, boolean: bool = True):
+    """Parse + compile. Returns (fn(cols) -> array, column names used)."""
+    if not text or not text.strip():
+        raise ScreenError("empty expression")
+    if len(text) > MAX_LEN:
+        raise ScreenError(f"expression longer than {MAX_LEN} characters")
+    node = _Parser(text).parse()
+    fn, is_bool = _compile(node)
+    if boolean and not is_bool:
+        raise ScreenError("a screen must be a condition, e.g. 'rsi14 < 30'")
+    if not boolean and is_bool:
+        raise ScreenError("sort must be a number, e.g. 'vol / vol_sma20'")
+    return fn, list(dict.fromkeys(_names(node)))
+
+
+# ── Universe panel + memoized columns ─────────────────────────────────────────
+def _scratch(panel: Panel) -> Panel:
+    """The panel with an indicator memo of its own, for one screen: columns
+    sharing an indicator (bb_upper20 / bb_lower20) compute it once, but the
+    (symbols × dates) arrays behind them are dropped afterwards."""
+    view = copy.copy(panel)
+    view.ind = Indicators(view)
+    return view
+
+
+class _Cache:
+    """The universe panel and its memoized columns (at most COLUMN_CACHE, least
+    recently used dropped). Once built, an expired panel keeps serving while a
+    background thread rebuilds it, recomputing only the columns asked for
+    more than once, so only the very first screen waits."""
+
+    def __init__(self):
+        self.panel: Optional[Panel] = None
+        self.cols: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.uses: Dict[str, int] = {}
+        self.t = 0.0
+        self.lock = threading.Lock()
+        self.build_lock = threading.Lock()
+        self.worker: Optional[threading.Thread] = None
+
+    def _build(self, names: List[str]):
+        with self.build_lock:
+            if self.panel is not None and time.time() - self.t < PANEL_TTL:
+                return
+            syms = scanner._universe.members()
+            panel = Panel.from_frames(scanner._store.read_many(syms, scanner.period_start("1y")))
+            if panel._holes:
+                panel._compaction()      # once, shared by every scratch view
+            view = _scratch(panel)
+            cols = OrderedDict((n, np.asarray(_resolve(n)(view), dtype=np.float64)) for n in names)
+            with self.lock:
+                self.panel, self.cols, self.uses, self.t = panel, cols, {}, time.time()
+
+    def get(self) -> Tuple[Panel, Cols]:
+        with self.lock:
+            expired = self.panel is not None and time.time() - self.t >= PANEL_TTL
+            if expired and not (self.worker and self.worker.is_alive()):
+                again = [n for n in self.cols if self.uses.get(n, 0) > 1]
+                self.worker = threading.Thread(target=self._build, args=(again,),
+                                               name="screen-panel", daemon=True)
+                self.worker.start()
+        if self.panel is None:
+            self._build([])
+        with self.lock:
+            panel, cols, uses = self.panel, self.cols, self.uses
+        view: List[Panel] = []
+        seen: Dict[str, np.ndarray] = {}
+
+        def col(name: str) -> np.ndarray:
+            if name in seen:
+                return seen[name]
+            with self.lock:
+                hit = cols.get(name)
+                if hit is not None:
+                    cols.move_to_end(name)
+                    uses[name] = uses.get(name, 0) + 1
+            if hit is None:
+                if not view:
+                    view.append(_scratch(panel))
+                hit = np.asarray(_resolve(name)(view[0]), dtype=np.float64)
+                with self.lock:
+                    cols[name] = hit
+                    uses[name] = uses.get(name, 0) + 1
+                    while len(cols) > COLUMN_CACHE:
+                        uses.pop(cols.popitem(last=False)[0], None)
+            seen[name] = hit
+            return hit
+        return panel, col
+
+_cache = _Cache()
+
+
+def screen(q: str, sort: Optional[str] = None, order: str = "desc", limit: int = 50) -> Dict:
+    """Symbols matching `q` at their last daily bar, ranked by `sort` (default:
+    liquidity, most traded first), with the value of every column used."""
+    t0 = time.perf_counter()
+    if order not in ("asc", "desc"):
+        raise ScreenError("order must be 'asc' or 'desc'")
+    mask_fn, names = compile_screen(q)
+    sort_fn, sort_names = compile_screen(sort, boolean=False) if sort else (None, [])
+    panel, cols = _cache.get()
+    if not len(panel):
+        return {"query": q, "matches": [], "count": 0, "universe": 0, "as_of": None,
+                "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2)}
+    with np.errstate(all="ignore"):
+        mask = np.asarray(mask_fn(cols), dtype=bool) & (panel.n_bars > 0)
+        idx = np.flatnonzero(mask)
+        if sort_fn is not None:
+            key = np.broadcast_to(np.asarray(sort_fn(cols), dtype=np.float64), mask.shape)[idx]
+            key = np.where(np.isnan(key), -np.inf if order == "desc" else np.inf, key)
+            idx = idx[np.argsort(-key if order == "desc" else key, kind="stable")]
+    shown = list(dict.fromkeys(["close"] + names + sort_names))
+    matches = []
+    for i in idx[:max(0, limit)]:
+        row = {"symbol": scanner._clean(panel.symbols[i])}
+        for n in shown:
+            v = float(cols(n)[i])
+            row[n] = round(v, 2) if np.isfinite(v) else None
+        matches.append(row)
+    return {
+        "query": q,
+        "sort": sort,
+        "matches": matches,
+        "count": int(len(idx)),
+        "universe": len(panel),
+        "as_of": panel.dates[-1].date().isoformat() if len(panel.dates) else None,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
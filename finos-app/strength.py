@@ -0,0 +1,113 @@
+"""
+FinOS Relative Strength — cross-sectional return ranks across the universe
+
+A symbol's RS score is its weighted 3/6/12-month return (the last quarter
+counted twice). Scans feed each daily chunk panel they build to `add`, which
+costs a few column lookups per panel; `rank` then turns every score into a
+1–99 percentile with one rank over the whole universe, and into a percentile
+within the symbol's sector (sectors from the fundamentals snapshot).
+"""
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional
+
+from ohlcv_panel import Panel
+
+RS_PERIODS = ((91, 0.5), (182, 0.25), (365, 0.25))    # (calendar days back, weight)
+RS_SLACK = 7              # days a lookback may start late (1y of stored bars ends on a weekend)
+COLUMNS = ("score", "ret_3m", "ret_6m", "ret_12m", "close")
+
+
+def returns(p: Panel) -> np.ndarray:
+    """(len(RS_PERIODS), symbols): return from each lookback's start to each
+    symbol's last bar; NaN where the symbol has no bar that far back."""
+    out = np.full((len(RS_PERIODS), len(p)), np.nan)
+    if not len(p) or not len(p.dates):
+        return out
+    c = p.close
+    last = p.last(c)
+    # index of each symbol's latest real bar at or before every date
+    seen = np.maximum.accumulate(np.where(p.valid, np.arange(len(p.dates)), -1), axis=1)
+    rows = np.arange(len(p))
+    for k, (days, _) in enumerate(RS_PERIODS):
+        target = p.dates[-1] - pd.Timedelta(days=days)
+        j = int(p.dates.searchsorted(target, side="right")) - 1
+        if j < 0:
+            if p.dates[0] - target > pd.Timedelta(days=RS_SLACK):
+                continue
+            j = 0
+        at = seen[:, j]
+        start = np.where(at >= 0, c[rows, np.maximum(at, 0)], np.nan)
+        with np.errstate(all="ignore"):
+            out[k] = last / start - 1
+    return out
+
+
+def _percentile(ranks: pd.Series) -> pd.Series:
+    """pct ranks in (0, 1] → 1–99 ratings."""
+    return np.clip(np.ceil(ranks * 99), 1, 99)
+
+
+class RelativeStrength:
+    """RS scores gathered from one scan's daily panels, then ranked. `table`
+    ({sym: {rs_rating, rs_sector_rating, sector, sector_rank, sector_size,
+    ret_3m, ret_6m, ret_12m, close}}) is plain JSON, so it can be cached."""
+
+    def __init__(self, table: Optional[Dict[str, Dict]] = None):
+        self._rows: Dict[str, tuple] = {}
+        self.table: Dict[str, Dict] = table or {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, p: Panel):
+        """Score a daily panel's symbols. A symbol already scored keeps its
+        first score (panels of one chunk overlap across tier sets)."""
+        r = returns(p)
+        w = np.array([wt for _, wt in RS_PERIODS])
+        score = w @ r
+        ok = np.isfinite(score) & np.array([s not in self._rows for s in p.symbols], dtype=bool)
+        rows = np.column_stack([score, r.T, p.last(p.close)])[ok]
+        self._rows.update(zip((s for s, k in zip(p.symbols, ok) if k), map(tuple, rows.tolist())))
+
+    def rank(self, sectors: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+        sectors = sectors or {}
+        if not self._rows:
+            self.table = {}
+            return self.table
+        syms = list(self._rows)
+        df = pd.DataFrame(list(self._rows.values()), index=syms, columns=list(COLUMNS))
+        secs = [sectors.get(s) for s in syms]
+        g = df["score"].groupby(pd.Series(secs, index=syms, dtype=object))
+        cols = {"rs_rating": _percentile(df["score"].rank(pct=True)),
+                "rs_sector_rating": _percentile(g.rank(pct=True)),
+                "sector_rank": g.rank(ascending=False, method="min"),
+                "sector_size": g.transform("size")}
+        ints = [[None if v != v else int(v) for v in c.tolist()] for c in cols.values()]
+        rets = [np.round(df[k].to_numpy(), 4).tolist() for k in COLUMNS[1:4]]
+        self.table = {s: {"rs_rating": r, "rs_sector_rating": sr, "sector": sec, "sector_rank": k,
+                          "sector_size": n, "ret_3m": r3, "ret_6m": r6, "ret_12m": r12, "close": c}
+                      for s, r, sr, k, n, sec, r3, r6, r12, c in zip(
+                          syms, *ints, secs, *rets, df["close"].tolist())}
+        return self.table
+
+    def get(self, sym: str) -> Optional[Dict]:
+        return self.table.get(sym)
+
+    def leaders(self, min_rating: int, min_sector_rating: int,
+                include: Callable[[str], bool] = lambda s: True) -> List[str]:
+        """Symbols at or above both ratings (the sector one where a sector is
+        known), strongest first."""
+        out = [s for s, e in self.table.items()
+               if e["rs_rating"] >= min_rating and include(s)
+               and (e["rs_sector_rating"] is None or e["rs_sector_rating"] >= min_sector_rating)]
+        return sorted(out, key=lambda s: (-self.table[s]["rs_rating"], s))
+
+
+def annotate(signals: List[Dict], rs: RelativeStrength, key=lambda s: s) -> List[Dict]:
+    """Every signal gets `rs_rating` and `rs_sector_rating` (None when unranked)."""
+    out = []
+    for sig in signals:
+        e = rs.get(key(sig["symbol"])) or {}
+        out.append({**sig, "rs_rating": e.get("rs_rating"), "rs_sector_rating": e.get("rs_sector_rating")})
+    return out
@@ -0,0 +1,119 @@
+"""
+FinOS Timings — always-on scan stage timers and process-wide metrics
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# ── Process-wide metrics ──────────────────────────────────────────────────────
+# Plain counters keyed by (name, labels); durations are kept as a _sum/_count
+# pair so any scraper can derive rates and means. Updating one is a dict add
+# under a lock, cheap enough to leave on for every scan.
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+
+def inc(name: str, value: float = 1.0, **labels):
+    key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0.0) + value
+
+
+def observe(name: str, seconds: float, **labels):
+    inc(f"{name}_seconds_sum", seconds, **labels)
+    inc(f"{name}_seconds_count", 1, **labels)
+
+
+def snapshot() -> Dict[str, float]:
+    """{'name{label="v"}': value} for every counter."""
+    with _lock:
+        items = sorted(_counters.items())
+    return {_series(name, labels): value for (name, labels), value in items}
+
+
+def export() -> str:
+    """Prometheus text exposition of every counter (all exported as untyped)."""
+    return "".join(f"finos_{k} {v}\n" for k, v in snapshot().items())
+
+
+def _series(name: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+# ── Per-scan breakdown ────────────────────────────────────────────────────────
+class ScanTimings:
+    """Where one scan's time went: wall seconds per stage, one record per fetch
+    chunk attempt, and per-algorithm wall/CPU time. Every record also feeds the
+    process-wide counters, labelled by scan type."""
+
+    def __init__(self, scan_type: str):
+        self.scan_type = scan_type
+        self.t0 = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.chunks: List[Dict] = []
+        self.algorithms: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t)
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+        observe("scan_stage", seconds, scan=self.scan_type, stage=name)
+
+    def chunk(self, interval: str, symbols: int, got: int, seconds: float,
+              bars: int, nbytes: int, attempt: int):
+        rec = {"interval": interval, "symbols": symbols, "got": got, "attempt": attempt,
+               "seconds": round(seconds, 3), "bars": bars, "bytes": nbytes}
+        with self._lock:
+            self.chunks.append(rec)
+        observe("fetch_chunk", seconds, interval=interval)
+        inc("fetch_bytes_total", nbytes, interval=interval)
+        inc("fetch_symbols_total", got, interval=interval)
+
+    def algorithm(self, name: str, symbols: int, signals: int, wall: float, cpu: float):
+        with self._lock:
+            a = self.algorithms.setdefault(name, {"runs": 0, "symbols": 0, "signals": 0,
+                                                  "seconds": 0.0, "cpu_seconds": 0.0})
+            a["runs"] += 1
+            a["symbols"] += symbols
+            a["signals"] += signals
+            a["seconds"] += wall
+            a["cpu_seconds"] += cpu
+        observe("algorithm", wall, algorithm=name)
+        inc("algorithm_cpu_seconds_total", cpu, algorithm=name)
+
+    def report(self, dropped: List[str], indicator_cache: Optional[Dict] = None) -> Dict:
+        total = time.perf_counter() - self.t0
+        observe("scan", total, scan=self.scan_type)
+        inc("scan_dropped_symbols_total", len(dropped), scan=self.scan_type)
+        if indicator_cache:
+            inc("indicator_cache_hits_total", indicator_cache["hits"])
+            inc("indicator_cache_misses_total", indicator_cache["misses"])
+        with self._lock:
+            fetch = list(self.chunks)
+        return {
+            "total_seconds": round(total, 3),
+            "stages": {k: round(v, 3) for k, v in self.stages.items()},
+            "fetch": {
+                "chunks": len(fetch),
+                "seconds": round(sum(c["seconds"] for c in fetch), 3),
+                "max_chunk_seconds": max((c["seconds"] for c in fetch), default=0.0),
+                "bytes": sum(c["bytes"] for c in fetch),
+                "bars": sum(c["bars"] for c in fetch),
+                "per_chunk": fetch,
+            },
+            "dropped_symbols": len(dropped),
+            "algorithms": {k: {**v, "seconds": round(v["seconds"], 3), "cpu_seconds": round(v["cpu_seconds"], 3)}
+                           for k, v in self.algorithms.items()},
+            "indicator_cache": indicator_cache,
+        }
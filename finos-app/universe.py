@@ -0,0 +1,132 @@
+"""
+FinOS Universe — the NSE equity list, tiered by traded value
+"""
+import io
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+import requests
+from typing import Dict, List, Optional
+
+from health import SymbolHealth
+from ohlcv_store import DATA_DIR, OHLCVStore
+
+EQUITY_URL = "https://nsearchives.nseindia.com/content/equities/EQUITY_L.csv"
+LIST_TTL = 86400          # the equity list changes with listings/delistings only
+
+# Tier 1 = the most traded names, tier 3 = the illiquid tail. Each tier's price
+# data refreshes on its own cadence (store TTL, s): tier 1 every scan, tier 2
+# hourly, tier 3 once a day.
+TIER_SIZES = (300, 700)   # tier 1, tier 2; tier 3 is everything else
+TIER_TTL = {1: 900, 2: 3600, 3: 86400}
+TIER_REFRESH = 3600       # s between re-ranking by traded value
+LIQ_BARS = 20             # median daily traded value over this many bars
+
+
+def nse_equities(path: Optional[str] = None, timeout: float = 5) -> Optional[pd.DataFrame]:
+    """EQUITY_L.csv as a DataFrame (stripped column names), cached on disk for a
+    day. A failed download falls back to the cached copy, however old."""
+    path = path or os.path.join(DATA_DIR, "EQUITY_L.csv")
+    try:
+        fresh = time.time() - os.path.getmtime(path) < LIST_TTL
+    except OSError:
+        fresh = False
+    if not fresh:
+        try:
+            resp = requests.get(EQUITY_URL, headers={"User-Agent": "Mozilla/5.0"}, timeout=timeout)
+            if resp.status_code == 200 and "SYMBOL" in resp.text[:200]:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                    fh.write(resp.text)
+                os.replace(tmp, path)
+        except Exception:
+            pass
+    try:
+        df = pd.read_csv(path)
+    except Exception:
+        return None
+    df.columns = [c.strip() for c in df.columns]
+    return df
+
+
+class Universe:
+    """Every NSE EQ-series symbol, ranked by median traded value (close × volume)
+    from the local daily store and cut into tiers.
+
+    Symbols the store has no bars for yet rank last, except the curated `seed`
+    list (the old Nifty 500 set), which starts in tier 1 so a cold start fetches
+    the liquid names first. Without the equity list the universe is the seed.
+    Symbols quarantined by `health` are left out of `members` until re-checked.
+    """
+
+    def __init__(self, store: OHLCVStore, seed: List[str], health: Optional[SymbolHealth] = None):
+        self.store = store
+        self.seed = list(seed)
+        self.health = health
+        self._tiers: Dict[str, int] = {}
+        self._ranked: List[str] = []
+        self._t = 0.0
+        self._lock = threading.Lock()
+
+    def _symbols(self) -> List[str]:
+        df = nse_equities()
+        if df is None or "SYMBOL" not in df:
+            return self.seed
+        if "SERIES" in df:
+            df = df[df["SERIES"].astype(str).str.strip() == "EQ"]
+        listed = [f"{str(s).strip()}.NS" for s in df["SYMBOL"]]
+        return list(dict.fromkeys(self.seed + listed))
+
+    def _traded_value(self, sym: str) -> float:
+        df = self.store.read(sym)
+        if df is None or not len(df):
+            return np.nan
+        tail = df.iloc[-LIQ_BARS:]
+        return float(np.nanmedian((tail["Close"] * tail["Volume"]).to_numpy()))
+
+    def _rank(self):
+        syms = self._symbols()
+        seed = set(self.seed)
+        tv = np.array([self._traded_value(s) for s in syms])
+        known = np.isfinite(tv)
+        # known names by traded value, then unknown seed names, then the unknown rest
+        order = sorted(range(len(syms)), key=lambda i: (not known[i], syms[i] not in seed,
+                                                         -tv[i] if known[i] else 0.0))
+        ranked = [syms[i] for i in order]
+        n1, n2 = TIER_SIZES
+        tiers = {s: 1 if k < n1 else 2 if k < n1 + n2 else 3 for k, s in enumerate(ranked)}
+        for i, s in enumerate(syms):
+            if not known[i] and s in seed:
+                tiers[s] = 1
+        self._ranked, self._tiers, self._t = ranked, tiers, time.time()
+
+    def refresh(self, force: bool = False):
+        with self._lock:
+            if force or not self._ranked or time.time() - self._t >= TIER_REFRESH:
+                self._rank()
+
+    def members(self, max_tier: Optional[int] = None) -> List[str]:
+        """Symbols in tiers 1..max_tier (all when None), most traded first."""
+        self.refresh()
+        ranked = self.health.allowed(self._ranked) if self.health is not None else self._ranked
+        if max_tier is None:
+            return list(ranked)
+        return [s for s in ranked if self._tiers[s] <= max_tier]
+
+    def tier(self, sym: str) -> int:
+        self.refresh()
+        return self._tiers.get(sym, 3)
+
+    def ttl(self, sym: str) -> float:
+        return TIER_TTL[self.tier(sym)]
+
+    def stats(self) -> Dict[int, int]:
+        self.refresh()
+        counts = {t: 0 for t in TIER_TTL}
+        for t in self._tiers.values():
+            counts[t] += 1
+        return counts